@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Font memory footprint of a forked worker pool (Linux only)
+
+Forks N workers that each load the best installed font at the title/author/chapter
+sizes, then sums Rss, Pss and Private memory from /proc/<pid>/smaps_rollup over
+the workers. Three loading strategies are compared:
+
+    path           every worker opens the fonts by path (FontRegistry default)
+    preload+fork   the parent preloads the registry, workers inherit it on fork
+    bytes          every size is opened from an in-memory copy of the font file
+
+Usage:
+    python benchmarks/font_memory.py                      # 16 workers, best CJK font
+    python benchmarks/font_memory.py --workers 4 --language english
+    python benchmarks/font_memory.py --font /path/to/NotoSansCJK-Bold.ttc
+"""
+
+import argparse
+import io
+import os
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 标题/作者/章节常用字号，以及中文1.3倍放大后的字号
+FONT_SIZES = (24, 36, 45, 58, 60, 72, 78, 90, 117)
+GLYPHS = "Build Faster Python Apps 人工智能改变世界的十大技术趋势"
+
+
+def _smaps_rollup(pid: int) -> Dict[str, int]:
+    """进程内存统计（KB）：Rss、Pss、Private（Private_Clean + Private_Dirty）"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def _load_fonts(strategy: str, path: str) -> list:
+    from PIL import ImageFont
+    from youtube_thumbnail_generator.font_registry import get_font
+
+    if strategy == "bytes":
+        with open(path, "rb") as f:
+            data = f.read()
+        fonts = [ImageFont.truetype(io.BytesIO(data), size) for size in FONT_SIZES]
+    else:
+        fonts = [get_font(path, size) for size in FONT_SIZES]
+    # 实际光栅化一些字形，让FreeType读取字形表
+    for font in fonts:
+        font.getmask(GLYPHS)
+    return fonts
+
+
+def measure(strategy: str, path: str, workers: int) -> Dict[str, int]:
+    """Fork workers, load fonts with strategy and return memory summed over workers (KB)"""
+    if strategy == "preload+fork":
+        _load_fonts("path", path)
+
+    ready_read, ready_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            os.close(release_write)
+            fonts = _load_fonts("path" if strategy == "preload+fork" else strategy, path)
+            os.write(ready_write, b"x")
+            os.read(release_read, 1)  # 等待父进程采样完成
+            del fonts
+            os._exit(0)
+        pids.append(pid)
+
+    os.close(ready_write)
+    os.close(release_read)
+    for _ in range(workers):
+        os.read(ready_read, 1)
+    totals = {"rss": 0, "pss": 0, "private": 0}
+    for pid in pids:
+        for key, value in _smaps_rollup(pid).items():
+            totals[key] += value
+    os.write(release_write, b"x" * workers)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    os.close(ready_read)
+    os.close(release_write)
+    return totals
+
+
+def _run_isolated(strategy: str, path: str, workers: int) -> Dict[str, int]:
+    """在独立的子进程中测量，避免前一种策略在父进程中留下的字体影响结果"""
+    import json
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, json.dumps(measure(strategy, path, workers)).encode())
+        os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return json.loads(b"".join(chunks))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--language", default="chinese", choices=("chinese", "english"))
+    parser.add_argument("--font", help="font file to measure instead of the discovered one")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork") or not os.path.exists("/proc/self/smaps_rollup"):
+        print("font_memory.py needs Linux (fork and /proc/<pid>/smaps_rollup)")
+        return 1
+
+    from youtube_thumbnail_generator.font_registry import FontRegistry
+
+    path = args.font or FontRegistry().find_font_path(args.language)
+    if path is None:
+        print(f"No font installed for {args.language}")
+        return 1
+    # 丢弃当前进程中的注册表，保证各策略从冷缓存开始
+    import youtube_thumbnail_generator.font_registry as font_registry
+    font_registry._registry.clear()
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"font: {path} ({size_mb:.1f} MB), {len(FONT_SIZES)} sizes, {args.workers} workers")
+    print(f"{'strategy':<14} {'Rss MB':>9} {'Pss MB':>9} {'Private MB':>11}")
+    for strategy in ("path", "preload+fork", "bytes"):
+        totals = _run_isolated(strategy, path, args.workers)
+        print(f"{strategy:<14} {totals['rss'] / 1024:>9.1f} {totals['pss'] / 1024:>9.1f} "
+              f"{totals['private'] / 1024:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the rendering hot paths
+
+Covers package import (startup) time, create_text_png (English 1-15 words, CJK 1-18 chars),
+generate_final_thumbnail for every theme/triangle/flip combination of
+get_random_template_config, optimize_for_youtube_api on busy and flat images,
+ThumbnailOptimizer.optimize_thumbnail per preset, and add_chapter_to_image.
+
+Each group runs in a fresh spawned process so its peak RSS is measured in isolation.
+No network access is needed: AI title optimization is disabled for the run.
+
+Usage:
+    python benchmarks/run_benchmarks.py                    # run and compare against benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --quick            # fewer iterations
+    python benchmarks/run_benchmarks.py --filter text_png  # only cases whose name contains "text_png"
+    python benchmarks/run_benchmarks.py --save-baseline    # store the median of 3 runs as the new baseline
+    python benchmarks/run_benchmarks.py --json out.json    # also write the raw results
+
+Exit status is 1 when a case's p50 latency regresses beyond --tolerance and by more than
+--min-delta-ms against the baseline. Fast cases keep sampling until MIN_TIMED_SECONDS of
+timed work is collected, so sub-millisecond timings are not decided by a handful of samples.
+Baselines store, per case, the median-p50 result of --baseline-runs full runs, so a single
+unusually fast run does not become the reference, plus the slowest p50 seen (p50_max_ms);
+the tolerance applies on top of that run-to-run spread. A case that looks slower is re-run in a fresh process up to --confirm times and is only
+reported when every re-run is also slower, so a burst of host load does not fail the gate.
+Baselines are machine specific: regenerate one on the machine you compare on.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+ENGLISH_WORDS = ("Build Faster Python Apps With Async IO And Smart Caching For Real World Production "
+                 "Systems").split()
+CJK_CHARS = "人工智能改变世界的十大技术趋势与未来展望"
+
+MIN_TIMED_SECONDS = 0.5  # 每个用例至少累计的计时时长，快速用例自动增加迭代次数
+MAX_ITERATIONS = 2000  # 自动增加迭代次数的上限
+
+# get_random_template_config 的全部12种组合
+TEMPLATE_COMBINATIONS = [
+    {"theme": theme, "enable_triangle": True, "triangle_direction": direction, "flip": flip}
+    for theme in ("dark", "light") for direction in ("top", "bottom") for flip in (False, True)
+] + [
+    {"theme": theme, "enable_triangle": False, "triangle_direction": "bottom", "flip": flip}
+    for theme in ("dark", "light") for flip in (False, True)
+]
+
+
+def _peak_rss_bytes() -> int:
+    """当前进程的峰值常驻内存 (Linux下ru_maxrss单位为KB，macOS为字节)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _make_fixtures(directory: str) -> Dict[str, str]:
+    """生成确定性的测试图片：杂乱（噪声+渐变）和纯色两类"""
+    from PIL import Image
+
+    busy = Image.blend(Image.linear_gradient('L').resize((1600, 900)).convert('RGB'),
+                       Image.effect_noise((1600, 900), 90).convert('RGB'), 0.6)
+    fixtures = {
+        "busy": os.path.join(directory, "busy.png"),
+        "flat": os.path.join(directory, "flat.png"),
+        "photo": os.path.join(directory, "photo.jpg"),
+        "logo": os.path.join(directory, "logo.png"),
+    }
+    busy.save(fixtures["busy"])
+    Image.new('RGB', (1600, 900), (30, 60, 90)).save(fixtures["flat"])
+    busy.resize((1200, 800)).save(fixtures["photo"], quality=90)
+    Image.new('RGBA', (256, 256), (255, 200, 0, 255)).save(fixtures["logo"])
+    return fixtures
+
+
+def _startup_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    """冷启动耗时：每次在新解释器中导入，包含解释器自身启动时间（见 startup/interpreter）"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+
+    def run_python(code):
+        return lambda: subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    return [
+        ("startup/interpreter", run_python("pass")),
+        ("startup/import_package", run_python("import youtube_thumbnail_generator")),
+        ("startup/generator_ready", run_python(
+            "from youtube_thumbnail_generator import FinalThumbnailGenerator")),
+    ]
+
+
+def _text_png_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from youtube_thumbnail_generator.text_png_generator import create_text_png
+
+    cases = []
+    for words in (1, 3, 5, 10, 15):
+        text = " ".join(ENGLISH_WORDS[:words])
+        cases.append((f"text_png/english/{words}w",
+                      lambda text=text: create_text_png(text, width=550, height=280, language="english",
+                                                        auto_height=True, max_lines=3)))
+    for chars in (1, 4, 9, 14, 18):
+        text = CJK_CHARS[:chars]
+        cases.append((f"text_png/cjk/{chars}c",
+                      lambda text=text: create_text_png(text, width=550, height=280, language="chinese",
+                                                        auto_height=True, max_lines=6)))
+    return cases
+
+
+def _thumbnail_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from youtube_thumbnail_generator.final_thumbnail_generator import FinalThumbnailGenerator
+
+    generator = FinalThumbnailGenerator()
+    cases = []
+    for combo in TEMPLATE_COMBINATIONS:
+        triangle = combo["triangle_direction"] if combo["enable_triangle"] else "none"
+        name = f"thumbnail/{combo['theme']}/{triangle}/{'flip' if combo['flip'] else 'standard'}"
+        cases.append((name, lambda combo=combo: generator.generate_final_thumbnail(
+            title="Build Faster Python Apps", author="Benchmark", logo_path=fixtures["logo"],
+            right_image_path=fixtures["photo"], output_mode="bytes", **combo)))
+    return cases
+
+
+def _youtube_api_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from youtube_thumbnail_generator.final_thumbnail_generator import optimize_for_youtube_api
+
+    output = os.path.join(os.path.dirname(fixtures["busy"]), "youtube_ready.jpg")
+    return [(f"optimize_for_youtube_api/{kind}",
+             lambda kind=kind: optimize_for_youtube_api(fixtures[kind], output))
+            for kind in ("busy", "flat")]
+
+
+def _preset_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from youtube_thumbnail_generator.youtube_standards import ThumbnailOptimizer
+
+    optimizer = ThumbnailOptimizer()
+    output = os.path.join(os.path.dirname(fixtures["busy"]), "preset.jpg")
+    return [(f"optimize_thumbnail/{preset}",
+             lambda preset=preset: optimizer.optimize_thumbnail(fixtures["busy"], output, preset))
+            for preset in ThumbnailOptimizer.OUTPUT_PRESETS]
+
+
+def _chapter_cases(fixtures: Dict[str, str]) -> List[Tuple[str, Callable[[], Any]]]:
+    from youtube_thumbnail_generator.function_add_chapter import add_chapter_to_image
+
+    output = os.path.join(os.path.dirname(fixtures["busy"]), "chapter.png")
+    return [
+        ("add_chapter/english", lambda: add_chapter_to_image("Chapter One: The Beginning", output_path=output,
+                                                             language="english")),
+        ("add_chapter/chinese", lambda: add_chapter_to_image("第一章：故事的开始", output_path=output,
+                                                             language="chinese")),
+        ("add_chapter/on_image", lambda: add_chapter_to_image("Chapter Two", image_path=fixtures["photo"],
+                                                              output_path=output, language="english")),
+    ]
+
+
+GROUPS = {
+    "startup": _startup_cases,
+    "text_png": _text_png_cases,
+    "thumbnail": _thumbnail_cases,
+    "optimize_for_youtube_api": _youtube_api_cases,
+    "optimize_thumbnail": _preset_cases,
+    "add_chapter": _chapter_cases,
+}
+
+
+def _run_group(group: str, name_filter: str, warmup: int, iterations: int) -> List[Dict[str, Any]]:
+    """在独立进程中运行一组用例，返回每个用例的统计结果"""
+    sys.path.insert(0, ROOT)
+    for key in ("GEMINI_API_KEY", "GOOGLE_API_KEY"):
+        os.environ.pop(key, None)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            fixtures = _make_fixtures(workdir)
+            cases = [(name, fn) for name, fn in GROUPS[group](fixtures) if name_filter in name]
+        for name, fn in cases:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(warmup):
+                    fn()
+                samples = []
+                while len(samples) < iterations or (sum(samples) < MIN_TIMED_SECONDS
+                                                    and len(samples) < MAX_ITERATIONS):
+                    start = time.perf_counter()
+                    fn()
+                    samples.append(time.perf_counter() - start)
+            total = sum(samples)
+            results.append({
+                "name": name,
+                "iterations": len(samples),
+                "throughput_per_s": len(samples) / total if total else 0.0,
+                "mean_ms": statistics.mean(samples) * 1000,
+                "p50_ms": _percentile(samples, 0.50) * 1000,
+                "p99_ms": _percentile(samples, 0.99) * 1000,
+                "peak_rss_mb": _peak_rss_bytes() / (1024 * 1024),
+            })
+    return results
+
+
+def _environment() -> Dict[str, str]:
+    import PIL
+    return {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def run(name_filter: str = "", warmup: int = 2, iterations: int = 20) -> Dict[str, Any]:
+    """Run every benchmark group, each in its own spawned process"""
+    context = multiprocessing.get_context("spawn")
+    cases = []
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for group in GROUPS:
+            cases.extend(pool.apply(_run_group, (group, name_filter, warmup, iterations)))
+    return {"environment": _environment(), "warmup": warmup, "iterations": iterations, "cases": cases}
+
+
+def median_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge several runs into one, keeping for each case the result with the median p50
+
+    The slowest p50 of the runs is kept as p50_max_ms, the case's observed noise envelope.
+    """
+    merged = dict(runs[0], cases=[])
+    for index, case in enumerate(runs[0]["cases"]):
+        candidates = sorted((run["cases"][index] for run in runs), key=lambda c: c["p50_ms"])
+        merged["cases"].append(dict(candidates[len(candidates) // 2], p50_max_ms=candidates[-1]["p50_ms"]))
+    return merged
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            min_delta_ms: float = 0.0) -> List[str]:
+    """Return the names of cases whose p50 regressed by more than tolerance and min_delta_ms"""
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        base = previous.get(case["name"])
+        if base and base["p50_ms"] > 0:
+            case["p50_vs_baseline"] = case["p50_ms"] / base["p50_ms"]
+            # 基线多次运行中最慢的p50即为该用例的噪声范围，容差在其之上计算
+            reference = max(base["p50_ms"], base.get("p50_max_ms", 0.0))
+            # 毫秒以下的用例相对噪声很大，绝对差值也超过阈值才算回归
+            if (case["p50_ms"] > reference * (1 + tolerance)
+                    and case["p50_ms"] - reference > min_delta_ms):
+                regressions.append(case["name"])
+    return regressions
+
+
+def confirm(results: Dict[str, Any], baseline: Dict[str, Any], regressions: List[str], tolerance: float,
+            min_delta_ms: float, rounds: int) -> List[str]:
+    """Re-run each suspected regression in a fresh process; keep only cases slower in every round
+
+    A case that passes on a re-run is replaced in results by that run.
+    """
+    context = multiprocessing.get_context("spawn")
+    by_name = {case["name"]: index for index, case in enumerate(results["cases"])}
+    confirmed = []
+    for name in regressions:
+        group = name.split("/")[0]
+        for _ in range(rounds):
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                rerun = [case for case in pool.apply(_run_group, (group, name, results["warmup"],
+                                                                  results["iterations"]))
+                         if case["name"] == name]
+            retry = {"cases": rerun}
+            if not compare(retry, baseline, tolerance, min_delta_ms):
+                results["cases"][by_name[name]] = rerun[0]
+                break
+        else:
+            confirmed.append(name)
+    return confirmed
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    header = f"{'case':<40} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8} {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for case in results["cases"]:
+        ratio = case.get("p50_vs_baseline")
+        ratio_text = f"{ratio:.2f}x" if ratio else "-"
+        print(f"{case['name']:<40} {case['throughput_per_s']:>9.1f} {case['p50_ms']:>9.2f} "
+              f"{case['p99_ms']:>9.2f} {case['peak_rss_mb']:>8.1f} {ratio_text:>8}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for youtube_thumbnail_generator")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed warm-up iterations per case")
+    parser.add_argument("--quick", action="store_true", help="Shortcut for --iterations 5 --warmup 1")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run to --baseline")
+    parser.add_argument("--baseline-runs", type=int, default=3,
+                        help="Full runs merged (per-case median) when saving a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p50 slowdown before failing")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Re-runs of a slower case before it is reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore p50 slowdowns smaller than this many milliseconds (timer noise)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.iterations, args.warmup = 5, 1
+
+    if args.save_baseline:
+        results = median_run([run(args.filter, args.warmup, args.iterations)
+                              for _ in range(max(1, args.baseline_runs))])
+    else:
+        results = run(args.filter, args.warmup, args.iterations)
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        regressions = confirm(results, baseline, regressions, args.tolerance, args.min_delta_ms, args.confirm)
+
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved: {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%} "
+              f"and {args.min_delta_ms:g} ms:")
+        for name in regressions:
+            print(f"  - {name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
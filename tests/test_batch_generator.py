@@ -0,0 +1,88 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator.batch_generator import generate_batch, iter_batch
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    return tmp_path
+
+
+class TestGenerateBatch:
+    """Test batch rendering on a process pool."""
+
+    def test_results_in_input_order(self, workdir):
+        """Test that results come back ordered and written to their outputs."""
+        specs = [{"title": f"Episode {i}", "author": "Channel", "output_path": str(workdir / f"ep{i}.jpg")}
+                 for i in range(4)]
+
+        results = generate_batch(specs, workers=2)
+
+        assert [r.index for r in results] == [0, 1, 2, 3]
+        assert all(r.ok for r in results)
+        assert all(os.path.exists(r.result) for r in results)
+
+    def test_failure_does_not_stop_batch(self, workdir):
+        """Test that a failing spec is reported without aborting the others."""
+        specs = [
+            {"title": "Good", "output_mode": "bytes"},
+            {"title": "Bad", "theme": "custom"},  # custom theme without custom_template
+            {"title": "Also Good", "output_mode": "bytes"},
+        ]
+
+        results = generate_batch(specs, workers=2)
+
+        assert results[0].ok and isinstance(results[0].result, bytes)
+        assert not results[1].ok
+        assert "ValueError" in results[1].error
+        assert results[2].ok
+
+    def test_in_process_iteration(self):
+        """Test that workers=1 renders in-process and yields every spec."""
+        results = list(iter_batch([{"title": "One", "output_mode": "bytes"}], workers=1))
+        assert len(results) == 1
+        assert results[0].ok
+
+
+class TestWarmUp:
+    """Test worker cache warm-up."""
+
+    def test_warms_render_scale_fonts(self):
+        """Test that warm-up loads the scaled fonts used by the 1280x720 render path."""
+        from youtube_thumbnail_generator import batch_generator, font_registry
+        from youtube_thumbnail_generator import final_thumbnail_generator as ftg
+        from youtube_thumbnail_generator.final_thumbnail_generator import FinalThumbnailGenerator, render_text_sprite
+
+        font_registry._registry.clear()
+        ftg._text_sprite_cache.clear()
+        batch_generator._warm_up(FinalThumbnailGenerator())
+        misses = font_registry.font_cache_info().misses
+
+        render_text_sprite(text="Real Title", width=550, height=280, text_color=(255, 255, 255),
+                           language='english', auto_height=True, max_lines=3, use_stroke=False,
+                           align='left', scale=0.8)
+
+        assert font_registry.font_cache_info().misses == misses
+
+    def test_forked_workers_reuse_parent_warm_up(self, monkeypatch):
+        """Test that the parent warms shared caches only, and workers inheriting them skip the warm-up."""
+        from youtube_thumbnail_generator import batch_generator
+        warmed = []
+        monkeypatch.setattr(batch_generator, "_warm_up", warmed.append)
+        monkeypatch.setattr(batch_generator, "_warmed_templates", set())
+        monkeypatch.setattr(batch_generator, "_worker_generator", None)
+
+        batch_generator._warm_shared_caches(None, quiet=True)
+        assert batch_generator._worker_generator is None
+
+        batch_generator._init_worker(None, None, quiet=True)  # 继承了父进程缓存的工作进程
+
+        assert len(warmed) == 1
+        assert batch_generator._worker_generator is not None
@@ -0,0 +1,181 @@
+import io
+import os
+import sys
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import final_thumbnail_generator as ftg
+from youtube_thumbnail_generator.youtube_standards import ThumbnailOptimizer
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """Generator working in an empty directory with AI optimization disabled."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    return ftg.FinalThumbnailGenerator()
+
+
+class TestOutputModes:
+    """Test file and in-memory outputs of generate_final_thumbnail."""
+
+    def test_bytes_mode_writes_nothing(self, generator, tmp_path):
+        """Test that output_mode='bytes' returns a YouTube-ready JPEG without touching disk."""
+        before = set(os.listdir(tmp_path))
+
+        data = generator.generate_final_thumbnail(title="Bytes Output", author="Tester", output_mode="bytes")
+
+        assert isinstance(data, bytes)
+        assert set(os.listdir(tmp_path)) == before
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == 'JPEG'
+            assert image.size == (1280, 720)
+
+    def test_image_mode_returns_pil_image(self, generator):
+        """Test that output_mode='image' returns the composited RGB image."""
+        image = generator.generate_final_thumbnail(title="Image Output", author="Tester",
+                                                   youtube_ready=False, output_mode="image")
+
+        assert isinstance(image, Image.Image)
+        assert image.mode == 'RGB'
+        assert image.size == (1600, 900)
+
+    def test_file_mode_leaves_no_temp_file(self, generator, tmp_path):
+        """Test that youtube_ready file output is written once with no temp original."""
+        output = str(tmp_path / "thumb.jpg")
+
+        result = generator.generate_final_thumbnail(title="File Output", author="Tester", output_path=output)
+
+        assert result == output
+        assert not os.path.exists(str(tmp_path / "thumb_temp_original.jpg"))
+        with Image.open(output) as image:
+            assert image.size == (1280, 720)
+
+    def test_unknown_output_mode_rejected(self, generator):
+        """Test that an unknown output mode raises ValueError."""
+        with pytest.raises(ValueError):
+            generator.generate_final_thumbnail(title="Bad", output_mode="png")
+
+
+class TestCompositing:
+    """Test layer compositing on the RGB canvas."""
+
+    def test_translucent_logo_blended_over_template(self, generator, tmp_path):
+        """Test that a translucent logo is blended once over the opaque template."""
+        logo = str(tmp_path / "logo.png")
+        Image.new('RGBA', (100, 100), (255, 0, 0, 128)).save(logo)
+
+        image = generator.generate_final_thumbnail(title="Alpha", theme="light", logo_path=logo,
+                                                   youtube_ready=False, output_mode="image")
+
+        r, g, b = image.getpixel((70, 70))
+        assert r == 255 and abs(g - 127) <= 1 and abs(b - 127) <= 1
+
+    def test_opaque_layers_loaded_without_alpha(self, generator, tmp_path):
+        """Test that opaque right images are cached as RGB and pasted without a mask."""
+        photo = str(tmp_path / "photo.png")
+        Image.new('RGBA', (400, 400), (0, 0, 255, 255)).save(photo)
+
+        image = generator.generate_final_thumbnail(title="Opaque", theme="light", right_image_path=photo,
+                                                   youtube_ready=False, output_mode="image")
+
+        assert generator._load_square_image(photo, 900).mode == 'RGB'
+        assert image.getpixel((1500, 450)) == (0, 0, 255)
+
+
+class TestRenderSize:
+    """Test native compositing at different 16:9 resolutions."""
+
+    def test_youtube_ready_composites_at_720p(self, generator):
+        """Test that youtube_ready renders natively at 1280x720."""
+        image = generator.generate_final_thumbnail(title="Native 720p", author="Tester", output_mode="image")
+        assert image.size == (1280, 720)
+
+    def test_explicit_4k_render_size(self, generator):
+        """Test compositing straight at 3840x2160."""
+        image = generator.generate_final_thumbnail(title="Native 4K", author="Tester", youtube_ready=False,
+                                                   render_size=(3840, 2160), output_mode="image")
+        assert image.size == (3840, 2160)
+
+    def test_non_16_9_render_size_rejected(self, generator):
+        """Test that render sizes that break the layout ratio raise ValueError."""
+        with pytest.raises(ValueError):
+            generator.generate_final_thumbnail(title="Square", render_size=(1000, 1000), output_mode="image")
+
+
+class TestPresetFanOut:
+    """Test compositing once and encoding several output presets."""
+
+    def test_all_presets_written(self, generator, tmp_path):
+        """Test that every preset is written at its own size from one composite."""
+        results = generator.generate_thumbnail_presets(title="Presets", author="Tester",
+                                                       output_dir=str(tmp_path), base_name="ep1")
+
+        assert list(results) == list(ThumbnailOptimizer.OUTPUT_PRESETS)
+        for preset, path in results.items():
+            assert path == str(tmp_path / f"ep1_{preset}.jpg")
+            with Image.open(path) as image:
+                assert image.size == ThumbnailOptimizer.OUTPUT_PRESETS[preset]['size']
+
+    def test_bytes_mode_composites_at_largest_preset(self, generator, monkeypatch):
+        """Test that the composite is rendered once at the largest requested preset size."""
+        calls = []
+        original = generator.generate_final_thumbnail
+
+        def spy(**kwargs):
+            calls.append(kwargs["render_size"])
+            return original(**kwargs)
+
+        monkeypatch.setattr(generator, "generate_final_thumbnail", spy)
+        results = generator.generate_thumbnail_presets(title="Bytes", presets=["social_share", "youtube_hd"],
+                                                       output_mode="bytes")
+
+        assert calls == [(1280, 720)]
+        with Image.open(io.BytesIO(results["social_share"])) as image:
+            assert image.size == (1080, 608)
+
+    def test_unknown_preset_rejected(self, generator):
+        """Test that unknown preset names raise ValueError before rendering."""
+        with pytest.raises(ValueError):
+            generator.generate_thumbnail_presets(title="Bad", presets=["poster"])
+
+
+class TestResourceManifest:
+    """Test memoized resource resolution and in-memory default templates."""
+
+    def setup_method(self):
+        ftg.clear_resource_manifest()
+
+    def test_lookup_is_memoized(self, monkeypatch):
+        """Test that repeated lookups are served from the manifest without filesystem access."""
+        first = ftg.get_resource_path("templates/light_template.png")
+
+        def no_filesystem(path):
+            raise AssertionError(f"unexpected filesystem access: {path}")
+
+        monkeypatch.setattr(ftg.os.path, "exists", no_filesystem)
+        assert ftg.get_resource_path("templates/light_template.png") == first
+
+    def test_default_templates_not_written_to_cwd(self, generator, tmp_path):
+        """Test that rendering with the default templates leaves the working directory untouched."""
+        for theme in ("dark", "light"):
+            generator.generate_final_thumbnail(title="No Files", theme=theme, output_mode="image")
+
+        assert os.listdir(tmp_path) == []
+
+    def test_builtin_templates_synthesized_in_memory(self, generator):
+        """Test that missing default templates are synthesized as solid backgrounds."""
+        dark = generator._load_template(ftg.get_resource_path("templates/professional_template.jpg"))
+        light = generator._load_template(ftg.get_resource_path("templates/light_template.png"))
+
+        assert dark.getpixel((10, 10)) == (0, 0, 0)
+        assert light.getpixel((10, 10)) == (255, 255, 255)
+
+    def test_missing_custom_template_rejected(self, tmp_path):
+        """Test that a missing non-default template raises instead of creating files."""
+        with pytest.raises(FileNotFoundError):
+            ftg.FinalThumbnailGenerator(str(tmp_path / "missing.jpg"))
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import pytest
+from PIL import ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import font_registry
+from youtube_thumbnail_generator.font_registry import FontRegistry
+
+
+@pytest.fixture
+def font_path():
+    path = FontRegistry().find_font_path("english")
+    if path is None:
+        pytest.skip("no TrueType font installed")
+    return path
+
+
+class TestFontRegistry:
+    """Test font discovery and the FreeType font object cache."""
+
+    def test_font_objects_cached_by_path_size_index(self, font_path):
+        """Test that the same (path, size, index) returns one shared font object."""
+        registry = FontRegistry()
+
+        first = registry.get_font(font_path, 40)
+        second = registry.get_font(font_path, 40)
+        other_size = registry.get_font(font_path, 41)
+
+        assert first is second
+        assert other_size is not first
+        assert other_size.size == 41
+        info = registry.cache_info()
+        assert info.hits == 1
+        assert info.misses == 2
+
+    def test_discovery_runs_once(self, font_path, monkeypatch):
+        """Test that font discovery does not touch the filesystem after the first lookup."""
+        registry = FontRegistry()
+        registry.find_font_path("english")
+
+        def no_filesystem(path):
+            raise AssertionError(f"unexpected filesystem access: {path}")
+
+        monkeypatch.setattr(font_registry.os.path, "exists", no_filesystem)
+        assert registry.find_font_path("english") == font_path
+        assert registry.get_best_font("english", 30).size == 30
+
+    def test_least_recently_used_font_evicted(self, font_path):
+        """Test that the cache is bounded by max_fonts."""
+        registry = FontRegistry(max_fonts=2)
+        for size in (10, 20, 30):
+            registry.get_font(font_path, size)
+
+        info = registry.cache_info()
+        assert info.entries == 2
+        assert info.evictions == 1
+
+    def test_missing_fonts_fall_back_to_default(self, monkeypatch):
+        """Test that the default font is used when no candidate is installed."""
+        monkeypatch.setattr(font_registry, "font_candidates", lambda language: [])
+        registry = FontRegistry()
+
+        font = registry.get_best_font("chinese", 40)
+
+        assert isinstance(font, (ImageFont.ImageFont, ImageFont.FreeTypeFont))
+        assert registry.find_font_path("chinese") is None
+
+    def test_concurrent_lookups_share_fonts(self, font_path):
+        """Test that worker threads get consistent shared font objects."""
+        registry = FontRegistry()
+        results = []
+
+        def worker():
+            results.append([registry.get_best_font("english", size) for size in (24, 36, 48)])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for size_index in range(3):
+            sizes = {fonts[size_index].size for fonts in results}
+            assert len(sizes) == 1
+        assert registry.cache_info().entries == 3
+
+    def test_preload_caches_requested_sizes(self, font_path):
+        """Test that preload loads every size once so later lookups are cache hits."""
+        registry = FontRegistry()
+
+        loaded = registry.preload(languages=("english",), sizes=(30, 45))
+        registry.get_best_font("english", 45)
+
+        assert loaded == 2
+        info = registry.cache_info()
+        assert info.entries == 2
+        assert info.hits == 1
+
+    def test_fonts_opened_by_path(self, font_path):
+        """Test that fonts are loaded from the file path so FreeType maps the file instead of copying it."""
+        font = FontRegistry().get_font(font_path, 40)
+
+        assert font.path == font_path
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator.image_cache import ImageCache, image_nbytes
+from youtube_thumbnail_generator import final_thumbnail_generator as ftg
+
+
+class TestImageCache:
+    """Test cases for the byte-budgeted LRU image cache."""
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted as hits or misses."""
+        cache = ImageCache(max_bytes=10 * 1024 * 1024)
+        image = Image.new('RGBA', (10, 10))
+
+        assert cache.get("a") is None
+        cache.put("a", image)
+        assert cache.get("a") is image
+
+        info = cache.cache_info()
+        assert info.hits == 1
+        assert info.misses == 1
+        assert info.entries == 1
+        assert info.current_bytes == image_nbytes(image) == 400
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """Test that least recently used entries are evicted beyond the budget."""
+        cache = ImageCache(max_bytes=1000)
+        for key in ("a", "b"):
+            cache.put(key, Image.new('RGBA', (10, 10)))  # 400 bytes each
+
+        cache.get("a")  # "b" becomes least recently used
+        cache.put("c", Image.new('RGBA', (10, 10)))
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.cache_info().evictions == 1
+        assert cache.cache_info().current_bytes <= 1000
+
+    def test_oversized_entry_is_not_cached(self):
+        """Test that a single entry larger than the budget is skipped."""
+        cache = ImageCache(max_bytes=100)
+        cache.put("big", Image.new('RGBA', (10, 10)))
+        assert len(cache) == 0
+
+    def test_get_or_create_returns_private_copy(self):
+        """Test that copy=True protects the cached image from mutation."""
+        cache = ImageCache(max_bytes=10 * 1024 * 1024)
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return Image.new('RGB', (4, 4), (0, 0, 0))
+
+        first = cache.get_or_create("k", factory, copy=True)
+        first.putpixel((0, 0), (255, 0, 0))
+        second = cache.get_or_create("k", factory, copy=True)
+
+        assert len(calls) == 1
+        assert second.getpixel((0, 0)) == (0, 0, 0)
+
+
+class TestTemplateCache:
+    """Test template decoding through the generator's template cache."""
+
+    def setup_method(self):
+        ftg._template_cache.clear()
+
+    def test_template_decoded_once(self, tmp_path):
+        """Test that repeated loads of one template hit the cache."""
+        path = tmp_path / "template.png"
+        Image.new('RGB', (1600, 900), (10, 20, 30)).save(path)
+        generator = ftg.FinalThumbnailGenerator(str(path))
+
+        first = generator._load_template(str(path))
+        second = generator._load_template(str(path))
+
+        assert first.mode == 'RGB'
+        assert first is not second
+        info = ftg.cache_info()["templates"]
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_modified_template_is_reloaded(self, tmp_path):
+        """Test that rewriting the template file invalidates the cached copy."""
+        path = tmp_path / "template.png"
+        Image.new('RGB', (1600, 900), (0, 0, 0)).save(path)
+        generator = ftg.FinalThumbnailGenerator(str(path))
+        generator._load_template(str(path))
+
+        Image.new('RGB', (1600, 900), (255, 255, 255)).save(path)
+        future = time.time() + 10
+        os.utime(path, (future, future))
+
+        reloaded = generator._load_template(str(path))
+        assert reloaded.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_custom_template_resized_once(self, tmp_path):
+        """Test that templates are normalised to the render size before caching."""
+        path = tmp_path / "custom.jpg"
+        Image.new('RGB', (800, 600), (50, 50, 50)).save(path)
+        generator = ftg.FinalThumbnailGenerator(str(path))
+
+        template = generator._load_template(str(path), (1600, 900))
+        assert template.size == (1600, 900)
+        generator._load_template(str(path), (1600, 900))
+        assert ftg.cache_info()["templates"].hits == 1
+
+        assert generator._load_template(str(path), (1280, 720)).size == (1280, 720)
+        assert ftg.cache_info()["templates"].misses == 2
+
+    def test_unreadable_template_raises(self, tmp_path):
+        """Test that a template that cannot be decoded raises instead of caching None."""
+        path = tmp_path / "broken.png"
+        path.write_bytes(b"not an image")
+        generator = ftg.FinalThumbnailGenerator(str(path))
+
+        with pytest.raises(ValueError, match="Cannot load template"):
+            generator._load_template(str(path))
+        assert len(ftg._template_cache) == 0
+
+
+class TestTriangleOverlay:
+    """Test procedural, memoized triangle overlays."""
+
+    def setup_method(self):
+        ftg._overlay_cache.clear()
+
+    def test_overlay_matches_generated_template(self, tmp_path):
+        """Test that the in-memory overlay matches the PNG written by generate_triangle_template."""
+        path = ftg.generate_triangle_template("white", "top", str(tmp_path / "triangle.png"))
+        overlay = ftg.get_triangle_overlay("white", "top", flip=False)
+
+        with Image.open(path) as saved:
+            assert saved.convert('RGBA').tobytes() == overlay.tobytes()
+
+    def test_overlay_built_once_per_key(self):
+        """Test that repeated requests share one overlay and flips are cached separately."""
+        first = ftg.get_triangle_overlay("black", "bottom", flip=True)
+        second = ftg.get_triangle_overlay("black", "bottom", flip=True)
+        unflipped = ftg.get_triangle_overlay("black", "bottom", flip=False)
+
+        assert first is second
+        assert first.getpixel((first.width - 1, 0))[3] == 255
+        assert unflipped.getpixel((0, 0))[3] == 255
+        info = ftg.cache_info()["overlays"]
+        assert info.hits == 1
+        assert info.misses == 2
+
+
+class TestSquareImageLoading:
+    """Test decode-to-target loading of right images and logos."""
+
+    def test_large_jpeg_is_scaled_to_cover_target(self, tmp_path):
+        """Test that a large landscape JPEG is cropped to its centre square and scaled down."""
+        path = tmp_path / "photo.jpg"
+        photo = Image.new('RGB', (4000, 2000), (255, 0, 0))
+        photo.paste((0, 0, 255), (1000, 0, 3000, 2000))  # centre square is blue
+        photo.save(path, quality=95)
+        generator = ftg.FinalThumbnailGenerator.__new__(ftg.FinalThumbnailGenerator)
+
+        square = generator._load_square_image(str(path), 900)
+
+        assert square.size == (900, 900)
+        assert square.mode == 'RGB'
+        r, g, b = square.getpixel((450, 450))
+        assert b > 200 and r < 50
+
+    def test_logo_with_alpha_keeps_transparency(self, tmp_path):
+        """Test that logos are shrunk to LOGO_SIZE while keeping their alpha channel."""
+        path = tmp_path / "logo.png"
+        Image.new('RGBA', (600, 600), (0, 0, 0, 0)).save(path)
+        generator = ftg.FinalThumbnailGenerator.__new__(ftg.FinalThumbnailGenerator)
+
+        logo = generator._preprocess_logo(str(path))
+
+        assert logo.size == (ftg.LOGO_SIZE, ftg.LOGO_SIZE)
+        assert logo.getpixel((50, 50))[3] == 0
+
+    def test_logo_preprocessed_once(self, tmp_path):
+        """Test that repeated logo preprocessing is served from the source image cache."""
+        ftg._source_image_cache.clear()
+        path = tmp_path / "logo.png"
+        Image.new('RGBA', (300, 300), (255, 0, 0, 255)).save(path)
+        generator = ftg.FinalThumbnailGenerator.__new__(ftg.FinalThumbnailGenerator)
+
+        first = generator._preprocess_logo(str(path))
+        second = generator._preprocess_logo(str(path))
+        editable = generator._load_square_image(str(path), ftg.LOGO_SIZE, copy=True)
+
+        assert first is second
+        assert editable is not first
+        info = ftg.cache_info()["source_images"]
+        assert info.misses == 1
+        assert info.hits == 2
+
+
+class TestTextSpriteCache:
+    """Test the rendered text sprite cache."""
+
+    def setup_method(self):
+        ftg._text_sprite_cache.clear()
+
+    def test_same_text_rendered_once(self, monkeypatch):
+        """Test that identical create_text_sprite arguments rasterize only once."""
+        calls = []
+        original = ftg.create_text_sprite
+        monkeypatch.setattr(ftg, "create_text_sprite", lambda **kwargs: calls.append(kwargs) or original(**kwargs))
+
+        first = ftg.render_text_sprite(text="CHANNEL", width=400, height=60, language='english')
+        second = ftg.render_text_sprite(language='english', height=60, width=400, text="CHANNEL")
+
+        assert first is second
+        assert len(calls) == 1
+
+    def test_any_parameter_changes_key(self):
+        """Test that color, alignment and scale produce distinct sprites."""
+        base = dict(text="CHANNEL", width=400, height=60, language='english')
+        ftg.render_text_sprite(**base)
+        ftg.render_text_sprite(**base, text_color=(0, 0, 0))
+        ftg.render_text_sprite(**base, align='right')
+        ftg.render_text_sprite(**base, scale=0.8)
+
+        assert ftg.cache_info()["text_sprites"].entries == 4
+
+    def test_repeated_author_served_from_cache(self, tmp_path, monkeypatch):
+        """Test that a second thumbnail reuses the title and author sprites."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        generator = ftg.FinalThumbnailGenerator()
+
+        for _ in range(2):
+            generator.generate_final_thumbnail(title="Series Title", author="Channel", output_mode="image")
+
+        info = ftg.cache_info()["text_sprites"]
+        assert info.misses == 2
+        assert info.hits == 2
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _run(code):
+    """Run code in a fresh interpreter and return its JSON output."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestLazyImport:
+    """Guard the cost of importing the package."""
+
+    def test_import_does_not_load_heavy_modules(self):
+        """Test that importing the package loads neither Pillow, the renderer nor Gemini."""
+        modules = _run("import sys, json, youtube_thumbnail_generator; print(json.dumps(sorted(sys.modules)))")
+
+        assert "PIL.Image" not in modules
+        assert "youtube_thumbnail_generator.final_thumbnail_generator" not in modules
+        assert "google.generativeai" not in modules
+
+    def test_import_does_not_configure_logging(self):
+        """Test that the title optimizer leaves the root logger alone."""
+        handlers = _run("import json, logging, youtube_thumbnail_generator.title_optimizer; "
+                        "print(json.dumps(len(logging.getLogger().handlers)))")
+        assert handlers == 0
+
+    def test_public_names_resolve_lazily(self):
+        """Test that every name in __all__ resolves on access."""
+        import youtube_thumbnail_generator as package
+
+        for name in package.__all__:
+            assert getattr(package, name) is not None
+        assert set(package.__all__) <= set(dir(package))
+
+    def test_generator_without_key_does_not_import_gemini(self):
+        """Test that creating a generator with AI disabled does not import google.generativeai."""
+        modules = _run("import os, sys, json\n"
+                       "os.environ.pop('GEMINI_API_KEY', None); os.environ.pop('GOOGLE_API_KEY', None)\n"
+                       "from youtube_thumbnail_generator.title_optimizer import TitleOptimizer\n"
+                       "TitleOptimizer()\n"
+                       "print(json.dumps(sorted(sys.modules)))")
+        assert "google.generativeai" not in modules
+
+    def test_generator_import_does_not_load_asyncio(self):
+        """Test that the synchronous render path does not pay for importing asyncio."""
+        modules = _run("import sys, json\n"
+                       "from youtube_thumbnail_generator import FinalThumbnailGenerator\n"
+                       "print(json.dumps(sorted(sys.modules)))")
+        assert "asyncio" not in modules
@@ -0,0 +1,150 @@
+import io
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import final_thumbnail_generator as ftg
+from youtube_thumbnail_generator.function_add_chapter import add_chapter_to_image
+from youtube_thumbnail_generator.render_profile import RenderProfile
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """Generator working in an empty directory with AI optimization disabled."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    return ftg.FinalThumbnailGenerator()
+
+
+class TestRenderProfile:
+    """Test the lap-based render profile."""
+
+    def test_laps_add_up_to_total(self):
+        """Test that stage times and image bytes are recorded per lap."""
+        from PIL import Image
+        profile = RenderProfile()
+
+        profile.lap("first", Image.new('RGBA', (10, 10)))
+        profile.lap("second")
+        profile.finish()
+
+        assert [stage.name for stage in profile.stages] == ["first", "second"]
+        assert profile.image_bytes == 400
+        assert sum(stage.seconds for stage in profile.stages) <= profile.total_seconds
+
+
+class TestGenerateWithProfile:
+    """Test profiles returned by generate_final_thumbnail and add_chapter_to_image."""
+
+    def test_profile_returned_with_bytes(self, generator, tmp_path):
+        """Test that return_profile adds a profile covering every render stage."""
+        from PIL import Image
+        logo, photo = str(tmp_path / "logo.png"), str(tmp_path / "photo.jpg")
+        Image.new('RGBA', (200, 200), (255, 0, 0, 255)).save(logo)
+        Image.new('RGB', (1200, 800), (0, 0, 255)).save(photo)
+
+        data, profile = generator.generate_final_thumbnail(title="Profiled", author="Tester",
+                                                           logo_path=logo, right_image_path=photo,
+                                                           output_mode="bytes", return_profile=True)
+
+        names = [stage.name for stage in profile.stages]
+        for stage in ("template", "right_image", "logo", "title_ai", "title_text", "author_text",
+                      "composite", "encode"):
+            assert stage in names
+        assert profile.encode_attempts >= 1
+        assert profile.output_bytes == len(data)
+        assert set(profile.cache_hits) == {"templates", "overlays", "source_images", "text_sprites", "fonts"}
+        json.dumps(profile.to_dict())
+
+    def test_decoded_images_counted_only_on_miss(self, generator, tmp_path):
+        """Test that right image and logo buffers are counted when decoded, not when served from cache."""
+        from PIL import Image
+        logo, photo = str(tmp_path / "logo.png"), str(tmp_path / "photo.jpg")
+        Image.new('RGBA', (200, 200), (255, 0, 0, 255)).save(logo)
+        Image.new('RGB', (1200, 800), (0, 0, 255)).save(photo)
+
+        def stage_bytes():
+            _, profile = generator.generate_final_thumbnail(title="Alloc", logo_path=logo, right_image_path=photo,
+                                                            output_mode="image", return_profile=True)
+            return {stage.name: stage.image_bytes for stage in profile.stages}
+
+        cold, warm = stage_bytes(), stage_bytes()
+
+        assert cold["right_image"] == 720 * 720 * 3
+        assert cold["logo"] > 0
+        assert warm["right_image"] == warm["logo"] == 0
+
+    def test_cached_text_sprites_not_counted(self, generator):
+        """Test that title and author masks count as allocations only when rasterized."""
+        ftg._text_sprite_cache.clear()
+
+        def stage_bytes():
+            _, profile = generator.generate_final_thumbnail(title="Sprite Bytes", author="Counter",
+                                                            output_mode="image", return_profile=True)
+            return {stage.name: stage.image_bytes for stage in profile.stages}
+
+        cold, warm = stage_bytes(), stage_bytes()
+
+        assert cold["title_text"] > 0 and cold["author_text"] > 0
+        assert warm["title_text"] == warm["author_text"] == 0
+
+    def test_warm_render_hits_caches(self, generator):
+        """Test that a second render reports cache hits instead of misses."""
+        generator.generate_final_thumbnail(title="Warm", output_mode="image")
+        _, profile = generator.generate_final_thumbnail(title="Warm", output_mode="image", return_profile=True)
+
+        assert profile.cache_hits["templates"] == {"hits": 1, "misses": 0}
+
+    def test_jpeg_options_reach_encoder(self, generator):
+        """Test that subsampling chosen on generate_final_thumbnail is used and recorded."""
+        from PIL import Image
+        data, profile = generator.generate_final_thumbnail(title="Chroma", output_mode="bytes",
+                                                           jpeg_subsampling="4:4:4", return_profile=True)
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.layer[0][1:3] == decoded.layer[1][1:3]
+        assert profile.to_dict()["encode_subsampling"] == "4:4:4"
+
+    def test_optimize_for_youtube_api_returns_encode_result(self, tmp_path):
+        """Test that the public optimizer accepts encoder options and can return the encode result."""
+        from PIL import Image
+        source = str(tmp_path / "source.png")
+        Image.new('RGB', (1600, 900), (30, 60, 90)).save(source)
+
+        path, encoded = ftg.optimize_for_youtube_api(source, str(tmp_path / "out.jpg"), subsampling="4:4:4",
+                                                     qtables="web_high", return_result=True)
+
+        assert os.path.getsize(path) == encoded.size
+        assert encoded.fits and encoded.attempts == 1
+        assert encoded.subsampling == "4:4:4"
+
+    def test_default_return_value_unchanged(self, generator):
+        """Test that the result is not wrapped when return_profile is False."""
+        assert isinstance(generator.generate_final_thumbnail(title="Plain", output_mode="bytes"), bytes)
+
+    def test_add_chapter_profile(self, tmp_path):
+        """Test that add_chapter_to_image reports its stages alongside the usual result."""
+        output = str(tmp_path / "chapter.png")
+
+        success, path, profile = add_chapter_to_image("Chapter One", output_path=output,
+                                                      language='english', return_profile=True)
+
+        assert success and path == output
+        assert [stage.name for stage in profile.stages] == ["load", "font", "layout", "draw", "save"]
+        assert profile.stages[0].image_bytes == 1600 * 900 * 3
+
+    def test_add_chapter_reports_cache_hits(self, tmp_path):
+        """Test that a repeated chapter render reports font and metrics cache hits."""
+        output = str(tmp_path / "chapter.png")
+        add_chapter_to_image("Chapter One", output_path=output, language='english')
+
+        *_, profile = add_chapter_to_image("Chapter One", output_path=output, language='english',
+                                           return_profile=True)
+
+        assert set(profile.cache_hits) == {"fonts", "text_metrics"}
+        assert profile.cache_hits["fonts"]["misses"] == 0
+        assert profile.cache_hits["text_metrics"]["hits"] >= 1
@@ -0,0 +1,96 @@
+import os
+import sys
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator.font_registry import FontRegistry
+from youtube_thumbnail_generator.text_effects import dilate, draw_text_effects, text_mask
+
+
+@pytest.fixture
+def font():
+    path = FontRegistry().find_font_path("english")
+    if path is None:
+        pytest.skip("no TrueType font installed")
+    return FontRegistry().get_font(path, 64)
+
+
+def same(a, b):
+    return ImageChops.difference(a, b).getbbox() is None
+
+
+class TestTextMask:
+    """Test single-pass glyph mask rasterization."""
+
+    @pytest.mark.parametrize("xy", [(10, 20), (33.7, 12.25), (101.5, 0.9)])
+    def test_mask_matches_draw_text(self, font, xy):
+        """Test that the mask pasted at its position equals ImageDraw.text coverage."""
+        text = "jQuery Hgy"
+        expected = Image.new('L', (800, 150))
+        ImageDraw.Draw(expected).text(xy, text, font=font, fill=255)
+
+        mask, position = text_mask(text, font, xy, pad=3)
+        actual = Image.new('L', (800, 150))
+        actual.paste(mask, position)
+
+        assert same(actual, expected)
+
+    def test_mask_limited_to_bounding_box(self, font):
+        """Test that the mask only covers the text bounding box plus padding."""
+        left, top, right, bottom = font.getbbox("Title")
+
+        mask, _ = text_mask("Title", font, (0, 0), pad=4)
+
+        assert mask.width <= right - left + 2 * 5
+        assert mask.height <= bottom - top + 2 * 5
+
+
+class TestDilate:
+    """Test the separable square dilation."""
+
+    @pytest.mark.parametrize("radius", [1, 2, 3, 5, 8])
+    def test_matches_max_filter(self, font, radius):
+        """Test that dilation equals a (2r+1) MaxFilter."""
+        mask, _ = text_mask("Stroke", font, (0, 0), pad=radius)
+
+        assert same(dilate(mask, radius), mask.filter(ImageFilter.MaxFilter(2 * radius + 1)))
+
+
+class TestDrawTextEffects:
+    """Test compositing of shadow, stroke and glow layers."""
+
+    def test_shadow_matches_two_text_passes(self, font):
+        """Test that the shadow equals drawing the text again at the offset."""
+        expected = Image.new('RGB', (600, 150), (20, 40, 60))
+        draw = ImageDraw.Draw(expected)
+        draw.text((15, 12), "Chapter", font=font, fill=(0, 0, 0))
+        draw.text((10, 7), "Chapter", font=font, fill=(255, 255, 255))
+
+        actual = Image.new('RGB', (600, 150), (20, 40, 60))
+        draw_text_effects(ImageDraw.Draw(actual), (10, 7), "Chapter", font, fill=(255, 255, 255),
+                          shadow_offset=(5, 5), shadow_color=(0, 0, 0))
+
+        assert same(actual, expected)
+
+    def test_stroke_surrounds_text(self, font):
+        """Test that the stroke extends the text's ink by stroke_width on every side."""
+        plain = Image.new('L', (600, 150), 0)
+        draw_text_effects(ImageDraw.Draw(plain), (20, 20), "I", font, fill=255)
+        stroked = Image.new('L', (600, 150), 0)
+        draw_text_effects(ImageDraw.Draw(stroked), (20, 20), "I", font, fill=255, stroke_width=4, stroke_fill=128)
+
+        ink, outline = plain.getbbox(), stroked.getbbox()
+        assert outline == (ink[0] - 4, ink[1] - 4, ink[2] + 4, ink[3] + 4)
+        assert stroked.getpixel((ink[0] - 2, (ink[1] + ink[3]) // 2)) == 128
+
+    def test_glow_extends_beyond_outline(self, font):
+        """Test that the glow is drawn around the text and fades out."""
+        image = Image.new('L', (400, 200), 0)
+        draw_text_effects(ImageDraw.Draw(image), (100, 50), "O", font, fill=255, glow_radius=6, glow_color=128)
+
+        glyph = font.getbbox("O")
+        box = image.getbbox()
+        assert box[0] < 100 + glyph[0]
+        assert 0 < image.getpixel((box[0] + 2, (box[1] + box[3]) // 2)) < 128
@@ -0,0 +1,124 @@
+import os
+import sys
+import pytest
+from PIL import ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator.font_registry import FontRegistry
+from youtube_thumbnail_generator.text_metrics import (fit_ellipsis, get_text_metrics, text_width, wrap_chars,
+                                                      wrap_words)
+
+SAMPLES = ["Build Faster Python Apps", "AVATAR Toyota WAVE", "Yo, T. LaVa", "人工智能 AV", "", "x"]
+
+
+@pytest.fixture
+def font():
+    path = FontRegistry().find_font_path("english")
+    if path is None:
+        pytest.skip("no TrueType font installed")
+    return ImageFont.truetype(path, 45)
+
+
+def reference_wrap(words, font, max_width):
+    """The original prefix-measuring greedy wrap."""
+    lines = []
+    current_line = ""
+    for word in words:
+        test_line = current_line + (" " if current_line else "") + word
+        if font.getlength(test_line) <= max_width:
+            current_line = test_line
+        elif current_line:
+            lines.append(current_line)
+            current_line = word
+        else:
+            lines.append(word)
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+class TestTextMetrics:
+    """Test cached glyph advance and kerning measurement."""
+
+    def test_width_matches_getlength(self, font):
+        """Test that cached widths, including kerning pairs, equal font.getlength exactly."""
+        for text in SAMPLES:
+            assert text_width(font, text) == font.getlength(text)
+
+    def test_extend_matches_full_measurement(self, font):
+        """Test that extending a measured line only adds the suffix and its joining kerning pair."""
+        metrics = get_text_metrics(font)
+        width = metrics.width("WAVE")
+
+        assert metrics.extend("WAVE", width, " AV") == font.getlength("WAVE AV")
+
+    def test_glyphs_measured_once(self, font, monkeypatch):
+        """Test that repeated measurement is served from the glyph cache."""
+        text_width(font, "Cached Line")
+        calls = []
+        original = font.getlength
+        monkeypatch.setattr(font, "getlength", lambda text, *args, **kwargs: calls.append(text) or original(text))
+
+        text_width(font, "Cached Line")
+        text_width(font, "Line")
+        assert calls == []
+
+        text_width(font, "LineCached")
+        assert calls == ["eC"]
+
+    def test_metrics_shared_per_font(self, font):
+        """Test that one metrics object is kept per font object."""
+        assert get_text_metrics(font) is get_text_metrics(font)
+
+
+class TestWrapping:
+    """Test linear word and character wrapping."""
+
+    @pytest.mark.parametrize("max_width", [0, 100, 300, 510, 5000])
+    def test_wrap_words_matches_prefix_measurement(self, font, max_width):
+        """Test that wrapping gives the same lines as measuring every growing prefix."""
+        words = "Build Faster Python Apps With Async IO And Supercalifragilistic  Caching".split(" ")
+
+        assert wrap_words(words, font, max_width) == reference_wrap(words, font, max_width)
+
+    def test_wrap_chars_breaks_before_overflow(self, font):
+        """Test that character wrapping keeps every line within the width."""
+        text = "人工智能改变世界的十大技术趋势与未来展望"
+        max_width = font.getlength(text[:5])
+
+        lines = wrap_chars(text, font, max_width)
+
+        assert "".join(lines) == text
+        assert all(font.getlength(line) <= max_width for line in lines)
+
+    def test_wrap_chars_empty_first_line(self, font):
+        """Test that an overflowing first character yields an empty line only when requested."""
+        assert wrap_chars("AB", font, 1) == ["", "A", "B"]
+        assert wrap_chars("AB", font, 1, keep_empty=False) == ["A", "B"]
+
+
+class TestEllipsis:
+    """Test the bisection search for the ellipsis cut point."""
+
+    @pytest.mark.parametrize("max_width", [0, 50, 200, 333, 10000])
+    def test_longest_fitting_prefix(self, font, max_width):
+        """Test that the cut keeps the longest prefix that fits with the ellipsis."""
+        text = "And Smart Caching For Real World"
+
+        result = fit_ellipsis(text, font, max_width)
+
+        fitting = [k for k in range(len(text) + 1) if font.getlength(text[:k] + "...") <= max_width]
+        assert result == (text[:max(fitting)] + "..." if fitting else "...")
+
+    def test_bounded_measurements(self, font, monkeypatch):
+        """Test that a warm cache finds the cut without any FreeType measurement."""
+        text = "And Smart Caching For Real World"
+        fit_ellipsis(text, font, 200)
+        calls = []
+        original = font.getlength
+        monkeypatch.setattr(font, "getlength", lambda text, *args, **kwargs: calls.append(text) or original(text))
+
+        fit_ellipsis(text, font, 200)
+
+        assert calls == []
@@ -0,0 +1,108 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import text_png_generator
+from youtube_thumbnail_generator.font_registry import FontRegistry
+
+
+@pytest.fixture(autouse=True)
+def truetype_font():
+    if FontRegistry().find_font_path("english") is None:
+        pytest.skip("no TrueType font installed")
+
+
+class TestFontFit:
+    """Test the font size solver used when text is too tall for its box."""
+
+    def test_largest_fitting_size(self):
+        """Test that the solver returns the largest size whose wrapped lines fit the height."""
+        size, font, lines, line_height = text_png_generator._fit_font_size(
+            "Custom stroke", "english", True, 510, 120, 90)
+
+        assert len(lines) * line_height <= 120
+        _, _, bigger_lines, bigger_height = text_png_generator._fit_font_size(
+            "Custom stroke", "english", True, 510, 10000, size + 1)
+        assert len(bigger_lines) * bigger_height > 120
+        assert font.size == size
+
+    def test_deterministic(self):
+        """Test that repeated solves give identical results."""
+        first = text_png_generator._fit_font_size("Build Faster Python Apps", "english", True, 300, 150, 90)
+        second = text_png_generator._fit_font_size("Build Faster Python Apps", "english", True, 300, 150, 90)
+
+        assert first[0] == second[0]
+        assert first[2] == second[2]
+
+    def test_overflowing_text_shrinks_to_fit(self):
+        """Test that create_text_png keeps the shrunk text within the available height."""
+        success, image, height = text_png_generator.create_text_png(
+            "Custom stroke", width=550, height=280, language="english", auto_height=True)
+
+        assert success
+        assert image.getbbox()[3] <= height
+
+
+class TestTruncation:
+    """Test line truncation with an ellipsis."""
+
+    def test_last_line_fits_with_ellipsis(self):
+        """Test that the kept last line plus ellipsis fits the width."""
+        font = FontRegistry().get_best_font("english", 45)
+        lines = ["Build Faster Python", "Apps With Async IO", "And Smart Caching For Real", "World"]
+
+        truncated = text_png_generator._truncate_lines(lines, 3, font, 510, 45)
+
+        assert truncated[:2] == lines[:2]
+        assert truncated[2].endswith("...")
+        assert font.getlength(truncated[2]) <= 510
+        assert font.getlength(lines[2][:len(truncated[2]) - 2] + "...") > 510
+
+
+class TestTextSprite:
+    """Test ink-cropped mask sprites."""
+
+    def test_mask_cropped_to_ink(self):
+        """Test that the sprite allocates only an ink-sized 8-bit mask inside the text box."""
+        sprite = text_png_generator.create_text_sprite("Title", width=550, height=280, language="english",
+                                                        auto_height=True)
+
+        mask = sprite.masks[0]
+        assert mask.mode == 'L'
+        assert sprite.size == (550, 160)
+        assert mask.width < sprite.width and mask.height < sprite.height
+        assert sprite.nbytes == mask.width * mask.height
+
+    def test_stroke_adds_layer_below_text(self):
+        """Test that stroked text has a stroke mask composited before the text mask."""
+        sprite = text_png_generator.create_text_sprite("Title", width=550, height=280, language="english",
+                                                        auto_height=True, use_stroke=True,
+                                                        text_color=(255, 255, 255))
+
+        assert [color for _, color in sprite.layers] == [(128, 128, 128), (255, 255, 255)]
+
+    def test_to_image_matches_create_text_png(self):
+        """Test that create_text_png returns the sprite composited on a transparent box."""
+        kwargs = dict(text="Two Lines Of Title Text Here", width=550, height=280, language="english",
+                      auto_height=True)
+        sprite = text_png_generator.create_text_sprite(**kwargs)
+        success, image, height = text_png_generator.create_text_png(**kwargs)
+
+        assert success
+        assert height == sprite.height
+        assert image.tobytes() == sprite.to_image().tobytes()
+
+    def test_paste_keeps_background_opaque(self):
+        """Test that compositing applies color through the mask without punching alpha holes."""
+        from PIL import Image
+
+        background = Image.new('RGBA', (600, 200), (255, 255, 255, 255))
+        sprite = text_png_generator.create_text_sprite("Title", width=550, height=160, language="english",
+                                                        text_color=(0, 0, 0))
+
+        sprite.paste_onto(background, (10, 10))
+
+        assert background.getchannel('A').getextrema() == (255, 255)
+        assert background.convert('L').getextrema()[0] == 0
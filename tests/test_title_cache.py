@@ -0,0 +1,179 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import title_cache
+from youtube_thumbnail_generator.title_cache import TitleCache, title_cache_key
+from youtube_thumbnail_generator.title_optimizer import CACHE_PROMPT, GEMINI_FLASH_MODEL, TitleOptimizer
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Local stand-in for the Gemini model that records every request."""
+
+    def __init__(self, reply="Optimized\\nTitle"):
+        self.reply = reply
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        self.prompts.append(prompt)
+        return FakeResponse(self.reply)
+
+
+def make_optimizer(cache_dir, model=None):
+    optimizer = TitleOptimizer(api_key="test-key", cache_dir=str(cache_dir))
+    optimizer.model = model or FakeModel()
+    return optimizer
+
+
+class TestTitleCache:
+    """Test the SQLite title cache."""
+
+    def test_round_trip_across_instances(self, tmp_path):
+        """Test that a title stored by one cache instance is served to another (another process)."""
+        key = title_cache_key("My Title", "en", None, "model-a", "prompt")
+        TitleCache(str(tmp_path)).put(key, "My Title", "My\\nTitle")
+
+        other = TitleCache(str(tmp_path))
+
+        assert other.get(key) == "My\\nTitle"
+        assert other.cache_info().hits == 1
+
+    def test_key_covers_languages_model_and_prompt(self):
+        """Test that changing any request component yields a different key."""
+        base = title_cache_key("Title", "en", "zh", "model-a", "prompt")
+
+        assert base == title_cache_key("Title", "en", "zh", "model-a", "prompt")
+        assert base != title_cache_key("Title", "en", None, "model-a", "prompt")
+        assert base != title_cache_key("Title", "zh", "zh", "model-a", "prompt")
+        assert base != title_cache_key("Title", "en", "zh", "model-b", "prompt")
+        assert base != title_cache_key("Title", "en", "zh", "model-a", "prompt v2")
+
+    def test_expired_entries_are_misses(self, tmp_path, monkeypatch):
+        """Test that entries older than the TTL are dropped on read."""
+        cache = TitleCache(str(tmp_path), ttl_seconds=60)
+        cache.put("key", "Title", "Optimized")
+
+        now = time.time()
+        monkeypatch.setattr(title_cache.time, "time", lambda: now + 61)
+
+        assert cache.get("key") is None
+        info = cache.cache_info()
+        assert (info.misses, info.evictions, info.entries) == (1, 1, 0)
+
+    def test_least_recently_used_evicted_beyond_max_entries(self, tmp_path, monkeypatch):
+        """Test that the entry count is capped by evicting the least recently used titles."""
+        clock = [1000.0]
+        monkeypatch.setattr(title_cache.time, "time", lambda: clock[0])
+        cache = TitleCache(str(tmp_path), max_entries=2, touch_interval=0, evict_interval=1)
+        for key in ("a", "b"):
+            clock[0] += 1
+            cache.put(key, key, key.upper())
+        clock[0] += 1
+        cache.get("a")  # a 比 b 更近被使用
+
+        clock[0] += 1
+        cache.put("c", "c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert cache.cache_info().entries == 2
+
+    def test_eviction_amortized_over_puts(self, tmp_path):
+        """Test that the size limit is enforced on the first put and then every evict_interval puts."""
+        cache = TitleCache(str(tmp_path), max_entries=1, evict_interval=3)
+        entries = []
+        for key in ("a", "b", "c", "d"):
+            cache.put(key, key, key.upper())
+            entries.append(cache.cache_info().entries)
+
+        assert entries == [1, 2, 3, 1]
+        assert cache.get("d") == "D"
+
+    def test_hits_refresh_access_time_coarsely(self, tmp_path, monkeypatch):
+        """Test that hits only write the access time once it is older than touch_interval."""
+        clock = [1000.0]
+        monkeypatch.setattr(title_cache.time, "time", lambda: clock[0])
+        cache = TitleCache(str(tmp_path), touch_interval=60)
+        cache.put("key", "Title", "Optimized")
+        connection = cache._connect()
+        writes = connection.total_changes
+
+        clock[0] += 30
+        assert cache.get("key") == "Optimized"
+        assert connection.total_changes == writes  # 只读命中
+
+        clock[0] += 31
+        assert cache.get("key") == "Optimized"
+        assert connection.total_changes == writes + 1
+        assert connection.execute("SELECT accessed_at FROM titles").fetchone()[0] == clock[0]
+
+    def test_unusable_directory_is_a_miss(self, tmp_path):
+        """Test that a cache directory that cannot be created degrades to misses."""
+        blocker = tmp_path / "file"
+        blocker.write_text("not a directory")
+        cache = TitleCache(str(blocker / "cache"))
+
+        cache.put("key", "Title", "Optimized")
+
+        assert cache.get("key") is None
+
+
+class TestOptimizerCaching:
+    """Test that TitleOptimizer reuses cached optimizations."""
+
+    def test_repeat_title_skips_model(self, tmp_path):
+        """Test that a repeated title is answered from the cache without a model call."""
+        model = FakeModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        first = optimizer.optimize_title("Learn Python编程 from Zero", source_language="en")
+        second = optimizer.optimize_title("Learn Python编程 from Zero", source_language="en")
+
+        assert first == second == ("Optimized\\nTitle", True)
+        assert len(model.prompts) == 1
+
+    def test_cache_shared_between_optimizers(self, tmp_path):
+        """Test that another optimizer (e.g. another worker) hits the same cache directory."""
+        make_optimizer(tmp_path).optimize_title("Shared Title")
+        model = FakeModel(reply="Different")
+
+        assert make_optimizer(tmp_path, model).optimize_title("Shared Title") == ("Optimized\\nTitle", True)
+        assert model.prompts == []
+
+    def test_language_change_is_not_a_hit(self, tmp_path):
+        """Test that a different target language triggers a new request."""
+        model = FakeModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        optimizer.optimize_title("Shared Title", source_language="en")
+        optimizer.optimize_title("Shared Title", source_language="en", target_language="zh")
+
+        assert len(model.prompts) == 2
+
+    def test_failures_not_cached(self, tmp_path):
+        """Test that empty responses fall back to the original title and are not stored."""
+        optimizer = make_optimizer(tmp_path, FakeModel(reply="  "))
+
+        assert optimizer.optimize_title("Some Title") == ("Some Title", False)
+        key = title_cache_key("Some Title", None, None, GEMINI_FLASH_MODEL, CACHE_PROMPT)
+        assert optimizer.cache.get(key) is None
+
+    def test_cache_can_be_disabled(self, tmp_path):
+        """Test that use_cache=False always calls the model."""
+        model = FakeModel()
+        optimizer = TitleOptimizer(api_key="test-key", cache_dir=str(tmp_path), use_cache=False)
+        optimizer.model = model
+
+        optimizer.optimize_title("Title")
+        optimizer.optimize_title("Title")
+
+        assert len(model.prompts) == 2
+        assert os.listdir(tmp_path) == []
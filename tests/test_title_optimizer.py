@@ -0,0 +1,667 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator import batch_generator
+from youtube_thumbnail_generator import final_thumbnail_generator as ftg
+from youtube_thumbnail_generator import title_optimizer
+from youtube_thumbnail_generator.title_optimizer import (BATCH_INSTRUCTIONS, BATCH_OPTIMIZATION_SYSTEM_PROMPT,
+                                                         BATCH_TIMEOUT_SECONDS, BATCH_TOKENS_PER_TITLE, CACHE_PROMPT,
+                                                         CircuitBreaker, LatencyTracker, TitleOptimizer, ai_status,
+                                                         batch_latency, estimate_tokens, gemini_breaker, plan_batches,
+                                                         request_latency)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeBatchModel:
+    """Local stand-in for Gemini: upper-cases titles, answering batch requests with JSON."""
+
+    def __init__(self, drop_ids=(), broken=False):
+        self.drop_ids = set(drop_ids)
+        self.broken = broken
+        self.requests = []
+        self.timeouts = []
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        batch = (generation_config or {}).get("response_mime_type") == "application/json"
+        self.requests.append((prompt, batch))
+        self.timeouts.append((request_options or {}).get("timeout"))
+        if not batch:
+            return FakeResponse(prompt.upper())
+        if self.broken:
+            return FakeResponse("Sorry, I cannot help with that.")
+        items = json.loads(prompt[prompt.rindex("\n[") + 1:])
+        reply = [{"id": item["id"], "title": item["title"].upper()} for item in items
+                 if item["id"] not in self.drop_ids]
+        return FakeResponse("```json\n" + json.dumps(reply, ensure_ascii=False) + "\n```")
+
+    @property
+    def batch_requests(self):
+        return [prompt for prompt, batch in self.requests if batch]
+
+    @property
+    def single_requests(self):
+        return [prompt for prompt, batch in self.requests if not batch]
+
+
+@pytest.fixture(autouse=True)
+def closed_breaker():
+    """Start every test with the process-wide circuit breaker closed."""
+    gemini_breaker.reset()
+    yield gemini_breaker
+    gemini_breaker.reset()
+
+
+def make_optimizer(tmp_path, model):
+    optimizer = TitleOptimizer(api_key="test-key", cache_dir=str(tmp_path))
+    optimizer.model = optimizer.batch_model = model
+    return optimizer
+
+
+class TestBatchPlanning:
+    """Test token-budgeted batch planning."""
+
+    def test_batches_respect_token_budget(self):
+        """Test that every batch stays within the budget and order is preserved."""
+        titles = [f"Episode {i} Of A Fairly Long Series About Python" for i in range(30)]
+        budget = 5 * (estimate_tokens(titles[0]) + BATCH_TOKENS_PER_TITLE)
+
+        batches = plan_batches(titles, max_tokens=budget, max_titles=50)
+
+        assert [title for batch in batches for title in batch] == titles
+        assert all(sum(estimate_tokens(t) + BATCH_TOKENS_PER_TITLE for t in batch) <= budget for batch in batches)
+        assert len(batches) == 6
+
+    def test_batch_size_cap_and_oversized_title(self):
+        """Test the per-request title cap and that an over-budget title gets its own batch."""
+        assert [len(batch) for batch in plan_batches(["a"] * 7, max_tokens=10 ** 6, max_titles=3)] == [3, 3, 1]
+        assert plan_batches(["short", "x" * 4000, "short"], max_tokens=200) == [["short"], ["x" * 4000], ["short"]]
+
+    def test_cjk_counted_per_character(self):
+        """Test that CJK characters are estimated as one token each."""
+        assert estimate_tokens("人工智能") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+
+class TestOptimizeTitles:
+    """Test batched title optimization against a local fake model."""
+
+    def test_one_request_for_many_titles(self, tmp_path):
+        """Test that titles are optimized in one request with results in input order."""
+        model = FakeBatchModel()
+        titles = ["learn python", "AI技术指南 tutorial", "learn python", "react apps"]
+
+        results = make_optimizer(tmp_path, model).optimize_titles(titles, source_language="en")
+
+        assert results == [("LEARN PYTHON", True), ("AI技术指南 TUTORIAL", True),
+                           ("LEARN PYTHON", True), ("REACT APPS", True)]
+        assert len(model.requests) == 1
+        assert model.timeouts == [BATCH_TIMEOUT_SECONDS]
+        assert model.batch_requests[0].count("learn python") == 1  # 重复标题只发送一次
+        assert "All input titles are in English." in model.batch_requests[0]
+
+    def test_split_by_token_budget(self, tmp_path):
+        """Test that a small token budget splits the titles over several requests."""
+        model = FakeBatchModel()
+        titles = [f"title number {i}" for i in range(10)]
+
+        results = make_optimizer(tmp_path, model).optimize_titles(
+            titles, max_batch_tokens=4 * (estimate_tokens(titles[0]) + BATCH_TOKENS_PER_TITLE))
+
+        assert [title for title, _ in results] == [t.upper() for t in titles]
+        assert len(model.batch_requests) == 3
+        assert model.single_requests == []
+
+    def test_missing_item_falls_back_to_single_request(self, tmp_path):
+        """Test that only titles missing from the batch response are retried one by one."""
+        model = FakeBatchModel(drop_ids={1})
+
+        results = make_optimizer(tmp_path, model).optimize_titles(["one", "two", "three"])
+
+        assert results == [("ONE", True), ("TWO", True), ("THREE", True)]
+        assert model.single_requests == ["two"]
+
+    def test_unparseable_batch_falls_back_per_item(self, tmp_path):
+        """Test that a malformed batch response retries every title individually."""
+        model = FakeBatchModel(broken=True)
+
+        results = make_optimizer(tmp_path, model).optimize_titles(["one", "two"])
+
+        assert results == [("ONE", True), ("TWO", True)]
+        assert model.single_requests == ["one", "two"]
+
+    def test_cached_and_preformatted_titles_not_sent(self, tmp_path):
+        """Test that cache hits and titles with manual line breaks skip the request."""
+        model = FakeBatchModel()
+        optimizer = make_optimizer(tmp_path, model)
+        optimizer.optimize_titles(["one", "two"])
+
+        results = optimizer.optimize_titles(["one", "two", "three", "Line\\nBreak"])
+
+        assert results == [("ONE", True), ("TWO", True), ("THREE", True), ("Line\\nBreak", False)]
+        assert model.single_requests == ["three"]
+
+    def test_unavailable_returns_originals(self, tmp_path):
+        """Test that titles are returned unchanged without a Gemini model."""
+        optimizer = TitleOptimizer(api_key=None, cache_dir=str(tmp_path))
+
+        assert optimizer.optimize_titles(["one", "two"]) == [("one", False), ("two", False)]
+
+
+class InlineExecutor:
+    """Local stand-in for ProcessPoolExecutor that runs the initializer and tasks in this process."""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        self.submitted = []
+        initializer(*initargs)
+        InlineExecutor.last = self
+
+    def submit(self, fn, *args):
+        self.submitted.append(fn)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SlowSingleModel(FakeBatchModel):
+    """FakeBatchModel whose single-title requests take `delay` seconds."""
+
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        if (generation_config or {}).get("response_mime_type") != "application/json":
+            time.sleep(self.delay)
+        return super().generate_content(prompt, generation_config, request_options)
+
+
+class TestBatchModel:
+    """Test the separate batch model, its cache key and the fallback budget."""
+
+    def test_batch_requests_use_batch_model(self, tmp_path):
+        """Test that JSON batch requests go to the batch model and not the single-title model."""
+        single, batch = FakeBatchModel(), FakeBatchModel()
+        optimizer = make_optimizer(tmp_path, single)
+        optimizer.batch_model = batch
+
+        assert optimizer.optimize_titles(["one", "two"]) == [("ONE", True), ("TWO", True)]
+        assert single.requests == []
+        assert len(batch.batch_requests) == 1
+
+    def test_batch_prompt_drops_single_output_rule(self):
+        """Test that the batch system prompt asks for JSON and the cache key covers both prompts."""
+        assert "OUTPUT ONLY THE OPTIMIZED TITLE" not in BATCH_OPTIMIZATION_SYSTEM_PROMPT
+        assert "JSON" in BATCH_OPTIMIZATION_SYSTEM_PROMPT
+        assert BATCH_OPTIMIZATION_SYSTEM_PROMPT in CACHE_PROMPT
+        assert BATCH_INSTRUCTIONS in CACHE_PROMPT
+
+    def test_fallbacks_share_one_budget(self, tmp_path):
+        """Test that one-by-one fallbacks after a failed batch stop once the shared budget is spent."""
+        model = SlowSingleModel(delay=0.06, broken=True)
+        titles = ["one", "two", "three", "four"]
+
+        results = make_optimizer(tmp_path, model).optimize_titles(titles, timeout=0.1)
+
+        assert len(model.single_requests) == 2
+        assert results[:2] == [("ONE", True), ("TWO", True)]
+        assert results[2:] == [("three", False), ("four", False)]
+
+
+class TestBatchPrefetch:
+    """Test that batch rendering optimizes titles up front."""
+
+    def test_prefetch_fills_cache_in_one_request(self, tmp_path, monkeypatch):
+        """Test that prefetching groups titles by language and skips AI-disabled specs."""
+        model = FakeBatchModel()
+        optimizer = make_optimizer(tmp_path, model)
+        monkeypatch.setattr(batch_generator, "_worker_generator", SimpleNamespace(title_optimizer=optimizer))
+        specs = [{"title": "one"}, {"title": "two"}, {"title": "three", "enable_ai_optimization": False},
+                 {"title": "four", "source_language": "zh"}, {"author": "no title"}]
+
+        batch_generator._prefetch_titles(batch_generator._title_groups(specs))
+
+        assert len(model.batch_requests) == 1
+        assert model.single_requests == ["(Input is in Chinese) four"]
+        assert optimizer.optimize_titles(["one", "two"]) == [("ONE", True), ("TWO", True)]
+        assert len(model.requests) == 2
+
+    def test_prefetch_is_first_pool_task(self, tmp_path, monkeypatch):
+        """Test that the pool prefetches titles in a worker before any render is submitted."""
+        model = FakeBatchModel()
+        optimizer = make_optimizer(tmp_path, model)
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(ftg, "create_title_optimizer", lambda api_key: optimizer)
+        monkeypatch.setattr(batch_generator, "ProcessPoolExecutor", InlineExecutor)
+        monkeypatch.setattr(batch_generator, "_worker_generator", None)
+        specs = [{"title": "one", "output_mode": "image"}, {"title": "two", "output_mode": "image"}]
+
+        results = list(batch_generator.iter_batch(specs, workers=2, gemini_api_key="test-key"))
+
+        assert all(result.ok for result in results)
+        assert InlineExecutor.last.submitted[0] is batch_generator._prefetch_titles
+        assert batch_generator._prefetch_titles not in InlineExecutor.last.submitted[1:]
+        assert len(model.batch_requests) == 1
+        assert model.single_requests == []
+
+    def test_prefetch_without_optimizer_is_noop(self, monkeypatch):
+        """Test that prefetching does nothing in workers without AI optimization."""
+        monkeypatch.setattr(batch_generator, "_worker_generator", SimpleNamespace(title_optimizer=None))
+
+        batch_generator._prefetch_titles({(None, None): ["one"]})
+
+
+class FakeAsyncModel:
+    """Local stand-in for Gemini's generate_content_async with scripted delays."""
+
+    def __init__(self, delays=(0.0,), reply="Async\\nTitle"):
+        self.delays = list(delays)
+        self.reply = reply
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.timeouts = []
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None):
+        self.timeouts.append((request_options or {}).get("timeout"))
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(delay)
+            return FakeResponse(f"{self.reply} {self.calls}" if len(self.delays) > 1 else self.reply)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def fresh_latency():
+    request_latency.clear()
+    yield request_latency
+    request_latency.clear()
+
+
+class TestLatencyTracker:
+    """Test the sliding latency window."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles and the minimum sample count."""
+        tracker = LatencyTracker(window=100)
+        for ms in range(1, 101):
+            tracker.record(ms / 1000)
+
+        assert tracker.percentile(0.95) == 0.095
+        assert tracker.percentile(0.5) == 0.05
+        assert LatencyTracker().percentile(0.95, min_samples=1) is None
+
+
+class TestOptimizeTitleAsync:
+    """Test the asyncio title optimizer."""
+
+    def test_result_cached(self, tmp_path, fresh_latency):
+        """Test that the async path returns and caches the optimized title."""
+        model = FakeAsyncModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        first = asyncio.run(optimizer.optimize_title_async("Async Title"))
+        second = asyncio.run(optimizer.optimize_title_async("Async Title"))
+
+        assert first == second == ("Async\\nTitle", True)
+        assert model.calls == 1
+        assert len(fresh_latency) == 1
+
+    def test_deadline_returns_original(self, tmp_path, fresh_latency):
+        """Test that a response slower than the deadline falls back to the original title."""
+        optimizer = make_optimizer(tmp_path, FakeAsyncModel(delays=[5.0]))
+
+        start = time.perf_counter()
+        result = asyncio.run(optimizer.optimize_title_async("Slow Title", timeout=0.05, hedge=False))
+
+        assert result == ("Slow Title", False)
+        assert time.perf_counter() - start < 1.0
+
+    def test_concurrency_limited(self, tmp_path, fresh_latency, monkeypatch):
+        """Test that concurrent calls never exceed the request limit."""
+        monkeypatch.setattr(title_optimizer, "ASYNC_MAX_CONCURRENCY", 3)
+        model = FakeAsyncModel(delays=[0.02])
+        optimizer = TitleOptimizer(api_key="test-key", use_cache=False)
+        optimizer.model = model
+
+        async def run_all():
+            return await asyncio.gather(*(optimizer.optimize_title_async(f"Title {i}") for i in range(10)))
+
+        results = asyncio.run(run_all())
+
+        assert all(was_optimized for _, was_optimized in results)
+        assert model.calls == 10
+        assert model.max_active == 3
+
+    def test_hedged_request_wins(self, tmp_path, fresh_latency):
+        """Test that a request slower than the p95 is hedged and the faster response is used."""
+        for _ in range(title_optimizer.HEDGE_MIN_SAMPLES):
+            fresh_latency.record(0.01)
+        model = FakeAsyncModel(delays=[2.0, 0.01])
+        optimizer = make_optimizer(tmp_path, model)
+
+        start = time.perf_counter()
+        result = asyncio.run(optimizer.optimize_title_async("Hedged Title", timeout=5))
+
+        assert result == ("Async\\nTitle 2", True)
+        assert model.calls == 2
+        assert time.perf_counter() - start < 1.0
+
+    def test_no_hedge_without_latency_history(self, tmp_path, fresh_latency):
+        """Test that hedging waits for enough latency samples."""
+        model = FakeAsyncModel(delays=[0.05, 0.0])
+        optimizer = make_optimizer(tmp_path, model)
+
+        assert asyncio.run(optimizer.optimize_title_async("Title")) == ("Async\\nTitle 1", True)
+        assert model.calls == 1
+
+    def test_blocking_model_runs_in_thread(self, tmp_path, fresh_latency):
+        """Test that models without an async method are called off the event loop with the remaining deadline."""
+        model = FakeBatchModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        assert asyncio.run(optimizer.optimize_title_async("blocking", timeout=2.0)) == ("BLOCKING", True)
+        assert 0 < model.timeouts[0] <= 2.0
+
+    def test_hedged_requests_share_the_deadline(self, tmp_path, fresh_latency):
+        """Test that both hedged requests get a request timeout bounded by the call's deadline."""
+        for _ in range(20):
+            fresh_latency.record(0.01)
+        model = FakeAsyncModel(delays=[1.0, 0.0])
+        optimizer = make_optimizer(tmp_path, model)
+
+        asyncio.run(optimizer.optimize_title_async("Hedged Deadline", timeout=3.0))
+
+        assert len(model.timeouts) == 2
+        assert 0 < model.timeouts[1] <= model.timeouts[0] <= 3.0
+
+
+class TestGenerateAsync:
+    """Test the async thumbnail entry point."""
+
+    def test_async_entry_optimizes_once(self, tmp_path, monkeypatch, fresh_latency):
+        """Test that the title is optimized asynchronously and not again during rendering."""
+        monkeypatch.chdir(tmp_path)
+        generator = ftg.FinalThumbnailGenerator()
+        model = FakeAsyncModel(reply="Async Title")
+        generator.title_optimizer = make_optimizer(tmp_path, model)
+        rendered = []
+        original = ftg._lookup_text_sprite
+        monkeypatch.setattr(ftg, "_lookup_text_sprite",
+                            lambda **kwargs: rendered.append(kwargs["text"]) or original(**kwargs))
+
+        image = asyncio.run(generator.generate_final_thumbnail_async("original title", author="Tester",
+                                                                     output_mode="image"))
+
+        assert image.size == (1280, 720)
+        assert model.calls == 1
+        assert rendered[0] == "Async Title"
+
+    def test_timeout_renders_original(self, tmp_path, monkeypatch, fresh_latency):
+        """Test that an AI timeout still renders with the original title."""
+        monkeypatch.chdir(tmp_path)
+        generator = ftg.FinalThumbnailGenerator()
+        generator.title_optimizer = make_optimizer(tmp_path, FakeAsyncModel(delays=[5.0]))
+
+        data = asyncio.run(generator.generate_final_thumbnail_async("Original Title", output_mode="bytes",
+                                                                    ai_timeout=0.05))
+
+        assert data[:2] == b"\xff\xd8"
+
+
+class FailingModel:
+    """Local stand-in for a degraded Gemini endpoint."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        self.calls.append(kwargs)
+        raise TimeoutError("deadline exceeded")
+
+
+class FailingAsyncModel:
+    """Local stand-in for an async Gemini endpoint whose requests fail after a delay."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        raise TimeoutError("deadline exceeded")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Test the circuit breaker state machine."""
+
+    def make_breaker(self, clock):
+        return CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0,
+                              cooldown_seconds=30, clock=clock)
+
+    def test_trips_at_failure_rate(self):
+        """Test that the breaker opens once the failure share reaches the threshold."""
+        breaker = self.make_breaker(FakeClock())
+        for _ in range(2):
+            breaker.record_success(0.1)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+        breaker.record_success(2.5)  # 过慢的成功请求计为失败
+
+        assert breaker.state == "open"
+        assert not breaker.allow_request()
+        snapshot = breaker.snapshot()
+        assert (snapshot["trips"], snapshot["rejected"], snapshot["cooldown_remaining"]) == (1, 1, 30)
+
+    def test_needs_minimum_calls(self):
+        """Test that a few early failures do not trip the breaker."""
+        breaker = self.make_breaker(FakeClock())
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.allow_request()
+
+    def test_half_open_probe(self):
+        """Test that after the cool-down a single probe decides whether to close or reopen."""
+        clock = FakeClock()
+        breaker = self.make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now += 31
+        assert breaker.state == "half_open"
+        probe = breaker.allow_request()
+        assert probe
+        assert not breaker.allow_request()  # 探测期间只放行一个请求
+        breaker.record_failure(probe)
+        assert breaker.state == "open"
+
+        clock.now += 31
+        probe = breaker.allow_request()
+        breaker.record_success(0.1, probe)
+        assert breaker.state == "closed"
+        assert breaker.allow_request()
+
+    def test_only_probe_outcome_changes_half_open_state(self):
+        """Test that late results of requests sent before the trip do not close or reopen the breaker."""
+        clock = FakeClock()
+        breaker = self.make_breaker(clock)
+        stale = breaker.allow_request()
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now += 31
+        probe = breaker.allow_request()
+        breaker.record_success(0.1, stale)
+        breaker.record_success(0.1)
+        breaker.record_failure(stale)
+        assert breaker.state == "half_open"
+
+        breaker.record_success(0.1, probe)
+        assert breaker.state == "closed"
+
+
+class TestBreakerIntegration:
+    """Test that title optimization stops calling a degraded Gemini."""
+
+    def test_open_breaker_skips_requests(self, tmp_path, closed_breaker):
+        """Test that after enough failures the model is no longer called."""
+        model = FailingModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        results = [optimizer.optimize_title(f"Title {i}") for i in range(20)]
+
+        assert all(result == (f"Title {i}", False) for i, result in enumerate(results))
+        assert len(model.calls) == closed_breaker.min_calls
+        assert closed_breaker.snapshot()["state"] == "open"
+        assert closed_breaker.snapshot()["rejected"] == 20 - closed_breaker.min_calls
+
+    def test_async_timeouts_count_as_failures(self, tmp_path, closed_breaker, fresh_latency):
+        """Test that async deadline misses trip the breaker."""
+        model = FakeAsyncModel(delays=[5.0])
+        optimizer = make_optimizer(tmp_path, model)
+
+        async def run_all():
+            return [await optimizer.optimize_title_async(f"Slow {i}", timeout=0.01, hedge=False) for i in range(8)]
+
+        asyncio.run(run_all())
+
+        assert model.calls == closed_breaker.min_calls
+        assert closed_breaker.state == "open"
+
+    def test_failed_hedged_call_recorded_once(self, tmp_path, closed_breaker, fresh_latency):
+        """Test that a call whose first and hedged requests both fail is one breaker failure."""
+        for _ in range(20):
+            fresh_latency.record(0.01)
+        model = FailingAsyncModel()
+        optimizer = make_optimizer(tmp_path, model)
+
+        assert asyncio.run(optimizer.optimize_title_async("Failing", timeout=2.0)) == ("Failing", False)
+
+        assert model.calls == 2
+        assert closed_breaker.snapshot()["calls"] == 1
+
+    def test_half_open_probe_is_not_hedged(self, tmp_path, fresh_latency):
+        """Test that the half-open probe stays a single request even when it exceeds the p95 latency."""
+        for _ in range(20):
+            fresh_latency.record(0.01)
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_calls=4, clock=clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now += breaker.cooldown_seconds + 1
+        model = FakeAsyncModel(delays=[0.1, 0.0])
+        optimizer = make_optimizer(tmp_path, model)
+        optimizer.breaker = breaker
+
+        result = asyncio.run(optimizer.optimize_title_async("Probe Title", timeout=2.0))
+
+        assert result == ("Async\\nTitle 1", True)
+        assert model.calls == 1
+        assert breaker.state == "closed"
+
+
+class TestRenderAiBudget:
+    """Test the per-render AI time budget and breaker instrumentation."""
+
+    def test_budget_passed_as_request_timeout(self, tmp_path, monkeypatch):
+        """Test that the render's AI budget becomes the request timeout and failures fall back."""
+        monkeypatch.chdir(tmp_path)
+        generator = ftg.FinalThumbnailGenerator()
+        model = FailingModel()
+        generator.title_optimizer = make_optimizer(tmp_path, model)
+
+        image, profile = generator.generate_final_thumbnail("Budget Title", output_mode="image",
+                                                            ai_time_budget=1.5, return_profile=True)
+
+        assert image.size == (1280, 720)
+        assert len(model.calls) == 1
+        assert 0 < model.calls[0]["request_options"]["timeout"] <= 1.5
+        assert profile.ai["optimized"] is False
+        assert profile.ai["budget_seconds"] == 1.5
+        assert profile.to_dict()["ai"]["breaker"]["calls"] == 1
+
+    def test_budget_spent_before_request_skips_gemini(self, tmp_path, monkeypatch, closed_breaker):
+        """Test that time spent on the cache lookup counts against the budget and skips the request."""
+        model = FailingModel()
+        optimizer = make_optimizer(tmp_path, model)
+        real_get = optimizer.cache.get
+
+        def slow_get(key):
+            time.sleep(0.05)
+            return real_get(key)
+
+        monkeypatch.setattr(optimizer.cache, "get", slow_get)
+
+        assert optimizer.optimize_title("Slow Cache", timeout=0.02) == ("Slow Cache", False)
+        assert asyncio.run(optimizer.optimize_title_async("Slow Cache", timeout=0.02)) == ("Slow Cache", False)
+        assert model.calls == []
+        assert closed_breaker.snapshot()["calls"] == 0
+
+    def test_open_breaker_visible_in_profile(self, tmp_path, monkeypatch, closed_breaker):
+        """Test that renders while the breaker is open skip Gemini and report the open state."""
+        monkeypatch.chdir(tmp_path)
+        generator = ftg.FinalThumbnailGenerator()
+        model = FailingModel()
+        generator.title_optimizer = make_optimizer(tmp_path, model)
+        for _ in range(closed_breaker.min_calls):
+            closed_breaker.record_failure()
+
+        _, profile = generator.generate_final_thumbnail("Degraded", output_mode="image", return_profile=True)
+
+        assert model.calls == []
+        assert profile.ai["breaker"]["state"] == "open"
+        assert profile.ai["breaker"]["rejected"] == 1
+
+
+class TestBatchTimeout:
+    """Test the timeout and latency tracking of batch requests."""
+
+    def test_batch_timeout_passed_and_latency_recorded(self, tmp_path):
+        """Test that batch requests and their fallbacks get a timeout and batch latency is tracked separately."""
+        batch_latency.clear()
+        request_latency.clear()
+        model = FakeBatchModel(drop_ids={1})
+
+        results = make_optimizer(tmp_path, model).optimize_titles(["one", "two"], timeout=2.5)
+
+        assert results == [("ONE", True), ("TWO", True)]
+        assert model.timeouts[0] == 2.5
+        assert 0 < model.timeouts[1] <= 2.5
+        status = ai_status()
+        assert status["batch_latency_samples"] == 1
+        assert status["latency_samples"] == 1
+        batch_latency.clear()
+        request_latency.clear()
@@ -0,0 +1,78 @@
+import io
+import os
+import sys
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_thumbnail_generator.youtube_standards import encode_jpeg_to_budget
+
+
+def _busy_image(size=(640, 360)):
+    """Gradient with fine detail so JPEG size depends strongly on quality."""
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    detail = Image.effect_noise(size, 64).convert('RGB')
+    return Image.blend(image, detail, 0.5)
+
+
+def _size_at(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, optimize=True)
+    return len(buffer.getvalue())
+
+
+class TestEncodeJpegToBudget:
+    """Test the size-targeted JPEG encoder."""
+
+    def test_fits_at_max_quality_in_one_encode(self):
+        """Test that small images are encoded once at the preferred quality."""
+        result = encode_jpeg_to_budget(_busy_image(), max_bytes=10 * 1024 * 1024)
+
+        assert result.quality == 95
+        assert result.attempts == 1
+        assert result.fits
+
+    def test_finds_highest_quality_within_budget(self):
+        """Test that the search returns the best fitting quality in a bounded number of encodes."""
+        image = _busy_image()
+        budget = _size_at(image, 82) + 1
+
+        result = encode_jpeg_to_budget(image, max_bytes=budget)
+
+        assert result.fits
+        assert result.size <= budget
+        assert _size_at(image, result.quality + 1) > budget
+        assert result.attempts <= 8
+
+    def test_max_quality_100(self):
+        """Test that a search starting at quality 100 falls back to bisection instead of dividing by zero."""
+        image = _busy_image()
+        budget = _size_at(image, 90) + 1
+
+        result = encode_jpeg_to_budget(image, max_bytes=budget, max_quality=100)
+
+        assert result.fits
+        assert result.size <= budget
+        assert 90 <= result.quality < 100
+        assert result.attempts <= 8
+
+    def test_unreachable_budget_returns_min_quality(self):
+        """Test that an impossible budget falls back to min_quality without walking the range."""
+        result = encode_jpeg_to_budget(_busy_image(), max_bytes=1000)
+
+        assert not result.fits
+        assert result.quality == 70
+        assert result.attempts <= 3
+
+    def test_subsampling_and_qtables_are_applied(self):
+        """Test that chroma subsampling and quantization presets reach the encoder."""
+        image = _busy_image()
+
+        full_chroma = encode_jpeg_to_budget(image, 10 * 1024 * 1024, subsampling="4:4:4")
+        preset = encode_jpeg_to_budget(image, 10 * 1024 * 1024, qtables="web_low")
+
+        with Image.open(io.BytesIO(full_chroma.data)) as decoded:
+            assert decoded.layer[0][1:3] == decoded.layer[1][1:3]  # same sampling for Y and Cb
+        assert full_chroma.subsampling == "4:4:4"
+        assert preset.size < encode_jpeg_to_budget(image, 10 * 1024 * 1024).size
@@ -32,17 +32,52 @@ __author__ = "Leo Wang"
 __email__ = "me@leowang.net"
 __license__ = "MIT"
 
-# Import main classes and functions
-from .final_thumbnail_generator import FinalThumbnailGenerator, get_resource_path, create_default_templates, optimize_for_youtube_api, generate_triangle_template, get_random_template_config, generate_random_thumbnail
-from .text_png_generator import create_text_png
-from .function_add_chapter import add_chapter_to_image
+# Public names are imported lazily on first access (PEP 562), so that
+# "import youtube_thumbnail_generator" stays cheap for CLI workers and
+# serverless handlers: Pillow, the renderer and the Gemini client are only
+# loaded when they are actually used.
+_LAZY_ATTRIBUTES = {
+    'FinalThumbnailGenerator': 'final_thumbnail_generator',
+    'get_resource_path': 'final_thumbnail_generator',
+    'clear_resource_manifest': 'final_thumbnail_generator',
+    'create_default_templates': 'final_thumbnail_generator',
+    'optimize_for_youtube_api': 'final_thumbnail_generator',
+    'generate_triangle_template': 'final_thumbnail_generator',
+    'get_triangle_overlay': 'final_thumbnail_generator',
+    'get_random_template_config': 'final_thumbnail_generator',
+    'generate_random_thumbnail': 'final_thumbnail_generator',
+    'cache_info': 'final_thumbnail_generator',
+    'create_text_png': 'text_png_generator',
+    'render_text_sprite': 'final_thumbnail_generator',
+    'add_chapter_to_image': 'function_add_chapter',
+    'generate_batch': 'batch_generator',
+    'iter_batch': 'batch_generator',
+    'BatchResult': 'batch_generator',
+    'RenderProfile': 'render_profile',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # 缓存到模块命名空间，后续访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 def get_default_template():
     """Get path to the default professional template"""
+    from .final_thumbnail_generator import get_resource_path
     return get_resource_path("templates/professional_template.jpg")
 
 def init_templates():
     """Initialize default templates in current directory if needed"""
+    from .final_thumbnail_generator import create_default_templates
     return create_default_templates()
 
 def create_generator(template_path=None, gemini_api_key=None, google_api_key=None):
@@ -73,6 +108,7 @@ def create_generator(template_path=None, gemini_api_key=None, google_api_key=Non
         generator = create_generator()  # 会自动从环境变量获取API key
     """
     # 向后兼容：如果用户使用了google_api_key，优先使用它
+    from .final_thumbnail_generator import FinalThumbnailGenerator
     api_key = google_api_key if google_api_key else gemini_api_key
     return FinalThumbnailGenerator(template_path, api_key)
 
@@ -80,14 +116,22 @@ def create_generator(template_path=None, gemini_api_key=None, google_api_key=Non
 __all__ = [
     'FinalThumbnailGenerator',
     'create_text_png', 
+    'render_text_sprite',
     'add_chapter_to_image',
     'get_default_template',
     'get_resource_path',
+    'clear_resource_manifest',
     'init_templates',
     'create_generator',
     'optimize_for_youtube_api',
     'generate_triangle_template',
+    'get_triangle_overlay',
     'get_random_template_config',
     'generate_random_thumbnail',
+    'cache_info',
+    'generate_batch',
+    'iter_batch',
+    'BatchResult',
+    'RenderProfile',
     '__version__'
 ]
\ No newline at end of file
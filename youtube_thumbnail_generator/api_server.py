@@ -7,6 +7,7 @@ YouTube缩略图生成器 API 服务
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import uuid
+import asyncio
 import threading
 import time
 import os
@@ -15,10 +16,12 @@ try:
     # 当作为包安装时的导入方式
     from .final_thumbnail_generator import FinalThumbnailGenerator, get_resource_path
     from .function_add_chapter import add_chapter_to_image
+    from .title_optimizer import ai_status
 except ImportError:
     # 直接运行时的导入方式
     from final_thumbnail_generator import FinalThumbnailGenerator, get_resource_path
     from function_add_chapter import add_chapter_to_image
+    from title_optimizer import ai_status
 
 app = Flask(__name__)
 CORS(app)
@@ -32,8 +35,12 @@ if not os.path.exists(template_path):
     print(f"警告: 模板文件不存在 {template_path}")
     template_path = None
 
-def background_generate(task_id, **kwargs):
-    """后台生成缩略图任务"""
+# 缩略图任务的事件循环：等待Gemini标题优化时不占用线程，渲染在默认线程池中执行
+task_loop = asyncio.new_event_loop()
+threading.Thread(target=task_loop.run_forever, name="thumbnail-tasks", daemon=True).start()
+
+async def background_generate(task_id, **kwargs):
+    """后台生成缩略图任务（在 task_loop 中执行的协程）"""
     try:
         tasks[task_id]['status'] = 'processing'
         tasks[task_id]['progress'] = '初始化生成器...'
@@ -45,7 +52,7 @@ def background_generate(task_id, **kwargs):
         
         # 支持Gemini API Key参数（向后兼容google_api_key）
         gemini_api_key = kwargs.get('gemini_api_key') or kwargs.get('google_api_key')
-        generator = FinalThumbnailGenerator(template_path, gemini_api_key=gemini_api_key)
+        generator = await asyncio.to_thread(FinalThumbnailGenerator, template_path, gemini_api_key=gemini_api_key)
         
         tasks[task_id]['progress'] = '生成缩略图中...'
         
@@ -53,7 +60,7 @@ def background_generate(task_id, **kwargs):
         output_filename = f"thumbnail_{task_id[:8]}.jpg"
         output_path = f"outputs/{output_filename}"
         
-        result = generator.generate_final_thumbnail(
+        result = await generator.generate_final_thumbnail_async(
             title=kwargs.get('title', ''),
             author=kwargs.get('author'),
             logo_path=kwargs.get('logo_path'),
@@ -176,14 +183,8 @@ def generate_enhanced():
             'progress': '任务创建成功'
         }
         
-        # 启动后台任务
-        thread = threading.Thread(
-            target=background_generate,
-            args=(task_id,),
-            kwargs=data
-        )
-        thread.daemon = True
-        thread.start()
+        # 启动后台任务（协程提交到任务事件循环，不再为每个任务创建线程）
+        asyncio.run_coroutine_threadsafe(background_generate(task_id, **data), task_loop)
         
         return jsonify({
             'task_id': task_id,
@@ -284,11 +285,12 @@ def download_file(filename):
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """健康检查"""
+    """健康检查（包含Gemini断路器状态和最近请求延迟）"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0'
+        'version': '1.0',
+        'title_optimizer': ai_status()
     })
 
 @app.route('/api/templates', methods=['GET'])
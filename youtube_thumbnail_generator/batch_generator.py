@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Batch thumbnail rendering
+Fans generate_final_thumbnail specs out to a process pool whose workers are
+pre-warmed with fonts, templates and triangle overlays.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .final_thumbnail_generator import (FinalThumbnailGenerator, get_resource_path, get_triangle_overlay,
+                                            render_text_sprite, TRIANGLE_WIDTH, YOUTUBE_SIZE, DESIGN_SIZE)
+    from .font_registry import preload_fonts
+except ImportError:
+    from final_thumbnail_generator import (FinalThumbnailGenerator, get_resource_path, get_triangle_overlay,
+                                           render_text_sprite, TRIANGLE_WIDTH, YOUTUBE_SIZE, DESIGN_SIZE)
+    from font_registry import preload_fonts
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one spec in a batch"""
+    index: int  # 在输入specs中的位置
+    spec: Dict[str, Any]
+    result: Any = None  # 输出路径，或 output_mode="bytes"/"image" 时的内存结果
+    error: Optional[str] = None  # 失败时的异常描述
+    traceback: Optional[str] = None
+    elapsed: float = 0.0  # 单项渲染耗时（秒）
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# 每个工作进程持有一个生成器实例，跨任务复用缓存
+_worker_generator = None
+_worker_quiet = True
+# 已预热共享缓存的模板路径：fork时父进程预热后，子进程继承该集合并跳过重复预热
+_warmed_templates = set()
+
+
+def _warm_up(generator: FinalThumbnailGenerator) -> None:
+    """预热字体、模板和三角形遮罩缓存，避免首个任务承担冷启动开销"""
+    preload_fonts()
+    for render_size in (YOUTUBE_SIZE, DESIGN_SIZE):
+        scale = render_size[0] / DESIGN_SIZE[0]
+        for template in (generator.template_path, get_resource_path("templates/light_template.png")):
+            try:
+                generator._load_template(template, render_size)
+            except Exception as e:
+                print(f"模板预热失败 {template}: {e}")
+        for color in ("black", "white"):
+            for direction in ("top", "bottom"):
+                for flip in (False, True):
+                    get_triangle_overlay(color, direction, flip, int(round(TRIANGLE_WIDTH * scale)), render_size[1])
+        # 与渲染路径相同的参数和缩放比例：预热缩放后的字号、字形度量和文字遮罩
+        for text, language, max_lines in (("Warm Up", "english", 3), ("预热", "chinese", 6)):
+            render_text_sprite(text=text, width=550, height=280, text_color=(255, 255, 255), language=language,
+                               auto_height=True, max_lines=max_lines, use_stroke=False, align='left', scale=scale)
+        render_text_sprite(text="WARM UP", width=400, height=60, text_color=(255, 255, 255), language='english',
+                           auto_height=False, max_lines=1, align='left', scale=scale)
+
+
+def _warm_shared_caches(template_path: Optional[str], quiet: bool) -> None:
+    """预热进程级共享缓存（字体、模板、三角形遮罩、文字遮罩），已预热的模板直接跳过
+
+    只使用临时生成器，不修改工作进程的全局状态，可在fork进程池之前于父进程中调用。
+    """
+    if template_path in _warmed_templates:
+        return
+    with _maybe_quiet(quiet):
+        _warm_up(FinalThumbnailGenerator(template_path))
+    _warmed_templates.add(template_path)
+
+
+def _init_worker(template_path: Optional[str], gemini_api_key: Optional[str], quiet: bool) -> None:
+    """进程池初始化函数：创建生成器，共享缓存未预热时（spawn启动或单进程模式）再预热"""
+    global _worker_generator, _worker_quiet
+    _worker_quiet = quiet
+    with _maybe_quiet(quiet):
+        _worker_generator = FinalThumbnailGenerator(template_path, gemini_api_key=gemini_api_key)
+    _warm_shared_caches(template_path, quiet)
+
+
+def _maybe_quiet(quiet: bool):
+    """批量渲染时屏蔽生成器的逐步打印输出"""
+    return contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+
+def _title_groups(specs: List[Dict[str, Any]]) -> Dict[Tuple[Optional[str], Optional[str]], List[str]]:
+    """按 (源语言, 目标语言) 分组需要AI优化的标题（同一批次中的标题需要相同的语言参数）"""
+    groups: Dict[tuple, List[str]] = {}
+    for spec in specs:
+        if spec.get("title") and spec.get("enable_ai_optimization") is not False:
+            languages = (spec.get("source_language"), spec.get("target_language"))
+            groups.setdefault(languages, []).append(spec["title"])
+    return groups
+
+
+def _prefetch_titles(groups: Dict[Tuple[Optional[str], Optional[str]], List[str]]) -> None:
+    """在工作进程中批量请求优化全部标题并写入持久化标题缓存，之后的渲染任务直接命中缓存
+
+    作为进程池的第一个任务执行：Gemini客户端（基于gRPC，初始化后的进程不能再安全地fork）
+    只在工作进程中导入，父进程始终不加载。
+    """
+    optimizer = _worker_generator.title_optimizer
+    if optimizer is None or not optimizer.is_available or optimizer.cache is None:
+        return
+    with _maybe_quiet(_worker_quiet):
+        for (source_language, target_language), titles in groups.items():
+            optimizer.optimize_titles(titles, source_language=source_language, target_language=target_language)
+
+
+def _render_one(index: int, spec: Dict[str, Any]) -> BatchResult:
+    """在工作进程中渲染单个spec，异常被捕获为失败结果而不会中断批次"""
+    start = time.perf_counter()
+    try:
+        with _maybe_quiet(_worker_quiet):
+            result = _worker_generator.generate_final_thumbnail(**spec)
+        return BatchResult(index, spec, result=result, elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(index, spec, error=f"{type(e).__name__}: {e}",
+                           traceback=traceback.format_exc(), elapsed=time.perf_counter() - start)
+
+
+def iter_batch(specs: Iterable[Dict[str, Any]],
+               workers: int = None,
+               template_path: str = None,
+               gemini_api_key: str = None,
+               quiet: bool = True,
+               prefetch_titles: bool = True) -> Iterator[BatchResult]:
+    """
+    Render many thumbnails on a process pool, yielding results as they complete
+
+    Args:
+        specs: Keyword-argument dicts for FinalThumbnailGenerator.generate_final_thumbnail
+        workers: Number of worker processes (default: os.cpu_count()); 1 renders in-process,
+            which (like calling the generator directly) loads the Gemini client in this process
+        template_path: Default template passed to each worker's generator
+        gemini_api_key: Gemini API key for AI title optimization in the workers
+        quiet: Suppress the generator's per-step console output
+        prefetch_titles: With AI optimization available, optimize all titles up front in
+            batched Gemini requests (the first task in the pool); renders then read them from
+            the persistent title cache
+
+    Yields:
+        BatchResult for each spec, in completion order; failures are reported per item
+    """
+    specs = list(specs)
+    workers = workers or os.cpu_count() or 1
+    groups = _title_groups(specs) if prefetch_titles else {}
+
+    if workers == 1:
+        # 单进程模式：直接在当前进程中渲染（便于调试），与直接调用生成器一样在本进程中使用Gemini
+        _init_worker(template_path, gemini_api_key, quiet)
+        if groups:
+            _prefetch_titles(groups)
+        for index, spec in enumerate(specs):
+            yield _render_one(index, spec)
+        return
+
+    if multiprocessing.get_start_method(allow_none=False) == "fork":
+        # fork启动时先在父进程中预热共享缓存：子进程直接继承已解析的字体、模板和三角形缓存
+        # （写时复制共享），初始化时跳过预热；字体文件由FreeType按路径内存映射，所有进程共享同一份页缓存
+        _warm_shared_caches(template_path, quiet)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template_path, gemini_api_key, quiet)) as executor:
+        if groups:
+            # 预取完成后再提交渲染任务，避免其他工作进程在缓存填充前逐条请求
+            try:
+                executor.submit(_prefetch_titles, groups).result()
+            except Exception as e:
+                print(f"标题预取失败，工作进程将逐条优化标题: {type(e).__name__}: {e}")
+        futures = {executor.submit(_render_one, index, spec): index for index, spec in enumerate(specs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                # 工作进程崩溃或结果无法序列化
+                yield BatchResult(index, specs[index], error=f"{type(e).__name__}: {e}")
+
+
+def generate_batch(specs: Iterable[Dict[str, Any]],
+                   workers: int = None,
+                   template_path: str = None,
+                   gemini_api_key: str = None,
+                   quiet: bool = True,
+                   prefetch_titles: bool = True) -> List[BatchResult]:
+    """
+    Render many thumbnails on a process pool and return results in input order
+
+    Example:
+        results = generate_batch([
+            {"title": "Episode 1", "author": "Channel", "output_path": "ep1.jpg"},
+            {"title": "Episode 2", "author": "Channel", "output_path": "ep2.jpg", "theme": "light"},
+        ], workers=8)
+        failed = [r for r in results if not r.ok]
+
+    Returns:
+        list: BatchResult per spec, ordered like specs
+    """
+    results = list(iter_batch(specs, workers=workers, template_path=template_path,
+                              gemini_api_key=gemini_api_key, quiet=quiet, prefetch_titles=prefetch_titles))
+    return sorted(results, key=lambda r: r.index)
@@ -6,13 +6,23 @@
 
 from PIL import Image, ImageDraw, ImageFont
 from typing import List, Tuple, Optional, Dict, Any
+import io
 import os
+import math
 from dataclasses import dataclass
 import random
 
 # ========== 配置常量 ==========
 LOGO_SIZE = 100  # Logo目标尺寸 (像素), 100x100正方形
 # 修改此值可以调整所有logo的显示大小
+TEMPLATE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 模板缓存字节预算 (1600x900 RGB约4.1MB/张)
+DESIGN_SIZE = (1600, 900)  # 布局设计尺寸：所有布局常量以此为基准，按 render_size 等比例缩放
+TRIANGLE_WIDTH = 200  # 三角形宽度 (像素)，高度与右侧图片一致
+OVERLAY_CACHE_MAX_BYTES = 16 * 1024 * 1024  # 三角形遮罩缓存字节预算
+SOURCE_IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 预处理后的Logo/右侧图片缓存字节预算
+TEXT_SPRITE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 渲染好的标题/作者文字PNG缓存字节预算
+DECODE_REDUCING_GAP = 2.0  # 按目标尺寸解码时保留的倍数余量 (JPEG draft / reduce)
+AI_TIME_BUDGET_SECONDS = 8.0  # 每次渲染中AI标题优化的时间预算（秒），超时使用本地回退排版
 
 # Import title optimizer (optional dependency)
 try:
@@ -21,18 +31,82 @@ try:
 except ImportError:
     TITLE_OPTIMIZER_AVAILABLE = False
 import textwrap
-import platform
-try:
-    from importlib import resources
-    from importlib.resources import files
-except ImportError:
-    # Fallback for Python < 3.9
-    import pkg_resources
 
 try:
-    from .text_png_generator import create_text_png
+    from .text_png_generator import create_text_sprite, TextSprite
+    from .image_cache import ImageCache, file_identity
+    from .youtube_standards import ThumbnailOptimizer, JpegEncodeResult, encode_jpeg_to_budget
+    from .render_profile import RenderProfile
+    from .font_registry import get_best_font, font_cache_info
+    from .text_metrics import wrap_words
+    from .text_effects import draw_text_effects
 except ImportError:
-    from text_png_generator import create_text_png
+    from text_png_generator import create_text_sprite, TextSprite
+    from image_cache import ImageCache, file_identity
+    from youtube_standards import ThumbnailOptimizer, JpegEncodeResult, encode_jpeg_to_budget
+    from render_profile import RenderProfile
+    from font_registry import get_best_font, font_cache_info
+    from text_metrics import wrap_words
+    from text_effects import draw_text_effects
+
+# 进程内模板缓存：按 (路径, mtime, 文件大小, 是否强制尺寸) 缓存解码后的RGB底图
+_template_cache = ImageCache(TEMPLATE_CACHE_MAX_BYTES, name="templates")
+# 三角形遮罩缓存：按 (颜色, 方向, 翻转, 宽, 高) 程序化生成一次，所有渲染共享
+_overlay_cache = ImageCache(OVERLAY_CACHE_MAX_BYTES, name="overlays")
+# 预处理图片缓存：按 (路径, mtime, 文件大小, 目标尺寸) 缓存已转换为正方形的Logo和右侧图片
+_source_image_cache = ImageCache(SOURCE_IMAGE_CACHE_MAX_BYTES, name="source_images")
+# 文字遮罩缓存：按create_text_sprite的全部参数缓存渲染结果（作者名、系列标题在各缩略图间重复出现）
+_text_sprite_cache = ImageCache(TEXT_SPRITE_CACHE_MAX_BYTES, name="text_sprites", sizeof=lambda sprite: sprite.nbytes)
+
+def cache_info() -> Dict[str, Any]:
+    """返回进程内各级缓存的命中统计，用于监控缓存命中率"""
+    return {
+        "templates": _template_cache.cache_info(),
+        "overlays": _overlay_cache.cache_info(),
+        "source_images": _source_image_cache.cache_info(),
+        "text_sprites": _text_sprite_cache.cache_info(),
+        "fonts": font_cache_info(),
+    }
+
+def render_text_sprite(**kwargs) -> TextSprite:
+    """Cached create_text_sprite: rasterize each distinct text sprite once per process
+
+    The cache key covers every create_text_sprite argument (text, box size, color,
+    language, align, stroke, max_lines, scale, ...). Returned sprites are shared
+    and must not be modified.
+
+    Returns:
+        TextSprite: Ink-cropped text masks; composite with sprite.paste_onto(image, xy)
+    """
+    return _lookup_text_sprite(**kwargs)[0]
+
+def _lookup_text_sprite(**kwargs) -> Tuple[TextSprite, bool]:
+    """render_text_sprite，同时返回本次是否新光栅化（缓存未命中），用于统计新分配的遮罩"""
+    key = tuple(sorted(kwargs.items()))
+    return _text_sprite_cache.lookup(key, lambda: create_text_sprite(**kwargs))
+
+def _flatten_on_black(image: Image.Image) -> Image.Image:
+    """将图片转换为RGB，透明部分合成到黑色背景上（只在模板解码时执行一次）"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode not in ('RGBA', 'LA'):
+        image = image.convert('RGBA')
+    flat = Image.new('RGB', image.size, (0, 0, 0))
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+def _drop_opaque_alpha(image: Image.Image) -> Image.Image:
+    """alpha通道全为255的RGBA图片转为RGB，合成时可不带遮罩直接覆盖"""
+    if image.mode == 'RGBA' and image.getchannel('A').getextrema() == (255, 255):
+        return image.convert('RGB')
+    return image
+
+def _paste_layer(canvas: Image.Image, layer: Image.Image, xy: Tuple[int, int]) -> None:
+    """贴图层：不透明图层直接覆盖，带透明度的图层按自身alpha只在其区域内混合"""
+    if layer.mode == 'RGBA':
+        canvas.paste(layer, xy, layer)
+    else:
+        canvas.paste(layer, xy)
 
 def create_default_templates():
     """Create default templates in user's current directory if they don't exist"""
@@ -73,8 +147,70 @@ def create_default_templates():
     create_triangle_templates()
     print("All default templates created successfully!")
 
+def _triangle_fill_color(color: str) -> Tuple[int, int, int, int]:
+    """将三角形颜色名称或hex颜色转换为RGBA元组"""
+    if color == "black":
+        return (0, 0, 0, 255)
+    elif color == "white":
+        return (255, 255, 255, 255)
+    elif color.startswith("#"):
+        # Convert hex to RGBA
+        hex_color = color.lstrip('#')
+        if len(hex_color) == 6:
+            r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
+            return (r, g, b, 255)
+        print(f"Warning: Invalid hex color {color}, using black")
+        return (0, 0, 0, 255)
+    print(f"Warning: Unknown color {color}, using black")
+    return (0, 0, 0, 255)
+
+def _draw_triangle(color: str, direction: str, width: int, height: int) -> Image.Image:
+    """在透明RGBA画布上绘制三角形（不写文件）"""
+    # Create transparent background
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    
+    # Define triangle points based on direction
+    if direction == "bottom":
+        # Point at bottom-left: top-right to top-left to bottom-left
+        triangle_points = [(width, 0), (0, 0), (0, height)]
+    else:  # direction == "top"  
+        # Point at top-left: top-left to bottom-left to bottom-right
+        triangle_points = [(0, 0), (0, height), (width, height)]
+    
+    # Draw triangle
+    draw.polygon(triangle_points, fill=_triangle_fill_color(color))
+    return img
+
+def get_triangle_overlay(color: str = "black", direction: str = "bottom", flip: bool = False,
+                         width: int = TRIANGLE_WIDTH, height: int = 900) -> Image.Image:
+    """
+    Get an in-memory triangle overlay, drawn once per (color, direction, flip, width, height)
+    
+    The returned image is shared between renders and must be treated as read-only.
+    
+    Args:
+        color (str): Triangle color - "black", "white", or hex color like "#FF0000"
+        direction (str): "bottom" (point at bottom-left) or "top" (point at top-left)
+        flip (bool): Mirror horizontally (point on the right side) for flipped layouts
+        width (int): Triangle width in pixels
+        height (int): Triangle height in pixels
+        
+    Returns:
+        Image.Image: RGBA triangle overlay
+    """
+    key = (color, direction, flip, width, height)
+    
+    def draw():
+        triangle = _draw_triangle(color, direction, width, height)
+        if flip:
+            triangle = triangle.transpose(Image.FLIP_LEFT_RIGHT)
+        return triangle
+    
+    return _overlay_cache.get_or_create(key, draw)
+
 def generate_triangle_template(color: str = "black", direction: str = "bottom", 
-                              output_path: str = None, width: int = 200, height: int = 900) -> str:
+                              output_path: str = None, width: int = TRIANGLE_WIDTH, height: int = 900) -> str:
     """
     Generate triangle template with customizable color and direction
     
@@ -93,8 +229,6 @@ def generate_triangle_template(color: str = "black", direction: str = "bottom",
         generate_triangle_template("white", "top")     # White triangle, point at top-left
         generate_triangle_template("#FF0000", "bottom", "red_triangle.png")  # Custom red triangle
     """
-    from PIL import Image, ImageDraw
-    
     # Generate default output path if not provided
     if not output_path:
         direction_suffix = "bottom" if direction == "bottom" else "top"
@@ -109,38 +243,7 @@ def generate_triangle_template(color: str = "black", direction: str = "bottom",
     if output_dir:  # Only if there's a directory component
         os.makedirs(output_dir, exist_ok=True)
     
-    # Create transparent background
-    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Define triangle points based on direction
-    if direction == "bottom":
-        # Point at bottom-left: top-right to top-left to bottom-left
-        triangle_points = [(width, 0), (0, 0), (0, height)]
-    else:  # direction == "top"  
-        # Point at top-left: top-left to bottom-left to bottom-right
-        triangle_points = [(0, 0), (0, height), (width, height)]
-    
-    # Convert color to RGB
-    if color == "black":
-        fill_color = (0, 0, 0, 255)
-    elif color == "white":
-        fill_color = (255, 255, 255, 255)
-    elif color.startswith("#"):
-        # Convert hex to RGBA
-        hex_color = color.lstrip('#')
-        if len(hex_color) == 6:
-            r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-            fill_color = (r, g, b, 255)
-        else:
-            print(f"Warning: Invalid hex color {color}, using black")
-            fill_color = (0, 0, 0, 255)
-    else:
-        print(f"Warning: Unknown color {color}, using black")
-        fill_color = (0, 0, 0, 255)
-    
-    # Draw triangle
-    draw.polygon(triangle_points, fill=fill_color)
+    img = _draw_triangle(color, direction, width, height)
     
     # Save triangle
     img.save(output_path, 'PNG')
@@ -164,7 +267,106 @@ def create_triangle_templates():
     
     print("Default triangle templates created (4 variations: black/white × top/bottom)!")
 
-def optimize_for_youtube_api(input_path: str, output_path: str = None) -> str:
+YOUTUBE_SIZE = (1280, 720)  # YouTube API推荐尺寸 (16:9)
+YOUTUBE_MAX_FILE_SIZE = 2 * 1024 * 1024  # YouTube API文件大小上限 2MB
+OUTPUT_MODES = ("file", "bytes", "image")  # generate_final_thumbnail 支持的输出方式
+
+def _layout_scale(render_size: Tuple[int, int]) -> float:
+    """返回合成画布相对1600x900设计尺寸的缩放比例，画布必须为16:9"""
+    render_width, render_height = render_size
+    design_width, design_height = DESIGN_SIZE
+    if render_width <= 0 or abs(render_width * design_height - render_height * design_width) > design_height:
+        raise ValueError(f"render_size必须为16:9尺寸，例如1280x720、1600x900、3840x2160，当前: {render_width}x{render_height}")
+    return render_width / design_width
+
+def _prepare_for_youtube(img: Image.Image) -> Image.Image:
+    """将图片转换为YouTube API要求的RGB/sRGB、1280x720 (16:9)，全部在内存中完成"""
+    from PIL import ImageCms
+    import io
+    
+    # Convert to RGB if needed (removes alpha channel)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create white background for transparent areas
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = rgb_img
+        print("Converted to RGB with white background")
+    
+    # Ensure sRGB color profile
+    try:
+        # Check if image has an embedded color profile
+        if 'icc_profile' in img.info:
+            # Convert to sRGB if it has a different profile
+            input_profile = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
+            srgb_profile = ImageCms.createProfile('sRGB')
+            
+            if input_profile.profile.profile_description != srgb_profile.profile.profile_description:
+                img = ImageCms.profileToProfile(img, input_profile, srgb_profile, renderingIntent=0)
+                print("Converted to sRGB color profile")
+        else:
+            # If no profile, assume it's already sRGB
+            print("No color profile found, assuming sRGB")
+    except Exception as e:
+        print(f"Color profile conversion skipped: {e}")
+    
+    # YouTube API optimal dimensions: 1280x720 (16:9 aspect ratio)
+    target_width, target_height = YOUTUBE_SIZE
+    target_ratio = target_width / target_height  # 16:9 = 1.777...
+    
+    current_width, current_height = img.size
+    current_ratio = current_width / current_height
+    
+    # Resize to fit YouTube's requirements
+    if (current_width, current_height) == YOUTUBE_SIZE:
+        print(f"Already YouTube standard size: {target_width}x{target_height}")
+    elif abs(current_ratio - target_ratio) < 0.01:  # Already 16:9
+        # Direct resize
+        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        print(f"Resized to YouTube standard: {target_width}x{target_height}")
+    else:
+        # Need to crop or pad to maintain 16:9 ratio
+        if current_ratio > target_ratio:
+            # Image is wider, crop width
+            new_width = int(current_height * target_ratio)
+            left = (current_width - new_width) // 2
+            img = img.crop((left, 0, left + new_width, current_height))
+            print(f"Cropped width to maintain 16:9 ratio")
+        else:
+            # Image is taller, crop height
+            new_height = int(current_width / target_ratio)
+            top = (current_height - new_height) // 2
+            img = img.crop((0, top, current_width, top + new_height))
+            print(f"Cropped height to maintain 16:9 ratio")
+        
+        # Resize to target dimensions
+        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        print(f"Final resize to: {target_width}x{target_height}")
+    
+    return img
+
+def _encode_youtube_jpeg(img: Image.Image, subsampling: str = None, qtables=None) -> JpegEncodeResult:
+    """按YouTube API要求编码为baseline JPEG，在2MB预算内选择尽可能高的质量 (95~70)
+    
+    Returns:
+        JpegEncodeResult: 包含JPEG字节、使用的质量和编码次数；即使质量70仍超过2MB也返回质量70的结果
+    """
+    result = encode_jpeg_to_budget(img, YOUTUBE_MAX_FILE_SIZE, max_quality=95, min_quality=70,
+                                   subsampling=subsampling, qtables=qtables,
+                                   optimize=True, progressive=False)  # YouTube prefers baseline JPEG
+    
+    if result.fits:
+        print(f"Saved with quality {result.quality}, file size: {result.size:,} bytes "
+              f"({result.size/1024/1024:.2f}MB), {result.attempts} encode(s)")
+    else:
+        # If even quality 70 is too large, keep it anyway with warning
+        print(f"Warning: File size {result.size:,} bytes ({result.size/1024/1024:.2f}MB) exceeds 2MB limit")
+        print("YouTube API may reject or compress this thumbnail further")
+    return result
+
+def optimize_for_youtube_api(input_path: str, output_path: str = None,
+                             subsampling: str = None, qtables=None, return_result: bool = False):
     """
     Optimize thumbnail for YouTube API v3 upload compliance
     
@@ -179,13 +381,14 @@ def optimize_for_youtube_api(input_path: str, output_path: str = None) -> str:
     Args:
         input_path (str): Path to the input image file
         output_path (str): Path for the optimized output (optional)
+        subsampling (str): JPEG chroma subsampling ("4:4:4", "4:2:2", "4:2:0"); None uses Pillow's default (4:2:0)
+        qtables: Custom JPEG quantization tables or a Pillow preset name (e.g. "web_high")
+        return_result (bool): Also return the JpegEncodeResult (quality, encode attempts, fits budget)
         
     Returns:
-        str: Path to the YouTube-compliant thumbnail
+        str: Path to the YouTube-compliant thumbnail;
+        a (path, JpegEncodeResult) tuple when return_result=True
     """
-    from PIL import Image, ImageCms
-    import os
-    
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Input image not found: {input_path}")
     
@@ -204,170 +407,87 @@ def optimize_for_youtube_api(input_path: str, output_path: str = None) -> str:
         original_size = img.size
         print(f"Original size: {original_size[0]}x{original_size[1]}")
         
-        # Convert to RGB if needed (removes alpha channel)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create white background for transparent areas
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = rgb_img
-            print("Converted to RGB with white background")
-        
-        # Ensure sRGB color profile
-        try:
-            import io
-            # Check if image has an embedded color profile
-            if 'icc_profile' in img.info:
-                # Convert to sRGB if it has a different profile
-                input_profile = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
-                srgb_profile = ImageCms.createProfile('sRGB')
-                
-                if input_profile.profile.profile_description != srgb_profile.profile.profile_description:
-                    img = ImageCms.profileToProfile(img, input_profile, srgb_profile, renderingIntent=0)
-                    print("Converted to sRGB color profile")
-            else:
-                # If no profile, assume it's already sRGB
-                print("No color profile found, assuming sRGB")
-        except Exception as e:
-            print(f"Color profile conversion skipped: {e}")
+        img = _prepare_for_youtube(img)
+        encoded = _encode_youtube_jpeg(img, subsampling=subsampling, qtables=qtables)
+        data = encoded.data
         
-        # YouTube API optimal dimensions: 1280x720 (16:9 aspect ratio)
-        target_width, target_height = 1280, 720
-        target_ratio = target_width / target_height  # 16:9 = 1.777...
-        
-        current_width, current_height = img.size
-        current_ratio = current_width / current_height
-        
-        # Resize to fit YouTube's requirements
-        if abs(current_ratio - target_ratio) < 0.01:  # Already 16:9
-            # Direct resize
-            img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            print(f"Resized to YouTube standard: {target_width}x{target_height}")
-        else:
-            # Need to crop or pad to maintain 16:9 ratio
-            if current_ratio > target_ratio:
-                # Image is wider, crop width
-                new_width = int(current_height * target_ratio)
-                left = (current_width - new_width) // 2
-                img = img.crop((left, 0, left + new_width, current_height))
-                print(f"Cropped width to maintain 16:9 ratio")
-            else:
-                # Image is taller, crop height
-                new_height = int(current_width / target_ratio)
-                top = (current_height - new_height) // 2
-                img = img.crop((0, top, current_width, top + new_height))
-                print(f"Cropped height to maintain 16:9 ratio")
-            
-            # Resize to target dimensions
-            img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            print(f"Final resize to: {target_width}x{target_height}")
-        
-        # Save with optimized settings for YouTube API
-        save_kwargs = {
-            'format': 'JPEG',
-            'quality': 95,  # High quality
-            'optimize': True,  # Enable optimization
-            'progressive': False,  # YouTube prefers baseline JPEG
-        }
-        
-        # Try different quality levels to meet 2MB limit
-        max_file_size = 2 * 1024 * 1024  # 2MB in bytes
-        quality_levels = [95, 90, 85, 80, 75, 70]
-        
-        for quality in quality_levels:
-            save_kwargs['quality'] = quality
-            
-            # Save to temporary location to check file size
-            import tempfile
-            import io
-            
-            # Save to bytes buffer to check size
-            buffer = io.BytesIO()
-            img.save(buffer, **save_kwargs)
-            file_size = len(buffer.getvalue())
-            
-            if file_size <= max_file_size:
-                # File size is acceptable, save to final location
-                with open(output_path, 'wb') as f:
-                    f.write(buffer.getvalue())
-                
-                print(f"Saved with quality {quality}, file size: {file_size:,} bytes ({file_size/1024/1024:.2f}MB)")
-                break
-        else:
-            # If even quality 70 is too large, save anyway with warning
-            with open(output_path, 'wb') as f:
-                save_kwargs['quality'] = 70
-                img.save(f, **save_kwargs)
-            
-            final_size = os.path.getsize(output_path)
-            print(f"Warning: File size {final_size:,} bytes ({final_size/1024/1024:.2f}MB) exceeds 2MB limit")
-            print("YouTube API may reject or compress this thumbnail further")
+        # 只写入一次最终文件
+        with open(output_path, 'wb') as f:
+            f.write(data)
         
         # Final verification
-        final_size = os.path.getsize(output_path)
+        final_size = len(data)
         print(f"✅ YouTube-compliant thumbnail created:")
         print(f"   📏 Dimensions: 1280x720 (16:9 aspect ratio)")
         print(f"   📁 Format: JPEG")
         print(f"   🎨 Color space: sRGB")
         print(f"   📊 File size: {final_size:,} bytes ({final_size/1024/1024:.2f}MB)")
-        print(f"   🚀 YouTube API ready: {'✅ YES' if final_size <= max_file_size else '⚠️ SIZE WARNING'}")
+        print(f"   🚀 YouTube API ready: {'✅ YES' if final_size <= YOUTUBE_MAX_FILE_SIZE else '⚠️ SIZE WARNING'}")
         
-        return output_path
+        return (output_path, encoded) if return_result else output_path
         
     except Exception as e:
         print(f"❌ Error optimizing thumbnail: {e}")
         raise e
 
+# 内置默认模板：资源文件缺失时直接在内存中合成，不再向当前目录写入文件
+BUILTIN_TEMPLATES = {
+    "templates/professional_template.jpg": ('RGB', (0, 0, 0)),  # Black background
+    "templates/light_template.png": ('RGBA', (255, 255, 255, 255)),  # White background
+}
+
+# 资源清单：资源名 -> 解析后的路径，每个资源只解析一次
+_resource_manifest: Dict[str, str] = {}
+_resource_roots: List[str] = []
+
+def _get_resource_roots() -> List[str]:
+    """资源搜索目录（只计算一次）：包目录、包所在的项目根目录、首次解析时的当前目录"""
+    if not _resource_roots:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        roots = [package_dir, os.path.dirname(package_dir), os.getcwd()]
+        _resource_roots.extend(dict.fromkeys(roots))  # 去重并保持顺序
+    return _resource_roots
+
+def _resolve_resource(filename: str) -> str:
+    for root in _get_resource_roots():
+        candidate = os.path.join(root, filename)
+        if os.path.exists(candidate):
+            return candidate
+    if filename in BUILTIN_TEMPLATES:
+        # 内置模板：返回包内的虚拟路径，加载时在内存中合成
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    # If file doesn't exist anywhere, return the local path (user's current directory)
+    print(f"Warning: Using fallback path for: {filename}")
+    return os.path.join(_get_resource_roots()[-1], filename)
+
 def get_resource_path(filename: str) -> str:
-    """Get absolute path to package resource file with fallback creation"""
-    try:
-        # Try modern importlib.resources first (Python 3.9+)
-        try:
-            package_files = files('youtube_thumbnail_generator')
-            resource_path = package_files / filename
-            if resource_path.exists():
-                return str(resource_path)
-        except:
-            pass
-        
-        # Fallback to pkg_resources (Python < 3.9)
-        try:
-            resource_path = pkg_resources.resource_filename('youtube_thumbnail_generator', filename)
-            if os.path.exists(resource_path):
-                return resource_path
-        except:
-            pass
-        
-        # Final fallback: check relative to current file location
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(current_dir)
-        relative_path = os.path.join(parent_dir, filename)
-        if os.path.exists(relative_path):
-            return relative_path
-        
-        # Ultimate fallback: check in current working directory
-        local_path = os.path.join(os.getcwd(), filename)
-        if os.path.exists(local_path):
-            return local_path
-        
-        # If file doesn't exist anywhere, try to create default templates
-        if filename.startswith("templates/"):
-            print(f"Resource not found: {filename}. Creating default templates...")
-            create_default_templates()
-            
-            # Check if the local path exists now
-            if os.path.exists(local_path):
-                return local_path
-        
-        # If all else fails, return the local path (user's current directory)
-        print(f"Warning: Using fallback path for: {filename}")
-        return local_path
-        
-    except Exception as e:
-        print(f"Error resolving resource path for {filename}: {e}")
-        # Return local path as final fallback
-        return os.path.join(os.getcwd(), filename)
+    """Get absolute path to a package resource file
+
+    Resources are looked up once in the package directory, the project root and the
+    current directory, and memoized in a manifest so later lookups are O(1) with no
+    filesystem access. Missing default templates (see BUILTIN_TEMPLATES) resolve to a
+    path inside the package and are synthesized in memory when loaded; nothing is
+    written to the current directory. Call clear_resource_manifest() after adding
+    resource files at runtime.
+    """
+    path = _resource_manifest.get(filename)
+    if path is None:
+        path = _resolve_resource(filename)
+        _resource_manifest[filename] = path
+    return path
+
+def clear_resource_manifest() -> None:
+    """Forget resolved resource paths so they are looked up again on next use"""
+    _resource_manifest.clear()
+    _resource_roots.clear()
+
+def _builtin_template_name(path: str) -> Optional[str]:
+    """如果 path 是一个不存在于磁盘上的内置模板，返回其资源名，否则返回None"""
+    normalized = os.path.normpath(path).replace(os.sep, "/")
+    for name in BUILTIN_TEMPLATES:
+        if (normalized == name or normalized.endswith("/" + name)) and not os.path.exists(path):
+            return name
+    return None
 
 
 @dataclass
@@ -413,26 +533,14 @@ class FinalThumbnailGenerator:
             print(f"Using default black template: {template_path}")
         
         self.template_path = template_path
-        if not os.path.exists(template_path):
-            print(f"Template not found at {template_path}, creating default templates...")
-            create_default_templates()
-            # 再次检查模板是否存在
-            if not os.path.exists(template_path):
-                raise FileNotFoundError(f"无法创建默认模板: {template_path}")
+        if not os.path.exists(template_path) and _builtin_template_name(template_path) is None:
+            raise FileNotFoundError(f"模板文件不存在: {template_path}")
         
         # 注意：不在初始化时验证模板尺寸，因为用户应该在generate时选择模板
             
         # 系统初始化 - 使用通用字体检测
         print(f"Initialized with template: {os.path.basename(self.template_path)}")
         
-        # 初始化字体优先级列表
-        self.font_paths = {
-            # 中文字体
-            "chinese": self._get_chinese_font_paths(),
-            # 英文字体
-            "english": self._get_english_font_paths()
-        }
-        
         # Initialize title optimizer (optional)
         self.title_optimizer = None
         if TITLE_OPTIMIZER_AVAILABLE:
@@ -447,21 +555,21 @@ class FinalThumbnailGenerator:
         else:
             print("Title optimization unavailable - google-generativeai package not installed")
     
-    def _ensure_template_size(self, template_path: str) -> Image.Image:
-        """确保模板尺寸为 1600x900，如果不是则强制转换"""
+    def _ensure_template_size(self, template_path: str, target_size: Tuple[int, int] = DESIGN_SIZE) -> Image.Image:
+        """确保模板尺寸为 target_size（默认1600x900），如果不是则强制转换"""
         try:
             from PIL import Image
             img = Image.open(template_path)
             width, height = img.size
+            target_width, target_height = target_size
             
-            if width == 1600 and height == 900:
+            if width == target_width and height == target_height:
                 print(f"Template size verified: {width}x{height} ✓")
                 return img
             
-            print(f"模板尺寸 {width}x{height} 不符合要求，强制转换为 1600x900")
+            print(f"模板尺寸 {width}x{height} 不符合要求，强制转换为 {target_width}x{target_height}")
             
             # 计算缩放比例
-            target_width, target_height = 1600, 900
             scale_x = target_width / width
             scale_y = target_height / height
             
@@ -473,7 +581,7 @@ class FinalThumbnailGenerator:
             new_height = int(height * scale)
             img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
-            # 创建1600x900的画布
+            # 创建目标尺寸的画布
             canvas = Image.new('RGB', (target_width, target_height))
             
             # 计算居中位置
@@ -493,82 +601,37 @@ class FinalThumbnailGenerator:
             
             # 粘贴到画布上
             canvas.paste(img, (x, y))
-            print(f"模板已转换为标准尺寸: 1600x900")
+            print(f"模板已转换为标准尺寸: {target_width}x{target_height}")
             return canvas
         except Exception as e:
             if "模板尺寸不正确" in str(e):
                 raise e  # 重新抛出尺寸错误
-            else:
-                print(f"Warning: Could not validate template size: {e}")
-    
-    def _get_chinese_font_paths(self):
-        """获取中文字体路径 - 跨平台通用"""
-        import platform
-        
-        paths = []
-        system = platform.system()
-        
-        if system == "Linux":
-            # Linux通用字体路径
-            paths.extend([
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                "/usr/share/fonts/truetype/arphic-uming/uming.ttc",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"
-            ])
-        elif system == "Darwin":
-            # macOS系统字体
-            paths.extend([
-                "/System/Library/Fonts/Hiragino Sans GB.ttc",
-                "/Library/Fonts/NotoSansCJK-Bold.ttc",
-                "/System/Library/Fonts/STHeiti Medium.ttc",
-                "/System/Library/Fonts/PingFang.ttc"
-            ])
-        elif system == "Windows":
-            # Windows系统字体
-            paths.extend([
-                "C:\\Windows\\Fonts\\simhei.ttf",
-                "C:\\Windows\\Fonts\\msyh.ttc",
-                "C:\\Windows\\Fonts\\simsun.ttc"
-            ])
-        
-        return paths
-    
-    def _get_english_font_paths(self):
-        """获取英文字体路径 - 跨平台通用"""
-        import platform
-        
-        paths = []
-        system = platform.system()
-        
-        if system == "Linux":
-            # Linux通用字体路径
-            paths.extend([
-                "/usr/share/fonts/truetype/lexend/Lexend-Bold.ttf",
-                "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
-                "/usr/share/fonts/truetype/ubuntu-font-family/Ubuntu-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            ])
-        elif system == "Darwin":
-            # macOS系统字体
-            paths.extend([
-                "/System/Library/Fonts/Helvetica.ttc",
-                "/System/Library/Fonts/Arial.ttf",
-                "/Library/Fonts/Arial Bold.ttf"
-            ])
-        elif system == "Windows":
-            # Windows系统字体
-            paths.extend([
-                "C:\\Windows\\Fonts\\arial.ttf",
-                "C:\\Windows\\Fonts\\arialbd.ttf",
-                "C:\\Windows\\Fonts\\calibri.ttf"
-            ])
-        
-        return paths
+            # 解码失败时直接报错，不把None交给缓存和后续合成
+            raise ValueError(f"Cannot load template {template_path}: {e}") from e
+    
+    def _load_template(self, template_path: str, size: Tuple[int, int] = DESIGN_SIZE) -> Image.Image:
+        """从进程内缓存加载RGB模板（缩放/裁剪为 size），返回可直接绘制的副本
+        
+        模板的透明部分在解码时一次性合成到黑色背景上，之后整个合成过程都在RGB画布上进行。
+        缓存键包含文件的mtime和大小，模板文件被替换后会自动重新解码。
+        磁盘上不存在的内置默认模板直接在内存中合成纯色底图。
+        """
+        builtin = _builtin_template_name(template_path)
+        if builtin is not None:
+            mode, color = BUILTIN_TEMPLATES[builtin]
+            return _template_cache.get_or_create(
+                (("builtin", builtin), size),
+                lambda: _flatten_on_black(Image.new(mode, size, color)),
+                copy=True)
+        
+        key = (file_identity(template_path), size)
+        
+        def decode():
+            template = _flatten_on_black(self._ensure_template_size(template_path, size))
+            template.load()  # 缓存前完成解码并释放文件句柄
+            return template
+        
+        return _template_cache.get_or_create(key, decode, copy=True)
     
     def _detect_language(self, text: str) -> str:
         """检测文本语言"""
@@ -580,30 +643,21 @@ class FinalThumbnailGenerator:
         return "english"
     
     def _get_best_font(self, text: str, font_size: int) -> ImageFont.FreeTypeFont:
-        """根据文本内容选择最佳字体"""
+        """根据文本内容选择最佳字体（字体对象由共享字体注册表缓存）"""
         language = self._detect_language(text)
         
         print(f"文本: {text[:20]}... 语言: {language} 字体大小: {font_size}")
         
-        # 按语言选择合适的字体
-        font_list = self.font_paths.get(language, self.font_paths["english"])
-        
-        for font_path in font_list:
-            if os.path.exists(font_path):
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                    print(f"成功加载字体: {font_path}")
-                    return font
-                except Exception as e:
-                    print(f"字体加载失败 {font_path}: {e}")
-                    continue
-        
-        # 最后的备选方案
-        print("警告: 使用默认字体")
+        return get_best_font(language, font_size)
+    
+    def _wrap_words(self, text: str, font: ImageFont.FreeTypeFont, max_width: int) -> List[str]:
+        """按空格分词换行，行宽为缓存的字形宽度之和"""
         try:
-            return ImageFont.load_default()
+            return wrap_words(text.split(' '), font, max_width)
         except Exception:
-            return ImageFont.load_default()
+            # 无法测量时按每字符15px估算
+            chars_per_line = max(1, max_width // 15)
+            return textwrap.wrap(text, width=chars_per_line) or [text]
     
     def _calculate_text_height(self, text: str, font: ImageFont.FreeTypeFont, max_width: int = None) -> int:
         """计算文字实际高度（包括换行）"""
@@ -618,32 +672,7 @@ class FinalThumbnailGenerator:
                 return 30
         
         # 处理换行的情况
-        lines = []
-        words = text.split(' ')
-        current_line = ""
-        
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            try:
-                if hasattr(font, 'getlength'):
-                    test_width = font.getlength(test_line)
-                else:
-                    bbox = font.getbbox(test_line)
-                    test_width = bbox[2] - bbox[0]
-            except:
-                test_width = len(test_line) * 15
-            
-            if test_width <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                    current_line = word
-                else:
-                    lines.append(word)
-        
-        if current_line:
-            lines.append(current_line)
+        lines = self._wrap_words(text, font, max_width)
         
         # 计算总高度
         try:
@@ -671,38 +700,14 @@ class FinalThumbnailGenerator:
                                position: Tuple[int, int], font: ImageFont.FreeTypeFont,
                                color: str = "#FFFFFF", shadow_offset: Tuple[int, int] = None,
                                shadow_color: str = "#333333", stroke_width: int = 0,
-                               stroke_fill: str = "#000000", max_width: int = None):
-        """绘制带效果的文字"""
+                               stroke_fill: str = "#000000", max_width: int = None,
+                               glow_radius: float = 0, glow_color: str = "#FFFFFF"):
+        """绘制带效果的文字（阴影、描边、外发光）"""
         x, y = position
         
         # 处理文字换行
         if max_width:
-            lines = []
-            words = text.split(' ')
-            current_line = ""
-            
-            for word in words:
-                test_line = current_line + (" " if current_line else "") + word
-                try:
-                    if hasattr(font, 'getlength'):
-                        test_width = font.getlength(test_line)
-                    else:
-                        bbox = font.getbbox(test_line)
-                        test_width = bbox[2] - bbox[0]
-                except:
-                    test_width = len(test_line) * 15
-                
-                if test_width <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                        current_line = word
-                    else:
-                        lines.append(word)
-            
-            if current_line:
-                lines.append(current_line)
+            lines = self._wrap_words(text, font, max_width)
         else:
             lines = [text]
         
@@ -718,25 +723,13 @@ class FinalThumbnailGenerator:
         except:
             line_height = int(30 * 1.3)
         
-        # 绘制每一行
+        # 绘制每一行：每行只光栅化一次，阴影和描边由同一字形遮罩生成
         for i, line in enumerate(lines):
             line_y = y + i * line_height
-            
-            # 绘制阴影
-            if shadow_offset:
-                shadow_x = x + shadow_offset[0]
-                shadow_y = line_y + shadow_offset[1]
-                draw.text((shadow_x, shadow_y), line, font=font, fill=shadow_color)
-            
-            # 绘制描边
-            if stroke_width > 0:
-                for dx in range(-stroke_width, stroke_width + 1):
-                    for dy in range(-stroke_width, stroke_width + 1):
-                        if dx != 0 or dy != 0:
-                            draw.text((x + dx, line_y + dy), line, font=font, fill=stroke_fill)
-            
-            # 绘制主文字
-            draw.text((x, line_y), line, font=font, fill=color)
+            draw_text_effects(draw, (x, line_y), line, font, fill=color,
+                              stroke_width=stroke_width, stroke_fill=stroke_fill,
+                              shadow_offset=shadow_offset, shadow_color=shadow_color,
+                              glow_radius=glow_radius, glow_color=glow_color)
             
             print(f"绘制文字: {line} 位置: ({x}, {line_y}) 颜色: {color}")
     
@@ -745,8 +738,8 @@ class FinalThumbnailGenerator:
         
         处理逻辑：
         1. 如果已经是target_size x target_size，直接返回
-        2. 如果最小边 < target_size，等比例放大到最小边 = target_size
-        3. 居中裁剪为target_size x target_size正方形
+        2. 取居中的最大正方形区域（最小边长 x 最小边长）
+        3. 裁剪与缩放合并为一次LANCZOS重采样，直接得到target_size x target_size
         """
         width, height = image.size
         
@@ -755,59 +748,74 @@ class FinalThumbnailGenerator:
             print(f"图片已是目标尺寸: {target_size}x{target_size}")
             return image
         
-        # 2. 判断最小边长
+        # 2. 居中正方形裁剪区域（原图坐标）
         min_side = min(width, height)
-        
-        # 3. 如果最小边长小于目标尺寸，先等比例放大
-        if min_side < target_size:
-            scale_factor = target_size / min_side
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            print(f"图片等比例放大: {width}x{height} -> {new_width}x{new_height} (缩放比例: {scale_factor:.2f})")
-            
-            # 更新尺寸
-            width, height = new_width, new_height
-        
-        # 4. 居中裁剪为目标尺寸的正方形
-        if width != target_size or height != target_size:
-            # 计算裁剪位置（居中）
-            left = (width - target_size) // 2
-            top = (height - target_size) // 2
-            right = left + target_size
-            bottom = top + target_size
-            
-            # 裁剪为正方形
-            square_image = image.crop((left, top, right, bottom))
-            
-            if width > height:
-                print(f"横向图片居中裁剪: {width}x{height} -> {target_size}x{target_size} (左右各去掉{left}px)")
-            elif height > width:
-                print(f"纵向图片居中裁剪: {width}x{height} -> {target_size}x{target_size} (上下各去掉{top}px)")
-            else:
-                print(f"正方形图片裁剪: {width}x{height} -> {target_size}x{target_size}")
+        left = (width - min_side) / 2
+        top = (height - min_side) / 2
+        box = (left, top, left + min_side, top + min_side)
+        
+        # 3. 裁剪+缩放一次完成；大幅缩小时先用reduce()整数倍降采样
+        square_image = image.resize((target_size, target_size), Image.Resampling.LANCZOS,
+                                    box=box, reducing_gap=DECODE_REDUCING_GAP)
+        
+        if width > height:
+            print(f"横向图片居中裁剪缩放: {width}x{height} -> {target_size}x{target_size} (左右各去掉{int(left)}px)")
+        elif height > width:
+            print(f"纵向图片居中裁剪缩放: {width}x{height} -> {target_size}x{target_size} (上下各去掉{int(top)}px)")
         else:
-            square_image = image
-            print(f"图片无需裁剪，已是目标尺寸: {target_size}x{target_size}")
+            print(f"正方形图片缩放: {width}x{height} -> {target_size}x{target_size}")
         
         return square_image
     
-    def _preprocess_logo(self, logo_path: str, target_size: int = LOGO_SIZE) -> Image.Image:
-        """预处理Logo为固定大小的正方形"""
+    def _load_square_image(self, image_path: str, target_size: int, copy: bool = False,
+                           return_decoded: bool = False):
+        """加载正方形图片（不透明为RGB，带透明度为RGBA），结果按文件版本和目标尺寸缓存在进程内
+        
+        同一频道的Logo几乎每次渲染都相同，命中缓存时不再重新解码和缩放。
+        缓存中的图片为共享只读对象，需要在其上绘制时传入copy=True。
+        return_decoded=True 时返回 (图片, 是否本次解码)，用于统计新分配的缓冲区。
+        """
+        key = (file_identity(image_path), target_size)
+        image, decoded = _source_image_cache.lookup(
+            key, lambda: self._decode_square_image(image_path, target_size), copy=copy)
+        return (image, decoded) if return_decoded else image
+    
+    def _decode_square_image(self, image_path: str, target_size: int) -> Image.Image:
+        """按目标尺寸解码图片并转换为正方形（不透明图片为RGB，否则为RGBA）
+        
+        JPEG使用draft模式在解码阶段直接按1/2、1/4、1/8缩小，避免把大尺寸相机照片
+        完整解码到内存；随后裁剪与缩放合并为一次重采样。
+        """
+        image = Image.open(image_path)
+        width, height = image.size
+        min_side = min(width, height)
+        
+        if image.format == 'JPEG' and min_side > target_size:
+            # 请求的尺寸保留 DECODE_REDUCING_GAP 倍余量，保证最终LANCZOS缩放质量
+            scale = target_size * DECODE_REDUCING_GAP / min_side
+            requested = (math.ceil(width * scale), math.ceil(height * scale))
+            image.draft('RGB', requested)
+            if image.size != (width, height):
+                print(f"JPEG draft解码: {width}x{height} -> {image.size[0]}x{image.size[1]}")
+        
+        # 调色板/CMYK等模式先转为RGBA再重采样
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        
+        square = _drop_opaque_alpha(self._convert_to_square(image, target_size))
+        square.load()
+        return square
+    
+    def _preprocess_logo(self, logo_path: str, target_size: int = LOGO_SIZE, return_decoded: bool = False):
+        """预处理Logo为固定大小的正方形（return_decoded=True 时返回 (Logo, 是否本次解码)）"""
         try:
-            logo = Image.open(logo_path)
-            if logo.mode != 'RGBA':
-                logo = logo.convert('RGBA')
-            
-            # 智能转换为目标尺寸的正方形
-            logo = self._convert_to_square(logo, target_size)
+            # 智能转换为目标尺寸的正方形（按目标尺寸解码）
+            logo, decoded = self._load_square_image(logo_path, target_size, return_decoded=True)
             print(f"Logo预处理完成: {target_size}x{target_size}")
-            
-            return logo
         except Exception as e:
             print(f"Logo预处理失败: {e}")
-            return None
+            logo, decoded = None, False
+        return (logo, decoded) if return_decoded else logo
     
     def generate_final_thumbnail(self, 
                                title: str,
@@ -826,8 +834,40 @@ class FinalThumbnailGenerator:
                                youtube_ready: bool = True,  # 是否优化为YouTube API兼容格式
                                source_language: str = None,  # 指定源语言('en'/'zh')，None时自动检测
                                target_language: str = None,  # 目标翻译语言('en'/'zh')，需要enable_ai_optimization
-                               enable_ai_optimization: bool = None) -> str:  # 是否启用AI优化，None时使用实例默认设置
-        """生成最终版缩略图"""
+                               enable_ai_optimization: bool = None,  # 是否启用AI优化，None时使用实例默认设置
+                               output_mode: str = "file",  # 输出方式: "file"(写入output_path), "bytes"(返回JPEG字节), "image"(返回PIL图片)
+                               render_size: Tuple[int, int] = None,  # 合成画布尺寸(16:9)，None时youtube_ready用1280x720，否则1600x900
+                               return_profile: bool = False,  # 是否同时返回各阶段耗时统计 (RenderProfile)
+                               ai_optimized_title: str = None,  # 已由AI优化的标题（异步入口预先完成优化时传入），跳过AI调用
+                               ai_time_budget: float = None,  # AI标题优化的时间预算（秒），None时使用 AI_TIME_BUDGET_SECONDS
+                               jpeg_subsampling: str = None,  # JPEG色度抽样: "4:4:4", "4:2:2", "4:2:0"，None时使用Pillow默认值(4:2:0)
+                               jpeg_qtables=None):  # 自定义JPEG量化表或Pillow预设名(如"web_high")
+        """生成最终版缩略图
+        
+        布局以1600x900为设计尺寸，按 render_size 等比例缩放后直接在目标分辨率上合成，
+        例如 youtube_ready 时直接合成1280x720，无需先合成1600x900再整体缩放。
+        
+        AI标题优化受 ai_time_budget 限制；Gemini持续失败或过慢时断路器跳闸，冷却期内
+        直接使用本地回退排版，不再等待请求超时。
+        
+        Returns:
+            output_mode="file" 时返回输出文件路径；"bytes" 时返回编码后的JPEG字节；
+            "image" 时返回未编码的PIL RGB图片。后两种模式不写入任何文件。
+            return_profile=True 时返回 (结果, RenderProfile)，包含各阶段耗时、图片缓冲区字节数、
+            缓存命中和JPEG编码结果（编码次数、质量、色度抽样），可用 profile.to_dict() 导出。
+        """
+        profile = RenderProfile(cache_info)
+        
+        def done(result):
+            """按 return_profile 决定是否附带统计信息返回"""
+            return (result, profile.finish()) if return_profile else result
+        
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"未知输出方式: {output_mode}，可用: {list(OUTPUT_MODES)}")
+        if render_size is None:
+            render_size = YOUTUBE_SIZE if youtube_ready else DESIGN_SIZE
+        render_size = tuple(render_size)
+        scale = _layout_scale(render_size)
         
         # Check if user wants random generation
         if theme == "random" or theme is None:
@@ -839,7 +879,12 @@ class FinalThumbnailGenerator:
                 right_image_path=right_image_path,
                 output_path=output_path,
                 gemini_api_key=self.title_optimizer.api_key if self.title_optimizer else None,
-                youtube_ready=youtube_ready
+                youtube_ready=youtube_ready,
+                output_mode=output_mode,
+                render_size=render_size,
+                return_profile=return_profile,
+                jpeg_subsampling=jpeg_subsampling,
+                jpeg_qtables=jpeg_qtables
             )
         
         print(f"开始生成最终缩略图: {output_path}")
@@ -851,16 +896,12 @@ class FinalThumbnailGenerator:
         
         # 根据主题选择模板和默认颜色
         actual_template_path = self.template_path
-        triangle_path = get_resource_path("templates/triangle_template.png")  # 默认黑色
+        triangle_color = "black"  # 默认黑色
         
         if theme == "light":
             # Light主题：白底黑字白三角
             actual_template_path = get_resource_path("templates/light_template.png")
-            # 根据方向选择三角形
-            if triangle_direction == "top":
-                triangle_path = get_resource_path("templates/triangle_white_top.png")
-            else:  # bottom
-                triangle_path = get_resource_path("templates/triangle_white.png")
+            triangle_color = "white"  # 白色三角形，方向在贴图时处理
             default_title_color = "#000000"  # 黑色字体
             default_author_color = "#666666"  # 深灰色作者
         elif theme == "custom":
@@ -873,15 +914,11 @@ class FinalThumbnailGenerator:
             actual_template_path = custom_template
             default_title_color = "#FFFFFF"  # 默认白字
             default_author_color = "#CCCCCC"  # 默认浅灰
-            triangle_path = None  # 自定义模板不使用三角形
+            triangle_color = None  # 自定义模板不使用三角形
         else:
             # Dark主题（默认）：黑底白字黑三角
             actual_template_path = self.template_path
-            # 根据方向选择三角形
-            if triangle_direction == "top":
-                triangle_path = get_resource_path("templates/triangle_black_top.png")
-            else:  # bottom
-                triangle_path = get_resource_path("templates/triangle_black.png")
+            triangle_color = "black"  # 黑色三角形，方向在贴图时处理
             default_title_color = "#FFFFFF"  # 白色字体
             default_author_color = "#CCCCCC"  # 浅灰色作者
         
@@ -919,145 +956,83 @@ class FinalThumbnailGenerator:
         
         print(f"实际模板: {actual_template_path}")
         print(f"标题颜色: {final_title_color}, 作者颜色: {final_author_color}")
-        print(f"三角形: {'启用' if use_triangle else '禁用'} - {triangle_path if use_triangle else 'None'}")
-        
-        # 打开模板图片
-        if theme == "custom":
-            # Custom模板需要确保尺寸为1600x900
-            template = self._ensure_template_size(actual_template_path)
-        else:
-            template = Image.open(actual_template_path)
+        print(f"三角形: {'启用' if use_triangle else '禁用'} - {f'{triangle_color}/{triangle_direction}' if use_triangle and triangle_color else 'None'}")
         
-        if template.mode != 'RGBA':
-            template = template.convert('RGBA')
+        # 打开模板图片（统一缩放/裁剪为合成画布尺寸）
+        template = self._load_template(actual_template_path, render_size)
+        profile.lap("template", template)
         
         width, height = template.size
-        print(f"模板尺寸: {width}x{height}")
-        
-        # 所有模板统一使用1600x900的布局
-        is_professional = True  # 统一使用专业模板布局
-        
-        # Flip 布局计算辅助函数
-        def calc_x_position(x, element_width=0):
-            """根据 flip 参数计算 X 位置"""
-            if not flip:
-                return x
-            else:
-                # 镜像翻转：x' = width - x - element_width
-                return width - x - element_width
+        print(f"合成画布尺寸: {width}x{height} (布局缩放比例 {scale:.3f})")
         
-        # 创建绘图对象
-        draw = ImageDraw.Draw(template)
-        
-        # 计算字体大小
-        title_size = self._calculate_font_size(width, height, "title")
- 
-        author_size = self._calculate_font_size(width, height, "author")
-        
-        print(f"计算字体大小 - 标题:{title_size} 作者:{author_size}")
+        def px(value):
+            """将1600x900设计尺寸下的像素值换算为合成画布像素"""
+            return int(round(value * scale))
         
         # 第一层: 添加右侧图片（如果有）
+        right_img = None
         if right_image_path and os.path.exists(right_image_path):
+            right_img, right_decoded = None, False
             try:
-                right_img = Image.open(right_image_path)
-                if right_img.mode != 'RGBA':
-                    right_img = right_img.convert('RGBA')
-                
-                # 将输入图片转换为正方形
-                right_img = self._convert_to_square(right_img)
-                
-                # 确定右侧区域 - 新布局：左侧700px，右侧900px（flip时相反）
-                if is_professional:  # 1600x900 -> 700x900 + 900x900
-                    if not flip:
-                        right_area = (700, 0, 1600, 900)
-                    else:
-                        right_area = (0, 0, 900, 900)  # flip时图片在左侧
-                else:  # 1280x720
-                    if not flip:
-                        right_area = (640, 0, 1280, 720)
-                    else:
-                        right_area = (0, 0, 640, 720)
+                # 右侧区域 - 设计布局：左侧700px，右侧900px（flip时相反），按比例缩放
+                right_size = height  # 右侧图片为画布高度的正方形 (1600x900时为900)
+                if not flip:
+                    right_area = (width - right_size, 0, width, height)
+                else:
+                    right_area = (0, 0, right_size, height)  # flip时图片在左侧
                 
-                right_width = right_area[2] - right_area[0]
-                right_height = right_area[3] - right_area[1]
+                print(f"右侧区域: {right_size}x{right_size}")
                 
-                print(f"右侧区域: {right_width}x{right_height}")
+                # 将输入图片按目标尺寸解码并直接转换为右侧区域大小的正方形
+                # 缓存中的共享图片只读取不修改，三角形直接贴到画布上，无需复制
+                right_img, right_decoded = self._load_square_image(right_image_path, right_size,
+                                                                   return_decoded=True)
                 
-                # 对于专业模板，直接缩放正方形图片到900x900
-                if is_professional:
-                    # 缩放到900x900填满右侧区域
-                    right_img = right_img.resize((900, 900), Image.Resampling.LANCZOS)
-                    
-                    # 根据参数决定是否添加三角形效果
-                    if use_triangle and triangle_path:
-                        try:
-                            if os.path.exists(triangle_path):
-                                triangle = Image.open(triangle_path)
-                                if triangle.mode != 'RGBA':
-                                    triangle = triangle.convert('RGBA')
-                                
-                                # 确保三角形尺寸匹配right_img高度
-                                triangle_width, triangle_height = triangle.size
-                                if triangle_height != 900:
-                                    # 按比例缩放到900高度
-                                    new_width = int(triangle_width * 900 / triangle_height)
-                                    triangle = triangle.resize((new_width, 900), Image.Resampling.LANCZOS)
-                                    print(f"三角形缩放到right_img尺寸: {triangle_width}x{triangle_height} -> {new_width}x900")
-                                
-                                # 在right_img的左侧贴三角形 (flip时贴在右侧并水平翻转)
-                                if not flip:
-                                    right_img.paste(triangle, (0, 0), triangle)
-                                    print(f"三角形已贴到right_img左侧: 尺寸{triangle.size}")
-                                else:
-                                    # flip时：1.水平翻转三角形 2.贴在右侧
-                                    triangle = triangle.transpose(Image.FLIP_LEFT_RIGHT)
-                                    triangle_x = right_img.width - triangle.width
-                                    right_img.paste(triangle, (triangle_x, 0), triangle)
-                                    print(f"三角形已水平翻转并贴到right_img右侧: 位置({triangle_x}, 0), 尺寸{triangle.size}")
-                                
-                        except Exception as e:
-                            print(f"在right_img上贴三角形失败: {e}")
-                    
-                    # 使用right_area的x坐标，已经考虑了flip
-                    paste_x = right_area[0]  # flip时是0，标准时是700
-                    paste_y = 0
-                else:
-                    # 标准模板保持原有逻辑
-                    img_ratio = right_img.width / right_img.height
-                    area_ratio = right_width / right_height
-                    
-                    if img_ratio > area_ratio:
-                        new_height = right_height
-                        new_width = int(new_height * img_ratio)
-                    else:
-                        new_width = right_width
-                        new_height = int(new_width / img_ratio)
-                    
-                    right_img = right_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    # 居中放置
-                    paste_x = right_area[0] + (right_width - new_width) // 2
-                    paste_y = right_area[1] + (right_height - new_height) // 2
+                # 使用right_area的x坐标，已经考虑了flip
+                paste_x = right_area[0]  # flip时是0，标准时是700(按比例缩放)
+                paste_y = 0
                 
-                # 使用计算好的居中位置
-                template.paste(right_img, (paste_x, paste_y), right_img)
+                # 不透明图片直接覆盖，不做alpha混合
+                _paste_layer(template, right_img, (paste_x, paste_y))
                 position_desc = "左侧" if flip else "右侧"
                 print(f"{position_desc}图片已添加: {right_image_path} -> ({paste_x}, {paste_y})")
                 
+                # 根据参数决定是否添加三角形效果
+                if use_triangle and triangle_color:
+                    try:
+                        # 程序化三角形遮罩（内存缓存），高度与right_img一致，flip时已水平翻转
+                        triangle = get_triangle_overlay(triangle_color, triangle_direction, flip,
+                                                        px(TRIANGLE_WIDTH), right_img.height)
+                        
+                        # 在右侧图片的左边缘贴三角形 (flip时贴在右边缘)，只混合三角形区域
+                        if not flip:
+                            template.paste(triangle, (paste_x, paste_y), triangle)
+                            print(f"三角形已贴到右侧图片左边缘: 尺寸{triangle.size}")
+                        else:
+                            triangle_x = paste_x + right_img.width - triangle.width
+                            template.paste(triangle, (triangle_x, paste_y), triangle)
+                            print(f"三角形已水平翻转并贴到图片右边缘: 位置({triangle_x}, {paste_y}), 尺寸{triangle.size}")
+                            
+                    except Exception as e:
+                        print(f"贴三角形失败: {e}")
+                
             except Exception as e:
                 print(f"右侧图片添加失败: {e}")
+            # 只有缓存未命中时解码出的图片才是本次渲染新分配的缓冲区
+            profile.lap("right_image", right_img if right_decoded else None)
         
         # 第二层: 添加Logo（如果有） - 修复：左边距=上边距
         if logo_path and os.path.exists(logo_path):
+            logo, logo_decoded = None, False
             try:
                 # 使用预处理函数，确保logo是正方形
-                logo = self._preprocess_logo(logo_path, target_size=LOGO_SIZE)
+                logo_size = px(LOGO_SIZE)   # Logo配置大小（按画布比例缩放）
+                logo, logo_decoded = self._preprocess_logo(logo_path, target_size=logo_size, return_decoded=True)
                 if logo is None:
                     raise Exception("Logo预处理失败")
                 
                 # Logo位置计算（使用配置的logo尺寸）
-                logo_margin = 20  # Logo边距设置为20px
-                logo_size = LOGO_SIZE   # Logo配置大小
+                logo_margin = px(20)  # Logo边距设置为20px
                 
                 if not flip:
                     # 标准布局：左上角
@@ -1070,30 +1045,23 @@ class FinalThumbnailGenerator:
                 
                 print(f"Logo位置: ({logo_x}, {logo_y}), 大小: {logo_size}x{logo_size}")
                 
-                # 直接贴图（logo已经是配置尺寸的正方形）
-                template.paste(logo, (logo_x, logo_y), logo)
+                # 直接贴图（logo已经是配置尺寸的正方形，不透明时不做alpha混合）
+                _paste_layer(template, logo, (logo_x, logo_y))
                 
                 position_desc = "左上角" if not flip else "右上角"
                 print(f"Logo已添加到{position_desc}: {logo_path} -> 位置({logo_x}, {logo_y})")
                 
             except Exception as e:
                 print(f"Logo添加失败: {e}")
+            profile.lap("logo", logo if logo_decoded else None)
         
         # 第三层: 使用PNG贴图方式添加标题文字
         # 标题边距全局变量
         title_margin = 50  # 标题左边距，统一控制
         base_margin = flip_margin if flip_margin is not None else title_margin
         
-        if is_professional:
-            text_x = base_margin  # 标准左边距，与Logo对齐
-            title_y = 330  # 标题位置居中显示
-            
-            # 定义PNG尺寸
-            title_png_size = (600, 300)
-        else:
-            text_x = 45  # 从40px调整到45px，往右5像素
-            title_y = 280  # 标准模板居中位置
-            title_png_size = (500, 250)
+        text_x = px(base_margin)  # 标准左边距，与Logo对齐
+        title_y = px(330)  # 标题位置居中显示
         
         # 暂存标题PNG，等三角形覆盖后再贴入
         title_img_data = None
@@ -1109,13 +1077,18 @@ class FinalThumbnailGenerator:
             # 决定是否使用AI优化
             use_ai = enable_ai_optimization if enable_ai_optimization is not None else (self.title_optimizer and self.title_optimizer.is_available)
             
-            if use_ai and self.title_optimizer and self.title_optimizer.is_available:
+            if ai_optimized_title:
+                title = ai_optimized_title
+                ai_optimized = True
+                print(f"Title optimized by Gemini (async): '{original_title}' -> '{title}'")
+            elif use_ai and self.title_optimizer and self.title_optimizer.is_available:
                 try:
                     # 使用AI优化，考虑语言参数
                     title, was_optimized = self.title_optimizer.optimize_title(
                         title,
                         source_language=source_language,
-                        target_language=target_language
+                        target_language=target_language,
+                        timeout=ai_time_budget if ai_time_budget is not None else AI_TIME_BUDGET_SECONDS
                     )
                     if was_optimized:
                         print(f"Title optimized by Gemini: '{original_title}' -> '{title}'")
@@ -1131,6 +1104,11 @@ class FinalThumbnailGenerator:
                     print("Title optimization requested but no API key configured")
                 else:
                     print("Title optimization skipped")
+            if self.title_optimizer:
+                # 断路器状态随渲染统计一起输出，便于在监控中观察Gemini的健康状况
+                profile.record_ai(ai_optimized, ai_time_budget if ai_time_budget is not None else AI_TIME_BUDGET_SECONDS,
+                                  self.title_optimizer.breaker.snapshot())
+            profile.lap("title_ai")
             
             # Only apply manual processing if AI optimization was not used (fallback logic)
             if not ai_optimized:
@@ -1163,7 +1141,7 @@ class FinalThumbnailGenerator:
             
             title_rgb = hex_to_rgb(final_title_color)
             
-            success, title_img, _ = create_text_png(
+            title_img, title_rendered = _lookup_text_sprite(
                 text=title,
                 width=550,  # 从600改为550，给右侧更多缓冲空间
                 height=280,  # 基础高度，将根据行数动态调整
@@ -1172,10 +1150,11 @@ class FinalThumbnailGenerator:
                 auto_height=True,  # 启用自动高度调整，支持1-3行动态高度
                 max_lines=max_title_lines,  # 英文3行，中文6行
                 use_stroke=(theme == "custom"),  # custom主题使用黑色描边
-                align='right' if flip else 'left'  # flip模式下使用右对齐
+                align='right' if flip else 'left',  # flip模式下使用右对齐
+                scale=scale  # 按设计尺寸排版，直接在画布分辨率下渲染
             )
             
-            if success:
+            if title_img is not None:
                 # 获取标题PNG图片的实际尺寸
                 title_img_width = title_img.size[0]  # PNG图片宽度 (应该是550)
                 title_img_height = title_img.size[1]  # PNG图片高度 (动态: 160/260/360px)
@@ -1186,8 +1165,8 @@ class FinalThumbnailGenerator:
                     final_text_x = text_x
                 else:
                     # flip布局：X = 1600 - title_image_width - title_margin_right
-                    # 1600 - 550 - 50 = 1000
-                    final_text_x = width - title_img_width - title_margin
+                    # 1600 - 550 - 50 = 1000 (按比例缩放)
+                    final_text_x = width - title_img_width - px(title_margin)
                 
                 # 计算Y位置：垂直居中标题PNG在背景中
                 # 背景高度900px，需要将title_img_height居中
@@ -1198,13 +1177,15 @@ class FinalThumbnailGenerator:
                 title_img_data = (title_img, final_text_x, final_text_y)
                 print(f"标题PNG已生成: 位置({final_text_x}, {final_text_y}), PNG尺寸: {title_img_width}x{title_img_height}px")
                 print(f"标题布局: {'右对齐' if flip else '左对齐'}, 动态垂直居中")
+            # 命中缓存的遮罩不是本次渲染分配的，不计入
+            profile.lap("title_text", *(title_img.masks if title_img is not None and title_rendered else []))
         
         
         # 作者 - 使用PNG方式，固定在底部上方100px位置
         author_img_data = None
         if author:
             # 无论什么模板，作者都应该在底部上方100px的位置
-            author_y = height - 100  # 距离底部100px
+            author_y = height - px(100)  # 距离底部100px（按比例缩放）
             
             # 将作者名改为全大写
             author_upper = author.upper()
@@ -1218,7 +1199,7 @@ class FinalThumbnailGenerator:
             author_rgb = hex_to_rgb(final_author_color)
             
             # 创建作者PNG，宽度限制为400px
-            success, author_img, _ = create_text_png(
+            author_img, author_rendered = _lookup_text_sprite(
                 text=author_upper,
                 width=400,
                 height=60,  # 作者文字高度
@@ -1226,10 +1207,11 @@ class FinalThumbnailGenerator:
                 language='english',
                 auto_height=False,
                 max_lines=1,
-                align='right' if flip else 'left'  # flip模式下使用右对齐
+                align='right' if flip else 'left',  # flip模式下使用右对齐
+                scale=scale
             )
             
-            if success:
+            if author_img is not None:
                 # 获取作者PNG图片的实际尺寸
                 author_img_width = author_img.size[0]  # PNG图片宽度 (应该是400)
                 
@@ -1239,12 +1221,13 @@ class FinalThumbnailGenerator:
                     author_x = text_x
                 else:
                     # flip布局：X = 1600 - author_image_width - title_margin_right
-                    # 1600 - 400 - 50 = 1150
-                    author_x = width - author_img_width - title_margin
+                    # 1600 - 400 - 50 = 1150 (按比例缩放)
+                    author_x = width - author_img_width - px(title_margin)
                 
                 author_img_data = (author_img, author_x, author_y)
                 print(f"作者PNG已生成: 位置({author_x}, {author_y}), PNG宽度: {author_img_width}px")
                 print(f"作者全大写: {author_upper}, {'右对齐' if flip else '左对齐'}")
+            profile.lap("author_text", *(author_img.masks if author_img is not None and author_rendered else []))
         
         # 三角形已经在right_img处理阶段贴入，这里不再需要单独处理
         print("三角形效果已集成到右侧图片中")
@@ -1252,41 +1235,137 @@ class FinalThumbnailGenerator:
         # 最终步骤: 贴入标题和作者PNG（在三角形之上）
         if title_img_data:
             title_img, tx, ty = title_img_data
-            template.paste(title_img, (tx, ty), title_img)
+            title_img.paste_onto(template, (tx, ty))
             print(f"标题PNG最终贴入: 位置({tx}, {ty}) [最上层]")
         
         if author_img_data:
             author_img, ax, ay = author_img_data
-            template.paste(author_img, (ax, ay), author_img)
+            author_img.paste_onto(template, (ax, ay))
             print(f"作者PNG最终贴入: 位置({ax}, {ay}) [最上层]")
         
-        # 保存结果
-        if template.mode == 'RGBA':
-            # 转换为RGB保存为JPG，使用黑色背景
-            rgb_image = Image.new('RGB', template.size, (0, 0, 0))
-            rgb_image.paste(template, mask=template.split()[-1])
-            rgb_image.save(output_path, 'JPEG', quality=95)
+        # 画布始终为RGB（模板透明部分已在加载时合成到黑色背景），无需再整体拍平
+        final_image = template
+        profile.lap("composite")
+        
+        # If YouTube API optimization is requested, process in memory (no temp files)
+        if youtube_ready:
+            print("🚀 Processing for YouTube API compliance...")
+            prepared = _prepare_for_youtube(final_image)
+            profile.lap("youtube_prepare", prepared if prepared is not final_image else None)
+            final_image = prepared
+        
+        if output_mode == "image":
+            print(f"最终缩略图生成完成 (内存图片): {final_image.size[0]}x{final_image.size[1]}")
+            return done(final_image)
+        
+        # 只编码一次
+        if youtube_ready:
+            encoded = _encode_youtube_jpeg(final_image, subsampling=jpeg_subsampling, qtables=jpeg_qtables)
+            data = encoded.data
+            profile.record_encode(encoded.attempts, encoded.quality, len(data), encoded.subsampling)
         else:
-            template.save(output_path, 'JPEG', quality=95)
+            save_kwargs = {}
+            if jpeg_subsampling is not None:
+                save_kwargs['subsampling'] = jpeg_subsampling
+            if jpeg_qtables is not None:
+                save_kwargs['qtables'] = jpeg_qtables
+            buffer = io.BytesIO()
+            final_image.save(buffer, 'JPEG', quality=95, **save_kwargs)
+            data = buffer.getvalue()
+            profile.record_encode(1, 95, len(data), jpeg_subsampling)
+        profile.lap("encode")
+        
+        if output_mode == "bytes":
+            print(f"最终缩略图生成完成 (内存JPEG): {len(data):,} bytes")
+            return done(data)
         
-        print(f"最终缩略图生成完成: {output_path}")
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        profile.lap("write")
         
-        # If YouTube API optimization is requested, process the output
         if youtube_ready:
-            print("🚀 Processing for YouTube API compliance...")
-            # Use the original output_path for the optimized version
-            temp_path = output_path.replace('.jpg', '_temp_original.jpg')
-            # Rename current output to temp
-            os.rename(output_path, temp_path)
-            # Optimize to the original output_path
-            youtube_optimized_path = optimize_for_youtube_api(temp_path, output_path)
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            print(f"✅ YouTube-ready thumbnail: {youtube_optimized_path}")
-            return youtube_optimized_path
-        
-        return output_path
+            print(f"✅ YouTube-ready thumbnail: {output_path}")
+        else:
+            print(f"最终缩略图生成完成: {output_path}")
+        return done(output_path)
+    
+    async def generate_final_thumbnail_async(self, title: str, ai_timeout: float = None, hedge: bool = True,
+                                             **kwargs):
+        """generate_final_thumbnail 的asyncio入口
+        
+        AI标题优化以协程执行（进程内并发上限、截止时间、超过p95延迟时发送对冲请求），
+        等待Gemini响应期间不占用线程；超时或失败时使用原标题的本地回退排版。
+        合成与编码在默认线程池中执行，不阻塞事件循环。
+        
+        Args:
+            title: 标题
+            ai_timeout: AI优化的截止时间（秒），None时使用 ai_time_budget 参数或 AI_TIME_BUDGET_SECONDS
+            hedge: 是否启用对冲请求
+            **kwargs: 其余参数与 generate_final_thumbnail 相同
+            
+        Returns:
+            与 generate_final_thumbnail 相同
+        """
+        import asyncio
+        
+        optimizer = self.title_optimizer
+        enable_ai_optimization = kwargs.get("enable_ai_optimization")
+        use_ai = enable_ai_optimization if enable_ai_optimization is not None else (optimizer and optimizer.is_available)
+        # 随机主题由 generate_random_thumbnail 自行处理标题
+        random_theme = "theme" in kwargs and kwargs["theme"] in ("random", None)
+        
+        if title and use_ai and optimizer and optimizer.is_available and not random_theme:
+            optimized_title, was_optimized = await optimizer.optimize_title_async(
+                title,
+                source_language=kwargs.get("source_language"),
+                target_language=kwargs.get("target_language"),
+                timeout=ai_timeout if ai_timeout is not None else (kwargs.get("ai_time_budget") or AI_TIME_BUDGET_SECONDS),
+                hedge=hedge
+            )
+            if was_optimized:
+                kwargs["ai_optimized_title"] = optimized_title
+            # 同步渲染中不再重复调用AI
+            kwargs["enable_ai_optimization"] = False
+        
+        return await asyncio.to_thread(self.generate_final_thumbnail, title, **kwargs)
+    
+    def generate_thumbnail_presets(self,
+                                   title: str,
+                                   presets: List[str] = None,
+                                   output_dir: str = None,
+                                   base_name: str = "thumbnail",
+                                   output_mode: str = "file",
+                                   **kwargs) -> Dict[str, Any]:
+        """合成一次，输出多个尺寸预设 (youtube_hd, youtube_full, blog_feature, social_share)
+        
+        直接在最大预设尺寸上合成，然后通过共享缩放链逐级缩小到其余预设，
+        各预设的JPEG编码并行执行，无需为每个预设重新读取已保存的JPEG。
+        
+        Args:
+            title: 标题文字
+            presets: 预设名称列表，None时输出全部预设
+            output_dir: 输出目录 (output_mode="file")
+            base_name: 输出文件名前缀，文件名为 {base_name}_{preset}.jpg
+            output_mode: "file" 写入文件，"bytes" 返回JPEG字节
+            **kwargs: 传给 generate_final_thumbnail 的其它参数 (author, theme, logo_path 等)
+            
+        Returns:
+            dict: 预设名称 -> 输出路径或JPEG字节
+        """
+        optimizer = ThumbnailOptimizer()
+        presets = list(presets) if presets else list(optimizer.OUTPUT_PRESETS)
+        unknown = [p for p in presets if p not in optimizer.OUTPUT_PRESETS]
+        if unknown:
+            raise ValueError(f"未知预设: {unknown}，可用: {list(optimizer.OUTPUT_PRESETS.keys())}")
+        
+        # 以最大预设尺寸作为合成画布，只合成一次
+        largest = max((optimizer.OUTPUT_PRESETS[p]['size'] for p in presets), key=lambda size: size[0])
+        kwargs.pop("youtube_ready", None)
+        kwargs.pop("render_size", None)
+        image = self.generate_final_thumbnail(title=title, youtube_ready=False, output_mode="image",
+                                              render_size=largest, **kwargs)
+        return optimizer.render_presets(image, presets, output_dir=output_dir, base_name=base_name,
+                                        output_mode=output_mode)
     
     def readme(self) -> str:
         """
@@ -1346,6 +1425,11 @@ result = generator.generate_final_thumbnail(
 - `triangle_direction` (str): "top" or "bottom" (default: "bottom")
 - `flip` (bool): Mirror layout horizontally (default: False)
 - `youtube_ready` (bool): Optimize for YouTube API (default: True)
+- `render_size` (tuple): 16:9 canvas to composite at, e.g. (3840, 2160); default 1280x720 when youtube_ready, else 1600x900
+- `output_mode` (str): "file" (default), "bytes" (return JPEG bytes) or "image" (return PIL image); in-memory modes write nothing to disk
+- `return_profile` (bool): Also return a RenderProfile with per-stage wall time, image buffer bytes, cache hits and encode attempts (`profile.to_dict()` for dashboards)
+- `jpeg_subsampling` (str): JPEG chroma subsampling, "4:4:4", "4:2:2" or "4:2:0" (default: Pillow's 4:2:0)
+- `jpeg_qtables`: Custom JPEG quantization tables or a Pillow preset name such as "web_high"
 
 ## Color Customization
 ```python
@@ -1599,7 +1683,12 @@ def generate_random_thumbnail(title: str,
                             output_path: str = "random_thumbnail.jpg",
                             gemini_api_key: str = None,
                             google_api_key: str = None,
-                            youtube_ready: bool = True) -> str:
+                            youtube_ready: bool = True,
+                            output_mode: str = "file",
+                            render_size: Tuple[int, int] = None,
+                            return_profile: bool = False,
+                            jpeg_subsampling: str = None,
+                            jpeg_qtables=None):
     """
     Generate thumbnail with randomly selected template configuration
     
@@ -1620,9 +1709,17 @@ def generate_random_thumbnail(title: str,
         gemini_api_key (str, optional): Gemini API key for AI title optimization
         google_api_key (str, optional): Deprecated. Use gemini_api_key instead
         youtube_ready (bool): Whether to optimize for YouTube API compliance
+        output_mode (str): "file" (write output_path), "bytes" (return JPEG bytes)
+                           or "image" (return PIL image); in-memory modes write nothing
+        render_size (tuple, optional): 16:9 canvas size to composite at; defaults to 1280x720
+                                       when youtube_ready, otherwise 1600x900
+        return_profile (bool): Also return the per-stage RenderProfile
+        jpeg_subsampling (str, optional): JPEG chroma subsampling ("4:4:4", "4:2:2", "4:2:0")
+        jpeg_qtables (optional): Custom JPEG quantization tables or a Pillow preset name
         
     Returns:
-        str: Path to generated thumbnail file
+        str | bytes | Image.Image: Output path, or the in-memory result for output_mode="bytes"/"image";
+        a (result, RenderProfile) tuple when return_profile=True
         
     Example:
         # Simple usage - only provide title and author
@@ -1669,7 +1766,12 @@ def generate_random_thumbnail(title: str,
         enable_triangle=config["enable_triangle"],
         triangle_direction=config["triangle_direction"],
         flip=config["flip"],
-        youtube_ready=youtube_ready
+        youtube_ready=youtube_ready,
+        output_mode=output_mode,
+        render_size=render_size,
+        return_profile=return_profile,
+        jpeg_subsampling=jpeg_subsampling,
+        jpeg_qtables=jpeg_qtables
     )
     
     print(f"🎉 Random thumbnail generated successfully!")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Shared font registry
+Discovers the best installed font per language once and caches FreeType font
+objects by (path, size, index) for every renderer in the process.
+"""
+
+import os
+import platform
+import threading
+from typing import Dict, List, Optional
+
+from PIL import ImageFont
+
+try:
+    from .image_cache import ImageCache, CacheInfo
+except ImportError:
+    from image_cache import ImageCache, CacheInfo
+
+FONT_CACHE_MAX_ENTRIES = 64  # 缓存的字体对象上限（每个 路径/字号/索引 组合一个）
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")  # 随包分发的内置字体目录
+
+# 各平台字体优先级列表
+FONT_CANDIDATES = {
+    "chinese": {
+        "Linux": [
+            "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+            "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttf",
+            "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+            "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+            "/usr/share/fonts/truetype/arphic-uming/uming.ttc"
+        ],
+        "Darwin": [
+            "/System/Library/Fonts/STHeiti Medium.ttc",  # 优先使用较粗的Medium weight
+            "/Library/Fonts/NotoSansCJK-Bold.ttc",
+            "/System/Library/Fonts/Hiragino Sans GB.ttc",
+            "/System/Library/Fonts/PingFang.ttc"
+        ],
+        "Windows": [
+            "C:\\Windows\\Fonts\\simhei.ttf",
+            "C:\\Windows\\Fonts\\msyh.ttc",
+            "C:\\Windows\\Fonts\\simsun.ttc"
+        ],
+    },
+    "english": {
+        "Linux": [
+            "/usr/share/fonts/truetype/lexend/Lexend-Bold.ttf",
+            "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
+            "/usr/share/fonts/truetype/ubuntu-font-family/Ubuntu-Bold.ttf",
+            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+        ],
+        "Darwin": [
+            os.path.expanduser("~/Library/Fonts/Lexend/Lexend-Bold.ttf"),  # 用户目录下的Lexend Bold
+            "/Library/Fonts/Lexend-Bold.ttf",  # 系统级Lexend Bold
+            "/System/Library/Fonts/Supplemental/Arial Bold.ttf",  # Arial Bold优先于普通Arial
+            "/Library/Fonts/Arial Bold.ttf",   # 用户安装的Arial Bold
+            "/System/Library/Fonts/Arial.ttf",
+            "/System/Library/Fonts/Helvetica.ttc"  # Helvetica作为最后fallback
+        ],
+        "Windows": [
+            "C:\\Windows\\Fonts\\arial.ttf",
+            "C:\\Windows\\Fonts\\arialbd.ttf",
+            "C:\\Windows\\Fonts\\calibri.ttf"
+        ],
+    },
+}
+
+# 系统字体都不存在时使用的内置字体：中文优先 Noto，fallback 到 Ubuntu
+BUILTIN_FONTS = {
+    "chinese": ["NotoSansCJK-Bold.ttc", "Ubuntu-B.ttf"],
+    "english": ["Ubuntu-B.ttf"],
+}
+
+
+def font_candidates(language: str = "english", system: str = None) -> List[str]:
+    """Font paths tried for a language, in priority order (system fonts, then bundled fonts)"""
+    language = "chinese" if language == "chinese" else "english"
+    system = system or platform.system()
+    paths = list(FONT_CANDIDATES[language].get(system, []))
+    paths.extend(os.path.join(FONT_DIR, name) for name in BUILTIN_FONTS[language])
+    return paths
+
+
+class FontRegistry:
+    """Thread-safe font discovery and FreeType font object cache
+
+    Font discovery (which candidate file exists and loads) runs once per language.
+    Font objects are cached by (path, size, index) with LRU eviction; they are
+    shared between callers and threads and must not be mutated.
+
+    Fonts are always opened by path. FreeType then memory-maps the file read-only,
+    so every size, and every worker process, shares the same page-cache pages of
+    e.g. a 20MB NotoSansCJK collection. Loading from bytes or file objects instead
+    makes Pillow copy the whole file into each font object, once per size.
+    """
+
+    def __init__(self, max_fonts: int = FONT_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            max_fonts: Maximum number of cached font objects
+        """
+        # 复用图片LRU缓存，每个字体对象按1计入预算
+        self._fonts = ImageCache(max_fonts, name="fonts", sizeof=lambda font: 1)
+        self._discovered: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def get_font(self, path: str, size: int, index: int = 0) -> ImageFont.FreeTypeFont:
+        """Return the cached FreeType font for (path, size, index), loading it on first use
+
+        Raises OSError if the font file cannot be loaded.
+        """
+        return self._fonts.get_or_create((path, size, index), lambda: ImageFont.truetype(path, size, index=index))
+
+    def find_font_path(self, language: str = "english") -> Optional[str]:
+        """Path of the first installed candidate font for language (discovered once), or None"""
+        language = "chinese" if language == "chinese" else "english"
+        if language in self._discovered:
+            return self._discovered[language]
+        with self._lock:
+            if language not in self._discovered:
+                self._discovered[language] = self._discover(language)
+            return self._discovered[language]
+
+    def _discover(self, language: str) -> Optional[str]:
+        for path in font_candidates(language):
+            if not os.path.exists(path):
+                continue
+            try:
+                ImageFont.truetype(path, 12)
+                print(f"成功加载字体: {path}")
+                return path
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+        print(f"No suitable font found for {language}, using system default")
+        return None
+
+    def get_best_font(self, language: str = "english", size: int = 60):
+        """Best available font for language at size; Pillow's default font when none is installed"""
+        path = self.find_font_path(language)
+        if path is not None:
+            try:
+                return self.get_font(path, size)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+        return ImageFont.load_default()
+
+    def preload(self, languages=("english", "chinese"), sizes=(45, 58, 60)) -> int:
+        """Load the best font for each language at the given sizes
+
+        Call this in a parent process before forking workers: the children inherit
+        the parsed font objects (copy-on-write) instead of each opening them again.
+
+        Returns:
+            int: Number of fonts now cached for the requested languages and sizes
+        """
+        loaded = 0
+        for language in languages:
+            path = self.find_font_path(language)
+            if path is None:
+                continue
+            for size in sizes:
+                try:
+                    self.get_font(path, size)
+                    loaded += 1
+                except Exception as e:
+                    print(f"Failed to load {path}: {e}")
+        return loaded
+
+    def clear(self) -> None:
+        """Forget discovered fonts and drop all cached font objects"""
+        with self._lock:
+            self._discovered.clear()
+        self._fonts.clear()
+
+    def cache_info(self) -> CacheInfo:
+        """Font object cache statistics (byte fields count font objects)"""
+        return self._fonts.cache_info()
+
+
+# 进程内共享的字体注册表
+_registry = FontRegistry()
+
+
+def get_font(path: str, size: int, index: int = 0) -> ImageFont.FreeTypeFont:
+    """Cached FreeType font for (path, size, index) from the shared registry"""
+    return _registry.get_font(path, size, index)
+
+
+def get_best_font(language: str = "english", size: int = 60):
+    """Best available font for language at size from the shared registry"""
+    return _registry.get_best_font(language, size)
+
+
+def preload_fonts(languages=("english", "chinese"), sizes=(45, 58, 60)) -> int:
+    """Preload fonts into the shared registry, e.g. before forking worker processes"""
+    return _registry.preload(languages, sizes)
+
+
+def font_cache_info() -> CacheInfo:
+    """Statistics of the shared font object cache"""
+    return _registry.cache_info()
@@ -1,11 +1,35 @@
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
 import textwrap
-import platform
 
+try:
+    from .render_profile import RenderProfile
+    from .font_registry import get_best_font, font_cache_info
+    from .text_metrics import text_width, wrap_chars, metrics_cache_info
+    from .text_effects import draw_text_effects
+except ImportError:
+    from render_profile import RenderProfile
+    from font_registry import get_best_font, font_cache_info
+    from text_metrics import text_width, wrap_chars, metrics_cache_info
+    from text_effects import draw_text_effects
 
-def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None, text_color=(255, 255, 255), shadow_color=(0, 0, 0), shadow_offset=5, line_spacing=1.2, max_width_ratio=0.8, is_landscape=True, width=1600, height=900, font_name=None, language='chinese'):
+
+def _cache_info():
+    """章节文字渲染使用的缓存统计：字体对象缓存和字形度量缓存"""
+    return {"fonts": font_cache_info(), "text_metrics": metrics_cache_info()}
+
+def _wrap_chinese(text, font, max_text_width, keep_empty):
+    """Character-by-character wrapping using the font's cached glyph widths"""
+    try:
+        return wrap_chars(text, font, max_text_width, keep_empty=keep_empty)
+    except Exception:
+        # Fallback if measurement fails: estimate 30px per character
+        chars_per_line = max(1, max_text_width // 30)
+        return [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
+
+
+def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None, text_color=(255, 255, 255), shadow_color=(0, 0, 0), shadow_offset=5, line_spacing=1.2, max_width_ratio=0.8, is_landscape=True, width=1600, height=900, font_name=None, language='chinese', return_profile=False):
     """
     Adds a centered quotation text to an image, supporting Chinese and English.
     Automatically selects Chinese font based on environment (TB, Mac, AWS).
@@ -23,10 +47,17 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
         is_landscape (bool): If True, landscape; else portrait
         width (int): Image width
         height (int): Image height
+        return_profile (bool): If True, also return a RenderProfile with per-stage timings
     Returns:
         bool: True if successful, False otherwise
         str: Path to the output image if successful, None otherwise
+        RenderProfile: Only when return_profile=True
     """
+    profile = RenderProfile(_cache_info)
+
+    def done(*result):
+        return (*result, profile.finish()) if return_profile else result
+
     # Setup output directory
     if output_path is None:
         os.makedirs("Temps", exist_ok=True)
@@ -43,8 +74,10 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
             width, height = img.size
         except Exception as e:
             print(f"Error opening image: {e}")
-            return False, None
+            return done(False, None)
     else: img = Image.new('RGB', (width, height), color='black')
+    img.load()
+    profile.lap("load", img)
     
     # Create draw object
     draw = ImageDraw.Draw(img)
@@ -58,84 +91,9 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
         # Use 9.6% of the shorter dimension for font size
         font_size = int(base_dimension * 0.096)
     
-    # Load font based on font_name
-    font = None
-    font_paths = []
-
-    if language == 'chinese': font_name = "Noto Sans CJK SC"
-    else: font_name = "Lexend Bold"
-
-    # 使用通用字体检测系统
-    # Use universal font detection system
-    system = platform.system()
-    
-    if font_name == "Lexend Bold":
-        if system == "Linux":
-            font_paths = [
-                "/usr/share/fonts/truetype/lexend/Lexend-Bold.ttf",
-                "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf", 
-                "/usr/share/fonts/truetype/ubuntu-font-family/Ubuntu-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            ]
-        elif system == "Darwin":  # macOS
-            font_paths = [
-                "/System/Library/Fonts/Helvetica.ttc",
-                "/System/Library/Fonts/Arial.ttf", 
-                "/Library/Fonts/Arial Bold.ttf"
-            ]
-        elif system == "Windows":
-            font_paths = [
-                "C:\\Windows\\Fonts\\arial.ttf",
-                "C:\\Windows\\Fonts\\arialbd.ttf",
-                "C:\\Windows\\Fonts\\calibri.ttf"
-            ]
-    elif font_name == "Ubuntu Bold" or font_name == "Ubuntu": 
-       font_paths = [
-            "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",  
-            "/usr/share/fonts/ubuntu/Ubuntu-B.ttf",
-            "/usr/share/fonts/truetype/ubuntu-font-family/Ubuntu-Bold.ttf",
-            "/System/Library/Fonts/Helvetica.ttc",
-            "/Library/Fonts/Arial Bold.ttf"
-        ]
-    elif font_name == "Noto Sans CJK SC":
-        if system == "Linux":
-            font_paths = [
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                "/usr/share/fonts/truetype/arphic-uming/uming.ttc"
-            ]
-        elif system == "Darwin":  # macOS
-            font_paths = [
-                "/System/Library/Fonts/Hiragino Sans GB.ttc",
-                "/Library/Fonts/NotoSansCJK-Bold.ttc",
-                "/System/Library/Fonts/STHeiti Medium.ttc",
-                "/System/Library/Fonts/PingFang.ttc"
-            ]
-        elif system == "Windows":
-            font_paths = [
-                "C:\\Windows\\Fonts\\simhei.ttf",
-                "C:\\Windows\\Fonts\\msyh.ttc", 
-                "C:\\Windows\\Fonts\\simsun.ttc"
-            ]
-    
-    # Try to load the font
-    for path in font_paths:
-        if os.path.exists(path):
-            try:
-                font = ImageFont.truetype(path, size=font_size)
-                break
-            except Exception as e:
-                print(f"Failed to load {path}: {e}")
-                continue
-    
-    # Fallback to default font if not found
-    if font is None:
-        print(f"Font {font_name} not found, using default font.")
-        font = ImageFont.load_default()
+    # Load font from the shared font registry (fonts are discovered once per process)
+    font = get_best_font('chinese' if language == 'chinese' else 'english', font_size)
+    profile.lap("font")
     
     # Calculate maximum text width
     max_text_width = int(width * max_width_ratio)
@@ -165,61 +123,10 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
             # Now check each line for width and wrap if necessary
             lines = []
             for line in initial_lines:
-                # For Chinese text, measure actual width of each character
-                current_line = ""
-                for char in line:
-                    test_line = current_line + char
-                    
-                    # Get text width using the appropriate method
-                    try:
-                        if hasattr(font, 'getlength'): line_width = font.getlength(test_line)
-                        else: line_width = font.getbbox(test_line)[2]
-                        
-                        if line_width > max_text_width:
-                            if current_line:  # Only append if not empty
-                                lines.append(current_line)
-                            current_line = char
-                        else:
-                            current_line = test_line
-                    except Exception:
-                        # Fallback if measurement fails
-                        if len(test_line) > max_text_width // 30:
-                            if current_line:  # Only append if not empty
-                                lines.append(current_line)
-                            current_line = char
-                        else:
-                            current_line = test_line
-                
-                # Add the final line for this segment
-                if current_line:
-                    lines.append(current_line)
+                lines.extend(_wrap_chinese(line, font, max_text_width, keep_empty=False))
         else:
             # For Chinese text in Landscape mode or without colon, use character-by-character wrapping
-            current_line = ""
-            for char in text:
-                test_line = current_line + char
-                
-                # Get text width using the appropriate method
-                try:
-                    if hasattr(font, 'getlength'): line_width = font.getlength(test_line)
-                    else: line_width = font.getbbox(test_line)[2]
-                        
-                    if line_width > max_text_width:
-                        lines.append(current_line)
-                        current_line = char
-                    else:
-                        current_line = test_line
-                except Exception:
-                    # Fallback if measurement fails
-                    if len(test_line) > max_text_width // 30:
-                        lines.append(current_line)
-                        current_line = char
-                    else:
-                        current_line = test_line
-            
-            # Add the final line
-            if current_line:
-                lines.append(current_line)
+            lines = _wrap_chinese(text, font, max_text_width, keep_empty=True)
     else:
         # For English text, split at colon if present for better formatting
         if ':' in text and language.lower() == 'english':
@@ -235,8 +142,7 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
             for line in initial_lines:
                 # Check if line fits within max width
                 try:
-                    if hasattr(font, 'getlength'): line_width = font.getlength(line)
-                    else: line_width = font.getbbox(line)[2]
+                    line_width = text_width(font, line)
                     
                     # If line is too long, wrap it
                     if line_width > max_text_width:
@@ -261,6 +167,8 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
             chars_per_line = max(1, int(max_text_width / avg_char_width))
             lines = textwrap.wrap(text, width=chars_per_line)
     
+    profile.lap("layout")
+    
     # Calculate text layout dimensions
     line_height = int(font_size * line_spacing)
     total_text_height = line_height * len(lines)
@@ -272,34 +180,24 @@ def add_chapter_to_image(text, image_path=None, output_path=None, font_size=None
     current_y = start_y
     for line in lines:
         # Get text width for horizontal centering
-        try: text_width = font.getlength(line) if hasattr(font, 'getlength') else font.getbbox(line)[2]
-        except Exception: text_width = len(line) * (font_size // 2)
+        try: line_width = text_width(font, line)
+        except Exception: line_width = len(line) * (font_size // 2)
         
         # Calculate X position for centering
-        x_position = (width - text_width) // 2
-        
-        # Draw shadow
-        if shadow_offset > 0:
-            draw.text(
-                (x_position + shadow_offset, current_y + shadow_offset),
-                line,
-                font=font,
-                fill=shadow_color
-            )
+        x_position = (width - line_width) // 2
         
-        # Draw text
-        draw.text(
-            (x_position, current_y),
-            line,
-            font=font,
-            fill=text_color
-        )
+        # Draw shadow and text from a single rasterization of the line
+        draw_text_effects(draw, (x_position, current_y), line, font, fill=text_color,
+                          shadow_offset=(shadow_offset, shadow_offset) if shadow_offset > 0 else None,
+                          shadow_color=shadow_color)
         
         current_y += line_height
+    profile.lap("draw")
     
     # Save image
     try:
         img.save(output_path)
-        return True, output_path
-    except Exception as e: return False, e
+        profile.lap("save")
+        return done(True, output_path)
+    except Exception as e: return done(False, e)
     
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+In-process image caches
+Byte-budgeted LRU caches for decoded images that are reused across renders
+(templates, overlays, preprocessed logos, ...).
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from PIL import Image
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "entries", "current_bytes", "max_bytes"])
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """Approximate in-memory size of a decoded PIL image"""
+    bands = len(image.getbands())
+    # I/F/I;16 等模式每个通道不止1字节，这里按模式粗略估计
+    bytes_per_band = 4 if image.mode in ("I", "F") else 1
+    return image.width * image.height * bands * bytes_per_band
+
+
+def file_identity(path: str) -> tuple:
+    """Cache key component identifying a file version: (absolute path, mtime_ns, size)
+
+    Raises OSError if the file does not exist.
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class ImageCache:
+    """Thread-safe LRU cache for decoded PIL images with a byte budget
+
+    Cached images are shared between callers and must be treated as read-only;
+    use get_or_create(..., copy=True) when the caller needs to draw on the result.
+    """
+
+    def __init__(self, max_bytes: int, name: str = "images", sizeof: Callable[[Any], int] = image_nbytes):
+        """
+        Args:
+            max_bytes: Total byte budget; least recently used entries are evicted beyond it
+            name: Name used in log messages
+            sizeof: Function returning the byte cost of a cached value
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert value under key, evicting least recently used entries if over budget"""
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # 单个条目超出预算时不缓存，避免把整个缓存挤空
+                return
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self._evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any], copy: bool = False) -> Any:
+        """Return the cached value for key, building it with factory() on a miss
+
+        Args:
+            key: Cache key
+            factory: Zero-argument callable producing the value; None results are not cached
+            copy: Return value.copy() so the caller may mutate it freely
+
+        Returns:
+            The cached (or freshly built) value
+        """
+        return self.lookup(key, factory, copy)[0]
+
+    def lookup(self, key: Hashable, factory: Callable[[], Any], copy: bool = False) -> Tuple[Any, bool]:
+        """Like get_or_create, but also report whether factory() ran
+
+        Returns:
+            tuple: (value, created) where created is True on a cache miss
+        """
+        value = self.get(key)
+        created = value is None
+        if created:
+            value = factory()
+            if value is None:
+                return None, True
+            self.put(key, value)
+        return (value.copy() if copy else value), created
+
+    def clear(self) -> None:
+        """Drop all entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Return hit/miss statistics and current memory usage"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             len(self._entries), self._current_bytes, self.max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
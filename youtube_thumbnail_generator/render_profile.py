@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Render profiling
+Per-stage wall time, image buffer allocations, cache activity, encode attempts
+and the AI title step (including the Gemini circuit breaker state) of a single
+render, in a JSON-friendly shape for dashboards.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from PIL import Image
+
+try:
+    from .image_cache import CacheInfo, image_nbytes
+except ImportError:
+    from image_cache import CacheInfo, image_nbytes
+
+
+@dataclass
+class StageTiming:
+    """Wall time and image buffer bytes of one render stage"""
+    name: str
+    seconds: float
+    image_bytes: int = 0  # 本阶段新分配的图片缓冲区字节数
+
+
+@dataclass
+class RenderProfile:
+    """Structured timing profile of one render
+
+    Stages are recorded as laps: each lap() closes the stage that started at the
+    previous lap, so the stage times add up to the total wall time.
+
+    Example:
+        profile = RenderProfile(cache_info)
+        template = load_template()
+        profile.lap("template", template)
+        ...
+        profile.finish()
+        profile.to_dict()
+    """
+    caches: Optional[Callable[[], Dict[str, CacheInfo]]] = None  # 返回各缓存统计的函数，用于计算本次渲染的命中增量
+    stages: List[StageTiming] = field(default_factory=list)
+    encode_attempts: int = 0
+    encode_quality: Optional[int] = None
+    encode_subsampling: Optional[str] = None  # 使用的JPEG色度抽样，None表示Pillow默认值(4:2:0)
+    output_bytes: int = 0
+    total_seconds: float = 0.0
+    cache_hits: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    ai: Dict[str, Any] = field(default_factory=dict)  # AI标题优化：是否优化、时间预算、断路器状态
+
+    def __post_init__(self):
+        self._cache_start = self.caches() if self.caches else {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name: str, *images: Optional[Image.Image]) -> None:
+        """Close the current stage under name, counting the image buffers it produced"""
+        now = time.perf_counter()
+        nbytes = sum(image_nbytes(image) for image in images if image is not None)
+        self.stages.append(StageTiming(name, now - self._last, nbytes))
+        self._last = now
+
+    def record_encode(self, attempts: int, quality: Optional[int], output_bytes: int,
+                      subsampling: Optional[str] = None) -> None:
+        """Record JPEG encode attempts, the chosen quality and subsampling, and the encoded size"""
+        self.encode_attempts += attempts
+        self.encode_quality = quality
+        self.encode_subsampling = subsampling
+        self.output_bytes = output_bytes
+
+    def record_ai(self, optimized: bool, budget_seconds: Optional[float], breaker: Optional[Dict[str, Any]]) -> None:
+        """Record the AI title step: whether the title was optimized, its time budget and the breaker state"""
+        self.ai = {"optimized": optimized, "budget_seconds": budget_seconds, "breaker": breaker}
+
+    def finish(self) -> "RenderProfile":
+        """Stop the clock and compute cache hit/miss deltas since the profile started
+
+        Caches are process-wide, so renders running concurrently in other threads
+        are included in the deltas.
+        """
+        self.total_seconds = time.perf_counter() - self._start
+        if self.caches:
+            for name, info in self.caches().items():
+                start = self._cache_start.get(name)
+                hits = info.hits - (start.hits if start else 0)
+                misses = info.misses - (start.misses if start else 0)
+                # clear() 会重置计数，此时增量可能为负，按0处理
+                self.cache_hits[name] = {"hits": max(hits, 0), "misses": max(misses, 0)}
+        return self
+
+    @property
+    def image_bytes(self) -> int:
+        return sum(stage.image_bytes for stage in self.stages)
+
+    def stage_seconds(self, name: str) -> float:
+        """Total wall time of all stages recorded under name"""
+        return sum(stage.seconds for stage in self.stages if stage.name == name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable representation"""
+        return {
+            "total_seconds": self.total_seconds,
+            "stages": [{"name": s.name, "seconds": s.seconds, "image_bytes": s.image_bytes} for s in self.stages],
+            "image_bytes": self.image_bytes,
+            "cache_hits": self.cache_hits,
+            "encode_attempts": self.encode_attempts,
+            "encode_quality": self.encode_quality,
+            "encode_subsampling": self.encode_subsampling,
+            "output_bytes": self.output_bytes,
+            "ai": self.ai,
+        }
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Mask-based text effects
+Rasterizes a line of text once into a single-channel mask and derives stroke,
+drop shadow and glow from it, working only on the text's bounding box.
+"""
+
+import math
+from typing import Optional, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+BLUR_EXTENT = 3  # 高斯模糊的影响范围约为3倍半径，遮罩需预留的边距倍数
+
+
+def text_mask(text: str, font, xy: Tuple[float, float], pad: int = 0) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Rasterize text into an L mask covering its bounding box plus pad pixels
+
+    Glyph coverage equals what ImageDraw.text(xy, text, font=font) would draw,
+    including subpixel positioning of fractional coordinates.
+
+    Returns:
+        tuple: (mask, (left, top)) where (left, top) is the mask's position on the canvas
+    """
+    left, top, right, bottom = font.getbbox(text)
+    start_x, start_y = math.modf(xy[0])[0], math.modf(xy[1])[0]
+    margin = pad + 1  # 小数坐标可能让字形多占1像素
+    # 绘制原点保持非负，避免负坐标取整方向不同导致的错位
+    origin_x, origin_y = margin - min(left, 0), margin - min(top, 0)
+    width = origin_x + right + margin
+    height = origin_y + bottom + margin
+
+    canvas = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(canvas).text((origin_x + start_x, origin_y + start_y), text, font=font, fill=255)
+
+    # 裁掉字形框外的空白，后续滤镜只处理文字区域
+    box = (origin_x + left - margin, origin_y + top - margin, width, height)
+    mask = canvas.crop(box) if box[:2] != (0, 0) else canvas
+    return mask, (int(xy[0]) - origin_x + box[0], int(xy[1]) - origin_y + box[1])
+
+
+def dilate(mask: Image.Image, radius: int) -> Image.Image:
+    """Square (Chebyshev) dilation of an L mask by radius pixels
+
+    Separable max of shifted copies with doubling steps: O(log radius) image
+    operations instead of a (2r+1)x(2r+1) rank filter. The mask needs a zero
+    border of at least radius pixels (ImageChops.offset wraps around).
+    """
+    if radius <= 0:
+        return mask
+    result = mask
+    for dx, dy in ((1, 0), (0, 1)):
+        reach = 0
+        while reach < radius:
+            step = min(2 * reach + 1, radius - reach)
+            result = ImageChops.lighter(result, ImageChops.lighter(
+                ImageChops.offset(result, step * dx, step * dy),
+                ImageChops.offset(result, -step * dx, -step * dy)))
+            reach += step
+    return result
+
+
+def draw_text_effects(draw: ImageDraw.ImageDraw, xy: Tuple[float, float], text: str, font,
+                      fill="#FFFFFF",
+                      stroke_width: int = 0, stroke_fill="#000000",
+                      shadow_offset: Optional[Tuple[int, int]] = None, shadow_color="#333333",
+                      shadow_blur: float = 0,
+                      glow_radius: float = 0, glow_color="#FFFFFF") -> None:
+    """Draw one line of text with glow, drop shadow and stroke from a single rasterization
+
+    Layers are composited bottom to top: glow, shadow, stroke, text. The stroke is
+    a square dilation of the glyph mask, matching text drawn at every offset within
+    stroke_width; the shadow is the glyph mask moved by shadow_offset.
+
+    Args:
+        draw: ImageDraw of the target image
+        xy: Text position as for ImageDraw.text
+        stroke_width: Outline width in pixels (0 disables)
+        shadow_offset: (dx, dy) of the drop shadow (None disables)
+        shadow_blur: Gaussian blur radius of the shadow
+        glow_radius: Gaussian blur radius of a glow around the outlined text (0 disables)
+    """
+    pad = stroke_width + int(math.ceil(BLUR_EXTENT * max(shadow_blur, glow_radius)))
+    mask, position = text_mask(text, font, xy, pad)
+    outline = dilate(mask, stroke_width)
+
+    if glow_radius > 0:
+        draw.bitmap(position, outline.filter(ImageFilter.GaussianBlur(glow_radius)), fill=glow_color)
+
+    if shadow_offset:
+        shadow = mask.filter(ImageFilter.GaussianBlur(shadow_blur)) if shadow_blur > 0 else mask
+        draw.bitmap((position[0] + shadow_offset[0], position[1] + shadow_offset[1]), shadow, fill=shadow_color)
+
+    if stroke_width > 0:
+        draw.bitmap(position, outline, fill=stroke_fill)
+
+    draw.bitmap(position, mask, fill=fill)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Cached text measurement
+Per-font glyph advance and kerning caches so a line's width is a sum of cached
+values, and greedy word wrapping that measures each word once.
+"""
+
+import threading
+import weakref
+from typing import Dict, List
+
+from PIL import ImageFont
+
+try:
+    from .image_cache import CacheInfo
+except ImportError:
+    from image_cache import CacheInfo
+
+GLYPH_CACHE_MAX_PAIRS = 65536  # 每个字体缓存的字距对上限，超出后清空重建
+
+
+class TextMetrics:
+    """Glyph advance and kerning cache of one font object
+
+    With Pillow's basic layout a line's advance width is the sum of the glyph
+    advances plus the kerning of each adjacent pair, so after the first
+    measurement of a glyph/pair, measuring a line needs no FreeType calls.
+    Results equal font.getlength(text) exactly (widths are multiples of 1/64).
+
+    Fonts using the Raqm layout (shaping, ligatures) and bitmap fonts are
+    measured directly with getlength/getbbox instead.
+    Concurrent use from several threads is safe: cache entries are idempotent.
+    """
+
+    def __init__(self, font):
+        self._font = font
+        self.cached = (isinstance(font, ImageFont.FreeTypeFont)
+                       and font.layout_engine == ImageFont.Layout.BASIC)
+        self._advances: Dict[str, float] = {}
+        self._kerning: Dict[str, float] = {}
+
+    def _measure(self, text: str) -> float:
+        if hasattr(self._font, 'getlength'):
+            return self._font.getlength(text)
+        bbox = self._font.getbbox(text)
+        return bbox[2] - bbox[0]
+
+    def advance(self, char: str) -> float:
+        """Advance width of a single character"""
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = self._font.getlength(char)
+        return width
+
+    def kerning(self, left: str, right: str) -> float:
+        """Kerning adjustment between two adjacent characters"""
+        pair = left + right
+        adjust = self._kerning.get(pair)
+        if adjust is None:
+            if len(self._kerning) >= GLYPH_CACHE_MAX_PAIRS:
+                self._kerning.clear()
+            adjust = self._kerning[pair] = self._font.getlength(pair) - self.advance(left) - self.advance(right)
+        return adjust
+
+    def width(self, text: str) -> float:
+        """Advance width of text, equal to font.getlength(text)"""
+        if not self.cached:
+            return self._measure(text)
+        total = 0.0
+        previous = None
+        for char in text:
+            total += self.advance(char)
+            if previous is not None:
+                total += self.kerning(previous, char)
+            previous = char
+        return total
+
+    def extend(self, text: str, width: float, suffix: str) -> float:
+        """Width of text + suffix, given width == self.width(text); measures only suffix"""
+        if not self.cached:
+            return self._measure(text + suffix)
+        if not suffix:
+            return width
+        if not text:
+            return self.width(suffix)
+        return width + self.kerning(text[-1], suffix[0]) + self.width(suffix)
+
+    def prefix_widths(self, text: str) -> List[float]:
+        """Widths of text[:k] for k = 0..len(text), in one pass (cached fonts only)"""
+        widths = [0.0]
+        total = 0.0
+        previous = None
+        for char in text:
+            total += self.advance(char)
+            if previous is not None:
+                total += self.kerning(previous, char)
+            widths.append(total)
+            previous = char
+        return widths
+
+
+# 字体对象被注册表淘汰后，对应的字形缓存随之释放
+_metrics: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_metrics_lock = threading.Lock()
+_metrics_hits = 0
+_metrics_misses = 0
+
+
+def get_text_metrics(font) -> TextMetrics:
+    """Shared TextMetrics for font (created on first use)"""
+    global _metrics_hits, _metrics_misses
+    try:
+        metrics = _metrics.get(font)
+    except TypeError:  # 不支持弱引用的字体对象
+        return TextMetrics(font)
+    with _metrics_lock:
+        if metrics is None:
+            _metrics_misses += 1
+        else:
+            _metrics_hits += 1
+    if metrics is None:
+        metrics = _metrics.setdefault(font, TextMetrics(font))
+    return metrics
+
+
+def metrics_cache_info() -> CacheInfo:
+    """Statistics of the per-font metrics caches
+
+    Hits and misses count get_text_metrics lookups; the byte fields count the
+    cached glyph advances and kerning pairs of all live fonts.
+    """
+    metrics = list(_metrics.values())
+    glyphs = sum(len(m._advances) + len(m._kerning) for m in metrics)
+    with _metrics_lock:
+        return CacheInfo(_metrics_hits, _metrics_misses, 0, len(metrics), glyphs,
+                         len(metrics) * GLYPH_CACHE_MAX_PAIRS)
+
+
+def text_width(font, text: str) -> float:
+    """Advance width of text in font, using the font's glyph cache"""
+    return get_text_metrics(font).width(text)
+
+
+def fit_ellipsis(text: str, font, max_width: float, ellipsis: str = "...") -> str:
+    """Longest prefix of text that still fits max_width with ellipsis appended
+
+    The cut point is found by bisection over the prefix widths, so only
+    O(log n) candidates are measured. Returns ellipsis alone when no prefix fits.
+    """
+    metrics = get_text_metrics(font)
+    widths = metrics.prefix_widths(text) if metrics.cached else None
+
+    def fits(k):
+        if widths is None:
+            return metrics.width(text[:k] + ellipsis) <= max_width
+        return metrics.extend(text[:k], widths[k], ellipsis) <= max_width
+
+    low, high = 0, len(text)
+    if not fits(low):
+        return ellipsis
+    # 不变式：fits(low) 为真；寻找最大的满足条件的切点
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + ellipsis
+
+
+def wrap_words(words: List[str], font, max_width: float) -> List[str]:
+    """Greedy word wrap: join words with spaces into lines no wider than max_width
+
+    A word wider than max_width on its own becomes a line by itself. Each word is
+    measured once, so wrapping is linear in the text length.
+    """
+    metrics = get_text_metrics(font)
+    lines = []
+    current_line = ""
+    current_width = 0.0
+    for word in words:
+        if current_line:
+            test_line = current_line + " " + word
+            test_width = metrics.extend(current_line, current_width, " " + word)
+        else:
+            test_line = word
+            test_width = metrics.width(word)
+
+        if test_width <= max_width:
+            current_line, current_width = test_line, test_width
+        elif current_line:
+            lines.append(current_line)
+            current_line, current_width = word, metrics.width(word)
+        else:
+            lines.append(word)  # 单词太长也要加入
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+def wrap_chars(text: str, font, max_width: float, keep_empty: bool = True) -> List[str]:
+    """Character wrap for CJK text: break before each character that would overflow
+
+    Args:
+        keep_empty: Keep the empty line produced when the first character alone overflows
+
+    Returns:
+        list: Wrapped lines
+    """
+    metrics = get_text_metrics(font)
+    lines = []
+    current_line = ""
+    current_width = 0.0
+    for char in text:
+        test_width = metrics.extend(current_line, current_width, char)
+        if test_width > max_width:
+            if current_line or keep_empty:
+                lines.append(current_line)
+            current_line, current_width = char, metrics.width(char)
+        else:
+            current_line, current_width = current_line + char, test_width
+    if current_line:
+        lines.append(current_line)
+    return lines
@@ -6,132 +6,71 @@
 
 from PIL import Image, ImageDraw, ImageFont
 import os
-import platform
+from dataclasses import dataclass
+from typing import List, Tuple
 
-def _get_universal_font_paths(language="english"):
-    """Get universal font paths based on system - no personalized detection"""
-    system = platform.system()
-    paths = []
-    
-    if language == "chinese":
-        if system == "Linux":
-            paths.extend([
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                "/usr/share/fonts/truetype/arphic-uming/uming.ttc"
-            ])
-        elif system == "Darwin":  # macOS
-            paths.extend([
-                "/System/Library/Fonts/STHeiti Medium.ttc",  # 优先使用较粗的Medium weight
-                "/Library/Fonts/NotoSansCJK-Bold.ttc",
-                "/System/Library/Fonts/Hiragino Sans GB.ttc",
-                "/System/Library/Fonts/PingFang.ttc"
-            ])
-        elif system == "Windows":
-            paths.extend([
-                "C:\\Windows\\Fonts\\simhei.ttf",
-                "C:\\Windows\\Fonts\\msyh.ttc", 
-                "C:\\Windows\\Fonts\\simsun.ttc"
-            ])
-    else:  # english
-        if system == "Linux":
-            paths.extend([
-                "/usr/share/fonts/truetype/lexend/Lexend-Bold.ttf",
-                "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf", 
-                "/usr/share/fonts/truetype/ubuntu-font-family/Ubuntu-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            ])
-        elif system == "Darwin":  # macOS
-            paths.extend([
-                os.path.expanduser("~/Library/Fonts/Lexend/Lexend-Bold.ttf"),  # 用户目录下的Lexend Bold
-                "/Library/Fonts/Lexend-Bold.ttf",  # 系统级Lexend Bold
-                "/System/Library/Fonts/Supplemental/Arial Bold.ttf",  # Arial Bold优先于普通Arial
-                "/Library/Fonts/Arial Bold.ttf",   # 用户安装的Arial Bold
-                "/System/Library/Fonts/Arial.ttf", 
-                "/System/Library/Fonts/Helvetica.ttc"  # Helvetica作为最后fallback
-            ])
-        elif system == "Windows":
-            paths.extend([
-                "C:\\Windows\\Fonts\\arial.ttf",
-                "C:\\Windows\\Fonts\\arialbd.ttf",
-                "C:\\Windows\\Fonts\\calibri.ttf"
-            ])
-    
-    return paths
+try:
+    from .font_registry import get_best_font, get_font
+    from .text_metrics import fit_ellipsis, text_width, wrap_words
+except ImportError:
+    from font_registry import get_best_font, get_font
+    from text_metrics import fit_ellipsis, text_width, wrap_words
+
+@dataclass
+class TextSprite:
+    """Rendered text as 8-bit coverage masks cropped to the ink bounding box
+
+    size is the full text box (what create_text_png returns as an image);
+    the masks sit at offset inside it and are drawn bottom to top in their color.
+    """
+    size: Tuple[int, int]
+    offset: Tuple[int, int]
+    layers: List[Tuple[Image.Image, Tuple[int, int, int]]]  # (L遮罩, 颜色)，描边在下、文字在上
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def masks(self) -> List[Image.Image]:
+        return [mask for mask, _ in self.layers]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(mask.width * mask.height for mask in self.masks)
+
+    def paste_onto(self, image: Image.Image, xy: Tuple[int, int]) -> None:
+        """Composite the text onto image with the text box's top-left corner at xy"""
+        draw = ImageDraw.Draw(image)
+        for mask, color in self.layers:
+            draw.bitmap((xy[0] + self.offset[0], xy[1] + self.offset[1]), mask, fill=color)
+
+    def to_image(self) -> Image.Image:
+        """The text box as a transparent RGBA image"""
+        image = Image.new('RGBA', self.size, (0, 0, 0, 0))
+        self.paste_onto(image, (0, 0))
+        return image
 
 def _get_best_font(text, font_size, language, is_title=False):
-    """获取最佳字体（通用跨平台版本）"""
-    font_paths = _get_universal_font_paths(language)
-    
-    # Try to load fonts in order
-    for path in font_paths:
-        if os.path.exists(path):
-            try:
-                font = ImageFont.truetype(path, font_size)
-                print(f"成功加载字体: {path}")
-                return font
-            except Exception as e:
-                print(f"Failed to load {path}: {e}")
-                continue
-    
-    # Fallback to built-in fonts
-    print(f"使用内置字体作为 fallback")
-    try:
-        # 获取内置字体路径
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        if language == 'chinese':
-            # 中文优先使用 Noto，fallback 到 Ubuntu
-            builtin_fonts = [
-                os.path.join(current_dir, "fonts", "NotoSansCJK-Bold.ttc"),
-                os.path.join(current_dir, "fonts", "Ubuntu-B.ttf")
-            ]
-        else:
-            # 英文使用 Ubuntu Bold
-            builtin_fonts = [
-                os.path.join(current_dir, "fonts", "Ubuntu-B.ttf")
-            ]
-        
-        for builtin_path in builtin_fonts:
-            if os.path.exists(builtin_path):
-                font = ImageFont.truetype(builtin_path, font_size)
-                print(f"成功加载内置字体: {builtin_path}")
-                return font
-    except Exception as e:
-        print(f"Failed to load built-in fonts: {e}")
-    
-    # Final fallback to default font
-    print(f"No suitable font found for {language}, using system default")
-    return ImageFont.load_default()
+    """获取最佳字体（通用跨平台版本），字体对象由共享字体注册表缓存"""
+    return get_best_font(language, font_size)
 
-def create_text_png(text, width=600, height=300, font_size=None, 
-                   text_color=(255, 255, 255), output_path=None, 
-                   language='english', margin_ratio=0.05, auto_height=False, 
-                   line_height_px=50, max_lines=3, use_stroke=False, align='left'):
+def create_text_sprite(text, width=600, height=300, font_size=None, 
+                       text_color=(255, 255, 255), language='english', margin_ratio=0.05, 
+                       auto_height=False, line_height_px=50, max_lines=3, use_stroke=False, 
+                       align='left', scale=1.0):
     """
-    创建指定尺寸的透明背景文字PNG
-    恢复完整的字体缩放、对齐、换行功能
+    排版并光栅化文字，返回裁剪到墨迹范围的8位遮罩（TextSprite）
+    
+    参数与create_text_png相同。先完成排版并计算所有行的墨迹包围盒，再按包围盒
+    只分配一次L模式遮罩；合成时通过遮罩直接填色，不再分配和混合整幅RGBA画布。
     
-    Args:
-        text (str): 要渲染的文本
-        width (int): 图片宽度
-        height (int): 图片高度  
-        font_size (int): 字体大小，None时自动计算
-        text_color (tuple): 文字颜色RGB
-        output_path (str): 输出路径，None时不保存
-        language (str): 语言 'chinese' 或 'english'
-        margin_ratio (float): 边距比例
-        auto_height (bool): 是否自动调整高度
-        line_height_px (int): 行高像素
-        max_lines (int): 最大行数
-        use_stroke (bool): 是否使用黑色描边
-        align (str): 对齐方式 'left' 或 'right'
-        
     Returns:
-        tuple: (success, image, actual_height)
+        TextSprite: 文字框尺寸为渲染分辨率下的 (width, height)
     """
     
     # 检测中文字符
@@ -171,10 +110,6 @@ def create_text_png(text, width=600, height=300, font_size=None,
     # 获取字体
     font = _get_best_font(text, font_size, language, is_title)
     
-    # 创建透明背景图片
-    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
     # 计算可用区域（恢复左对齐系统）
     left_margin = 20  # 固定左边距20px
     top_margin = int(min(width, height) * margin_ratio)
@@ -195,34 +130,8 @@ def create_text_png(text, width=600, height=300, font_size=None,
         if num_lines > max_lines:
             print(f"需要截断: {num_lines}行 > {max_lines}行限制")
             
-            # 截断到max_lines-1行，最后一行加省略号
-            truncated_lines = lines[:max_lines-1]
-            last_line = lines[max_lines-1]
-            
-            # 为最后一行添加省略号，并确保不超宽
-            while True:
-                test_line = last_line + "..."
-                try:
-                    if hasattr(font, 'getlength'):
-                        test_width = font.getlength(test_line)
-                    else:
-                        bbox = font.getbbox(test_line)
-                        test_width = bbox[2] - bbox[0]
-                except:
-                    test_width = len(test_line) * (font_size * 0.6)
-                
-                if test_width <= max_width:
-                    truncated_lines.append(test_line)
-                    break
-                else:
-                    # 缩短最后一行文字
-                    if len(last_line) > 3:
-                        last_line = last_line[:-3]
-                    else:
-                        truncated_lines.append("...")
-                        break
-            
-            lines = truncated_lines
+            # 截断到max_lines行，最后一行加省略号（二分查找截断点）
+            lines = _truncate_lines(lines, max_lines, font, max_width, font_size)
             num_lines = len(lines)
             text = ' '.join(lines)  # 重新组合文字
             print(f"截断后: {num_lines}行, 文字: {text}")
@@ -262,10 +171,6 @@ def create_text_png(text, width=600, height=300, font_size=None,
             height = num_lines * line_height_px
             print(f"智能调整高度: {height}px ({num_lines}行 x {line_height_px}px/行)")
         
-        # 重新创建图片
-        img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
         # 为中文和英文标题调整边距
         if is_title and (language == 'chinese' or language == 'english'):
             # 根据行数动态调整上下边距（增加边距以适应放大的字体）
@@ -326,44 +231,16 @@ def create_text_png(text, width=600, height=300, font_size=None,
         if len(lines) > 3:
             print(f"英文标题截断: {len(lines)}行 -> 3行")
             # 截断到2行，第3行加省略号
-            truncated_lines = lines[:2]
-            last_line = lines[2]
-            
-            # 为第3行添加省略号
-            while True:
-                test_line = last_line + "..."
-                try:
-                    if hasattr(font, 'getlength'):
-                        test_width = font.getlength(test_line)
-                    else:
-                        bbox = font.getbbox(test_line)
-                        test_width = bbox[2] - bbox[0]
-                except:
-                    test_width = len(test_line) * (font_size * 0.6)
-                
-                if test_width <= max_width:
-                    truncated_lines.append(test_line)
-                    break
-                else:
-                    if len(last_line) > 3:
-                        last_line = last_line[:-3]
-                    else:
-                        truncated_lines.append("...")
-                        break
-            
-            lines = truncated_lines
+            lines = _truncate_lines(lines, 3, font, max_width, font_size)
     
     # 计算总文字高度
     line_height = _get_line_height(font)
     total_text_height = len(lines) * line_height
     
-    # 如果文字太高，缩小字体
+    # 如果文字太高，二分查找能放下的最大字号并重新换行
     if total_text_height > max_height:
-        scale_factor = max_height / total_text_height * 0.9  # 留10%缓冲
-        new_font_size = int(font_size * scale_factor)
-        font = _get_best_font(text, new_font_size, language)
-        lines = _wrap_text(text, font, max_width, language, is_title)
-        line_height = _get_line_height(font)
+        new_font_size, font, lines, line_height = _fit_font_size(
+            text, language, is_title, max_width, max_height, font_size - 1)
         total_text_height = len(lines) * line_height
         print(f"文字过高，缩小字体: {font_size}px -> {new_font_size}px")
     
@@ -376,7 +253,15 @@ def create_text_png(text, width=600, height=300, font_size=None,
         start_x = left_margin
     start_y = top_margin + (max_height - total_text_height) // 2
     
-    # 绘制文字（添加正确的行间距）
+    # 排版完成后在渲染分辨率下光栅化
+    def px(value):
+        return int(round(value * scale))
+    
+    draw_font = font if scale == 1.0 else _get_scaled_font(font, scale)
+    
+    # 先确定每行的位置和描边，再按墨迹包围盒分配遮罩
+    placed = []  # (x, y, 行文字, 描边宽度)
+    stroke_color = None
     for i, line in enumerate(lines):
         # 为多行文字添加行间距 - 标题使用更大的行间距
         if len(lines) > 1:
@@ -389,21 +274,18 @@ def create_text_png(text, width=600, height=300, font_size=None,
             line_y = start_y + i * line_height
         
         # 绘制文字（根据对齐方式调整每行位置）
+        line_y = px(line_y)
         if align == 'right':
-            # 右对齐：计算每行宽度，从右边开始绘制
+            # 右对齐：用渲染字体计算每行宽度，从右边开始绘制
             try:
-                if hasattr(font, 'getlength'):
-                    line_width = font.getlength(line)
-                else:
-                    bbox = font.getbbox(line)
-                    line_width = bbox[2] - bbox[0]
+                line_width = text_width(draw_font, line)
             except:
-                line_width = len(line) * (font_size * 0.6)
+                line_width = len(line) * (px(font_size) * 0.6)
             
-            line_x = start_x - line_width
+            line_x = px(start_x) - line_width
         else:
             # 左对齐
-            line_x = start_x
+            line_x = px(start_x)
             
         if use_stroke:
             # 检测是否包含中文字符，调整描边效果
@@ -434,13 +316,51 @@ def create_text_png(text, width=600, height=300, font_size=None,
                 stroke_width = max(2, int(font_size * 0.05))
                 print(f"英文字体智能描边: 宽度{stroke_width}px, 颜色{stroke_color}")
             
-            draw.text((line_x, line_y), line, font=font, fill=text_color, 
-                     stroke_width=stroke_width, stroke_fill=stroke_color)
+            stroke_width = max(1, px(stroke_width))
+            placed.append((line_x, line_y, line, stroke_width))
             print(f"绘制文字行(带描边): '{line}' at ({line_x}, {line_y}), 描边宽度: {stroke_width}px")
         else:
-            draw.text((line_x, line_y), line, font=font, fill=text_color)
+            placed.append((line_x, line_y, line, 0))
             print(f"绘制文字行: '{line}' at ({line_x}, {line_y})")
     
+    return _rasterize_lines(placed, draw_font, (px(width), px(height)), text_color, stroke_color)
+
+def create_text_png(text, width=600, height=300, font_size=None, 
+                   text_color=(255, 255, 255), output_path=None, 
+                   language='english', margin_ratio=0.05, auto_height=False, 
+                   line_height_px=50, max_lines=3, use_stroke=False, align='left', scale=1.0):
+    """
+    创建指定尺寸的透明背景文字PNG
+    恢复完整的字体缩放、对齐、换行功能
+    
+    所有尺寸参数均为1600x900设计尺寸下的像素值；排版（换行、字号、截断）在设计尺寸下完成，
+    最终按 scale 倍直接渲染，不同输出分辨率得到相同的换行结果。
+    
+    Args:
+        text (str): 要渲染的文本
+        width (int): 图片宽度
+        height (int): 图片高度  
+        font_size (int): 字体大小，None时自动计算
+        text_color (tuple): 文字颜色RGB
+        output_path (str): 输出路径，None时不保存
+        language (str): 语言 'chinese' 或 'english'
+        margin_ratio (float): 边距比例
+        auto_height (bool): 是否自动调整高度
+        line_height_px (int): 行高像素
+        max_lines (int): 最大行数
+        use_stroke (bool): 是否使用黑色描边
+        align (str): 对齐方式 'left' 或 'right'
+        scale (float): 渲染缩放比例，例如1280x720画布为0.8，3840x2160画布为2.4
+        
+    Returns:
+        tuple: (success, image, actual_height)，actual_height为渲染后图片的像素高度
+    """
+    sprite = create_text_sprite(text, width=width, height=height, font_size=font_size,
+                                text_color=text_color, language=language, margin_ratio=margin_ratio,
+                                auto_height=auto_height, line_height_px=line_height_px,
+                                max_lines=max_lines, use_stroke=use_stroke, align=align, scale=scale)
+    img = sprite.to_image()
+    
     # 保存文件
     if output_path:
         # 确保输出目录存在
@@ -451,7 +371,81 @@ def create_text_png(text, width=600, height=300, font_size=None,
         img.save(output_path, 'PNG')
         print(f"Text PNG saved: {output_path}")
     
-    return True, img, height
+    return True, img, img.height
+
+def _rasterize_lines(placed, font, size, text_color, stroke_color):
+    """把已排版的行绘制到裁剪后的L遮罩中（描边和文字各一张），返回TextSprite"""
+    # 墨迹包围盒：各行getbbox按位置平移后取并集，四周多留1px容纳小数坐标的偏移，并裁剪到文字框内
+    left, top, right, bottom = size[0], size[1], 0, 0
+    for x, y, line, stroke_width in placed:
+        l, t, r, b = font.getbbox(line, stroke_width=stroke_width)
+        left, top = min(left, int(x) + l - 1), min(top, int(y) + t - 1)
+        right, bottom = max(right, int(x) + r + 2), max(bottom, int(y) + b + 2)
+    left, top = max(left, 0), max(top, 0)
+    right, bottom = min(right, size[0]), min(bottom, size[1])
+    if right <= left or bottom <= top:
+        return TextSprite(size, (0, 0), [])
+    
+    layers = []
+    stroked = [item for item in placed if item[3] > 0]
+    if stroked:
+        stroke_mask = Image.new('L', (right - left, bottom - top), 0)
+        stroke_draw = ImageDraw.Draw(stroke_mask)
+        for x, y, line, stroke_width in stroked:
+            stroke_draw.text((x - left, y - top), line, font=font, fill=255,
+                             stroke_width=stroke_width, stroke_fill=255)
+        layers.append((stroke_mask, stroke_color))
+    
+    mask = Image.new('L', (right - left, bottom - top), 0)
+    draw = ImageDraw.Draw(mask)
+    for x, y, line, _ in placed:
+        draw.text((x - left, y - top), line, font=font, fill=255)
+    layers.append((mask, text_color))
+    return TextSprite(size, (left, top), layers)
+
+
+def _truncate_lines(lines, max_lines, font, max_width, font_size):
+    """保留前max_lines行，最后一行在不超宽的最长前缀后加省略号"""
+    last_line = lines[max_lines-1]
+    try:
+        last_line = fit_ellipsis(last_line, font, max_width)
+    except Exception:
+        # 无法测量时按每字符0.6倍字号估算
+        keep = max(0, int(max_width / (font_size * 0.6)) - 3)
+        last_line = last_line[:keep] + "..."
+    return lines[:max_lines-1] + [last_line]
+
+def _fit_font_size(text, language, is_title, max_width, max_height, max_size, min_size=8):
+    """二分查找换行后总高度不超过max_height的最大字号（不超过max_size）
+    
+    Returns:
+        tuple: (font_size, font, lines, line_height)
+    """
+    def layout(size):
+        font = _get_best_font(text, size, language)
+        return size, font, _wrap_text(text, font, max_width, language, is_title), _get_line_height(font)
+    
+    best = None
+    low, high = min_size, max(min_size, max_size)
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = layout(middle)
+        if len(candidate[2]) * candidate[3] <= max_height:
+            best = candidate
+            low = middle + 1
+        else:
+            high = middle - 1
+    # 最小字号仍放不下时使用最小字号
+    return best or layout(min_size)
+
+def _get_scaled_font(font, scale):
+    """获取按渲染比例缩放后的同一字体，用于在目标分辨率下直接绘制"""
+    try:
+        # FreeType字体：同一字体文件，仅改变字号（从字体注册表缓存中获取）
+        return get_font(font.path, max(1, int(round(font.size * scale))), font.index)
+    except Exception as e:
+        print(f"字体无法缩放，使用原字号渲染: {e}")
+        return font
 
 def _chinese_smart_wrap(text, max_chars=20, is_title=False):
     """中文智能换行算法 - 新增特殊换行规则"""
@@ -580,47 +574,16 @@ def _wrap_text(text, font, max_width, language='english', is_title=False):
     # 英文原有逻辑
     # 先尝试单行显示
     try:
-        if hasattr(font, 'getlength'):
-            text_width = font.getlength(text)
-        else:
-            bbox = font.getbbox(text)
-            text_width = bbox[2] - bbox[0]
+        width = text_width(font, text)
     except:
-        text_width = len(text) * (font.size if hasattr(font, 'size') else 12) * 0.6
+        width = len(text) * (font.size if hasattr(font, 'size') else 12) * 0.6
     
     # 如果单行能显示，直接返回
-    if text_width <= max_width:
+    if width <= max_width:
         return [text]
     
-    # 否则按空格分词换行
-    words = text.split(' ')
-    lines = []
-    current_line = ""
-    
-    for word in words:
-        test_line = current_line + (" " if current_line else "") + word
-        try:
-            if hasattr(font, 'getlength'):
-                test_width = font.getlength(test_line)
-            else:
-                bbox = font.getbbox(test_line)
-                test_width = bbox[2] - bbox[0]
-        except:
-            test_width = len(test_line) * (font.size if hasattr(font, 'size') else 12) * 0.6
-        
-        if test_width <= max_width:
-            current_line = test_line
-        else:
-            if current_line:
-                lines.append(current_line)
-                current_line = word
-            else:
-                lines.append(word)  # 单词太长也要加入
-    
-    if current_line:
-        lines.append(current_line)
-    
-    return lines
+    # 否则按空格分词换行（逐词累加缓存的字形宽度，线性复杂度）
+    return wrap_words(text.split(' '), font, max_width)
 
 def _get_line_height(font):
     """获取行高"""
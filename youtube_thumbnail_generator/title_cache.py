@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Persistent title optimization cache
+SQLite-backed cache of AI-optimized titles shared by all processes on a host,
+so a title optimized once (by any worker, retry or earlier run) skips the
+Gemini round-trip until it expires.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TITLE_CACHE_TTL_SECONDS = 30 * 24 * 3600  # 缓存条目有效期：30天
+TITLE_CACHE_MAX_ENTRIES = 20000  # 条目上限，超出后淘汰最久未使用的条目
+TITLE_CACHE_FILENAME = "title_cache.sqlite3"
+TITLE_CACHE_DIR_ENV = "YOUTUBE_THUMBNAIL_CACHE_DIR"  # 缓存目录环境变量
+SQLITE_BUSY_TIMEOUT = 5.0  # 多进程同时写入时等待锁的秒数
+TITLE_CACHE_TOUCH_INTERVAL = 3600  # 命中时最多每小时刷新一次访问时间，其余命中保持只读
+TITLE_CACHE_EVICT_INTERVAL = 100  # 每个进程每N次写入执行一次过期和容量淘汰（首次写入时也执行）
+
+TitleCacheInfo = namedtuple("TitleCacheInfo", ["hits", "misses", "evictions", "entries", "max_entries"])
+
+
+def default_cache_dir() -> str:
+    """Cache directory: $YOUTUBE_THUMBNAIL_CACHE_DIR, else $XDG_CACHE_HOME or ~/.cache, /youtube_thumbnail_generator"""
+    configured = os.getenv(TITLE_CACHE_DIR_ENV)
+    if configured:
+        return configured
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "youtube_thumbnail_generator")
+
+
+def prompt_hash(prompt: str) -> str:
+    """Short stable hash of a system prompt, so prompt edits invalidate cached titles"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def title_cache_key(title: str, source_language: Optional[str], target_language: Optional[str],
+                    model: str, system_prompt: str) -> str:
+    """Cache key of one optimization request
+
+    Covers everything that changes the model's answer: the title, source and
+    target language, the model name and a hash of the system prompt.
+    """
+    parts = [title, source_language or "", target_language or "", model, prompt_hash(system_prompt)]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class TitleCache:
+    """Cross-process SQLite cache of optimized titles with TTL and LRU size eviction
+
+    The database is opened lazily on first use, one connection per thread and
+    process (connections are never shared across fork). SQLite and filesystem
+    errors are logged and treated as a cache miss, so a broken or read-only cache directory
+    never blocks title optimization.
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 ttl_seconds: float = TITLE_CACHE_TTL_SECONDS,
+                 max_entries: int = TITLE_CACHE_MAX_ENTRIES,
+                 touch_interval: float = TITLE_CACHE_TOUCH_INTERVAL,
+                 evict_interval: int = TITLE_CACHE_EVICT_INTERVAL):
+        """
+        Args:
+            directory: Directory holding the database file (default: default_cache_dir())
+            ttl_seconds: Entries older than this are treated as missing and removed
+            max_entries: Least recently used entries beyond this count are evicted (a soft limit:
+                the count may exceed it by up to evict_interval entries per writing process)
+            touch_interval: A hit refreshes the entry's last-use time only when it is older than
+                this, so most hits are read-only and never wait for SQLite's write lock
+            evict_interval: Expired and excess entries are removed on the first put and then
+                every evict_interval puts, instead of scanning the table on every insert
+        """
+        self.directory = directory or default_cache_dir()
+        self.path = os.path.join(self.directory, TITLE_CACHE_FILENAME)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evict_interval = max(1, evict_interval)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._puts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            # WAL模式下读写互不阻塞；网络文件系统等不支持时保持默认日志模式
+            connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error:
+            pass
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS titles ("
+            " key TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " optimized TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS titles_accessed ON titles (accessed_at)")
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached optimized title for key, or None if missing or expired"""
+        now = time.time()
+        try:
+            connection = self._connect()
+            row = connection.execute("SELECT optimized, created_at, accessed_at FROM titles WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM titles WHERE key = ?", (key,))
+                self._count("_evictions")
+                row = None
+            if row is not None and now - row[2] > self.touch_interval:
+                # LRU淘汰只需要粗粒度的访问时间，避免每次命中都获取写锁
+                connection.execute("UPDATE titles SET accessed_at = ? WHERE key = ?", (now, key))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Title cache read failed ({self.path}): {e}")
+            row = None
+        self._count("_hits" if row is not None else "_misses")
+        return row[0] if row is not None else None
+
+    def put(self, key: str, title: str, optimized: str) -> None:
+        """Store an optimized title; every evict_interval puts, also drop expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._puts += 1
+            # 读取时已按TTL判断过期，淘汰只用于控制数据库大小，分摊到多次写入中执行
+            evict = (self._puts - 1) % self.evict_interval == 0
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO titles (key, title, optimized, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, title, optimized, now, now))
+            if evict:
+                self._evict(connection, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Title cache write failed ({self.path}): {e}")
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        evicted = connection.execute("DELETE FROM titles WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        excess = connection.execute("SELECT COUNT(*) FROM titles").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += connection.execute(
+                "DELETE FROM titles WHERE key IN (SELECT key FROM titles ORDER BY accessed_at LIMIT ?)",
+                (excess,)).rowcount
+        if evicted:
+            self._count("_evictions", evicted)
+
+    def clear(self) -> None:
+        """Delete all entries and reset the statistics"""
+        try:
+            self._connect().execute("DELETE FROM titles")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Title cache clear failed ({self.path}): {e}")
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def cache_info(self) -> TitleCacheInfo:
+        """Return this process's hit/miss/eviction counts and the number of stored entries"""
+        try:
+            entries = self._connect().execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+        except (sqlite3.Error, OSError):
+            entries = 0
+        with self._lock:
+            return TitleCacheInfo(self._hits, self._misses, self._evictions, entries, self.max_entries)
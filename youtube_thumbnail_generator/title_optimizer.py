@@ -5,21 +5,33 @@ Optimizes mixed-language titles into single-language, properly formatted titles.
 """
 
 import os
+import json
+import math
+import time
 import logging
-from typing import Optional, Tuple
+import threading
+import weakref
+import importlib.util
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+try:
+    from .title_cache import TitleCache, title_cache_key
+except ImportError:
+    from title_cache import TitleCache, title_cache_key
+
+# 库模块不配置全局logging，由调用方决定日志级别和输出
 logger = logging.getLogger(__name__)
 
 # Gemini model configuration - easy to change in one place
 GEMINI_FLASH_MODEL = "gemini-2.5-flash-001"
 
 # System prompt for title optimization with smart line-breaking
-TITLE_OPTIMIZATION_SYSTEM_PROMPT = """You are a professional YouTube title optimizer. Your task is to convert mixed-language or poorly formatted titles into clean, single-language titles optimized for YouTube thumbnails with intelligent line-breaking.
+# （单条与批量请求共用同一套规则，只有输出格式不同）
+_TITLE_RULES_TEMPLATE = """You are a professional YouTube title optimizer. Your task is to convert mixed-language or poorly formatted titles into clean, single-language titles optimized for YouTube thumbnails with intelligent line-breaking.
 
 CRITICAL RULES:
-1. OUTPUT ONLY THE OPTIMIZED TITLE - No prefixes, suffixes, quotes, or explanations
+1. {output_rule}
 2. Use SINGLE LANGUAGE ONLY - Pure Chinese OR Pure English OR Pure other language
 3. Maintain the original meaning and intent
 4. Optimize for YouTube thumbnail readability
@@ -74,53 +86,414 @@ Output: 最新科技\\n资讯更新
 Input: "How to Build React应用程序"
 Output: How to Build\\nReact Applications\\nStep by Step
 
-Remember: Output ONLY the optimized title with \\n line breaks, nothing else."""
+Remember: {reminder}"""
+
+TITLE_OPTIMIZATION_SYSTEM_PROMPT = _TITLE_RULES_TEMPLATE.format(
+    output_rule="OUTPUT ONLY THE OPTIMIZED TITLE - No prefixes, suffixes, quotes, or explanations",
+    reminder="Output ONLY the optimized title with \\n line breaks, nothing else.",
+)
+
+# System prompt of batched requests: same rules, answered with a JSON array (see BATCH_INSTRUCTIONS)
+BATCH_OPTIMIZATION_SYSTEM_PROMPT = _TITLE_RULES_TEMPLATE.format(
+    output_rule="OUTPUT ONLY THE JSON ARRAY REQUESTED - Optimized titles without prefixes, suffixes, quotes, "
+                "or explanations",
+    reminder="Output ONLY the JSON array of optimized titles with \\n line breaks, nothing else.",
+)
+
+# Generation settings of a single-title request
+TITLE_GENERATION_CONFIG = {
+    "temperature": 0.1,  # Low temperature for consistent results
+    "max_output_tokens": 50,  # Very short response - just the title
+}
+
+# Async optimization: concurrency limit, deadline and hedged requests
+ASYNC_MAX_CONCURRENCY = 8  # 每个事件循环同时进行的Gemini请求上限
+ASYNC_TIMEOUT_SECONDS = 10.0  # 异步优化的默认截止时间（秒）
+LATENCY_WINDOW = 200  # 计算延迟分位数所用的最近成功请求数
+HEDGE_PERCENTILE = 0.95  # 首个请求超过该分位数延迟时发送对冲请求
+HEDGE_MIN_SAMPLES = 20  # 延迟样本达到该数量后才启用对冲
+
+# Circuit breaker: skip Gemini while it is failing or too slow
+BREAKER_WINDOW = 20  # 统计失败率的最近请求数
+BREAKER_MIN_CALLS = 5  # 窗口内请求数达到后才可能跳闸
+BREAKER_FAILURE_RATE = 0.5  # 失败（异常、超时、过慢）比例达到该值时跳闸
+BREAKER_SLOW_CALL_SECONDS = 5.0  # 超过该延迟的成功请求也计为失败
+BREAKER_COOLDOWN_SECONDS = 30.0  # 跳闸后跳过AI调用的冷却时间，之后放行一个探测请求
+
+# Batched optimization: many titles per request, bounded by a token budget
+BATCH_MAX_TITLES = 50  # 单次请求最多包含的标题数
+BATCH_MAX_TOKENS = 6000  # 单次请求的token预算（输入标题 + 为输出预留的token）
+BATCH_TOKENS_PER_TITLE = 60  # 每个标题在输出中预留的token（单条请求上限为50）+ JSON包装开销
+BATCH_TIMEOUT_SECONDS = 30.0  # 批量优化中每个请求（批量请求及逐条回退）的超时（秒）
+BATCH_INSTRUCTIONS = """Optimize each title in the JSON array below independently.
+Respond with ONLY a JSON array with one object per input title, in the same order:
+[{"id": <id of the input>, "title": "<optimized title>"}, ...]
+Use \\n inside the title strings for line breaks. Do not skip, merge or add items."""
+# 单条与批量请求的结果共用缓存条目：任一路径的提示词变化都使缓存失效
+CACHE_PROMPT = "\n".join((TITLE_OPTIMIZATION_SYSTEM_PROMPT, BATCH_OPTIMIZATION_SYSTEM_PROMPT, BATCH_INSTRUCTIONS))
+
+def _gemini_installed() -> bool:
+    """Check whether google-generativeai is installed without importing it"""
+    try:
+        return importlib.util.find_spec("google.generativeai") is not None
+    except (ImportError, ValueError):
+        return False
+
+def _language_name(language: str) -> str:
+    return "Chinese" if language == "zh" else "English"
+
+def _build_prompt(title: str, source_language: Optional[str], target_language: Optional[str]) -> str:
+    """构建单个标题的提示词，考虑语言参数"""
+    prompt = title
+    
+    # 如果指定了源语言，在提示中说明
+    if source_language:
+        prompt = f"(Input is in {_language_name(source_language)}) {title}"
+    
+    # 如果需要翻译到目标语言
+    if target_language and target_language != source_language:
+        prompt = f"{prompt}\nTranslate to {_language_name(target_language)} and optimize for YouTube thumbnail."
+    return prompt
+
+class LatencyTracker:
+    """Sliding window of recent successful Gemini request latencies (thread-safe)"""
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, fraction: float, min_samples: int = 1) -> Optional[float]:
+        """Latency below which `fraction` of the recent requests completed, or None with too few samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+
+class CircuitBreaker:
+    """
+    Circuit breaker around Gemini requests (thread-safe)
+    
+    closed: requests pass; the outcome of the last `window` requests is tracked and
+        the breaker trips to open once at least `min_calls` were made and the share
+        of failures (errors, timeouts, calls slower than slow_call_seconds) reaches
+        failure_rate.
+    open: requests are rejected (callers use their local fallback) for cooldown_seconds.
+    half_open: after the cool-down one probe request is let through; its success
+        closes the breaker, its failure opens it for another cool-down. Only the
+        probe's outcome (identified by the permit allow_request returned) changes
+        the state; late results of requests sent before the trip are ignored.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS,
+                 cooldown_seconds: float = BREAKER_COOLDOWN_SECONDS, clock=time.monotonic):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)  # True=成功, False=失败
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._probe = None  # 当前探测请求的许可
+        self._lock = threading.Lock()
+        self.trips = 0  # 跳闸次数
+        self.rejected = 0  # 因断路而跳过的请求数
+    
+    @property
+    def state(self) -> str:
+        """Current state; an open breaker whose cool-down has passed reports half_open"""
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+    
+    def allow_request(self) -> Any:
+        """
+        Whether a request may be sent now
+        
+        Returns:
+            A truthy permit to pass to record_success/record_failure with the request's
+            outcome, or False: skip the call and use the fallback
+        """
+        with self._lock:
+            now = self._clock()
+            if self._state == self.OPEN:
+                if now - self._opened_at < self.cooldown_seconds:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_started = None
+            if self._state == self.HALF_OPEN:
+                # 同一时间只放行一个探测请求；探测请求迟迟没有结果时再放行下一个
+                if self._probe_started is not None and now - self._probe_started < self.cooldown_seconds:
+                    self.rejected += 1
+                    return False
+                self._probe_started = now
+                self._probe = object()
+                return self._probe
+            return True
+    
+    def record_success(self, latency: Optional[float] = None, permit: Any = None) -> None:
+        """Record a completed request; one slower than slow_call_seconds counts as a failure
+        
+        Args:
+            latency: Request duration in seconds (None: not checked against slow_call_seconds)
+            permit: The permit allow_request returned for this request
+        """
+        if latency is not None and latency > self.slow_call_seconds:
+            self.record_failure(permit)
+            return
+        with self._lock:
+            if self._state == self.OPEN:
+                return  # 跳闸前发出的请求迟到的结果
+            if self._state == self.HALF_OPEN:
+                if permit is None or permit is not self._probe:
+                    return  # 不是探测请求的结果（例如跳闸前发出的请求迟到的响应）
+                logger.info("Gemini circuit breaker closed - probe request succeeded")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._probe_started = None
+                self._probe = None
+            self._outcomes.append(True)
+    
+    def record_failure(self, permit: Any = None) -> None:
+        """Record a failed, timed-out or too slow request (permit: as for record_success)"""
+        with self._lock:
+            if self._state == self.OPEN:
+                return
+            if self._state == self.HALF_OPEN:
+                if permit is not None and permit is self._probe:
+                    self._trip()
+                return
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._outcomes.count(False) / calls >= self.failure_rate:
+                self._trip()
+    
+    def _trip(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._probe_started = None
+        self._probe = None
+        self.trips += 1
+        logger.warning(f"Gemini circuit breaker open - skipping AI title optimization for {self.cooldown_seconds:.0f}s")
+    
+    def reset(self) -> None:
+        """Close the breaker and forget all outcomes and counters"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._outcomes.clear()
+            self._probe_started = None
+            self._probe = None
+            self.trips = self.rejected = 0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly state for health checks and render profiles"""
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            remaining = self.cooldown_seconds - (self._clock() - self._opened_at) if state == self.OPEN else 0.0
+            return {
+                "state": state,
+                "calls": calls,
+                "failure_rate": failures / calls if calls else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "cooldown_remaining": max(remaining, 0.0),
+            }
+
+# 进程内共享：所有优化器实例访问同一个Gemini端点，延迟分布、断路器和并发上限按进程统计
+request_latency = LatencyTracker()
+# 批量请求的耗时随标题数增长，单独统计，不影响单条请求的对冲阈值
+batch_latency = LatencyTracker()
+gemini_breaker = CircuitBreaker()
+
+def ai_status() -> Dict[str, Any]:
+    """Process-wide Gemini health: circuit breaker state and recent single/batch request latency"""
+    return {
+        "breaker": gemini_breaker.snapshot(),
+        "latency_p95": request_latency.percentile(HEDGE_PERCENTILE),
+        "latency_samples": len(request_latency),
+        "batch_latency_p95": batch_latency.percentile(HEDGE_PERCENTILE),
+        "batch_latency_samples": len(batch_latency),
+    }
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """距截止时间（time.monotonic()）的剩余秒数；未设置截止时间时为None"""
+    return None if deadline is None else deadline - time.monotonic()
+
+_request_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def _request_semaphore() -> "asyncio.Semaphore":
+    """当前事件循环的Gemini请求信号量（asyncio.Semaphore不能跨事件循环使用）"""
+    import asyncio  # 仅在事件循环中调用，此时asyncio已加载；模块顶层不导入以免拖慢启动
+    loop = asyncio.get_running_loop()
+    semaphore = _request_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _request_semaphores[loop] = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+    return semaphore
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count: one per CJK character, one per ~4 other characters"""
+    cjk = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def plan_batches(titles: List[str], max_tokens: int = BATCH_MAX_TOKENS,
+                 max_titles: int = BATCH_MAX_TITLES) -> List[List[str]]:
+    """
+    Split titles into consecutive batches within a token budget
+    
+    Each title costs its estimated input tokens plus BATCH_TOKENS_PER_TITLE for
+    its share of the response. A title over the budget on its own gets a batch
+    of its own.
+    
+    Returns:
+        list: Batches of titles, in input order
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for title in titles:
+        cost = estimate_tokens(title) + BATCH_TOKENS_PER_TITLE
+        if current and (current_tokens + cost > max_tokens or len(current) >= max_titles):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(title)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def _parse_batch_response(text: str, count: int) -> Dict[int, str]:
+    """解析批量响应中的 [{"id", "title"}] 数组，返回 id -> 优化后的标题（无效条目被忽略）"""
+    text = text.strip()
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        return {}
+    items = json.loads(text[start:end + 1])
+    if not isinstance(items, list):
+        return {}
+    results = {}
+    for position, item in enumerate(items):
+        if isinstance(item, str) and len(items) == count:
+            item_id, title = position, item  # 模型只返回字符串数组时按位置对应
+        elif isinstance(item, dict):
+            item_id, title = item.get("id"), item.get("title")
+        else:
+            continue
+        if isinstance(item_id, int) and 0 <= item_id < count and isinstance(title, str) and title.strip():
+            results[item_id] = title.strip()
+    return results
 
 class TitleOptimizer:
     """Google Gemini-powered title optimizer"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = None, use_cache: bool = True,
+                 breaker: Optional[CircuitBreaker] = None):
         """
         Initialize title optimizer with Gemini API
         
         Args:
             api_key: Gemini API key. If None, tries to get from GEMINI_API_KEY or GOOGLE_API_KEY environment variables
+            cache_dir: Directory of the persistent title cache (default: $YOUTUBE_THUMBNAIL_CACHE_DIR or ~/.cache)
+            use_cache: Reuse optimized titles across calls and processes from the persistent cache
+            breaker: Circuit breaker guarding Gemini requests (default: the process-wide gemini_breaker)
         """
         # Support both GEMINI_API_KEY (preferred) and GOOGLE_API_KEY (backwards compatibility)
         self.api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        self.model = None
+        self._model = None
+        self._batch_model = None
         self.is_available = False
+        # 持久化标题缓存：首次查询时才打开数据库
+        self.cache = TitleCache(cache_dir) if use_cache else None
+        self.breaker = breaker or gemini_breaker
         
         if self.api_key:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(
-                    GEMINI_FLASH_MODEL,
-                    system_instruction=TITLE_OPTIMIZATION_SYSTEM_PROMPT
-                )
+            # google.generativeai 导入很慢，这里只检查是否已安装，首次优化时再导入并创建模型
+            if _gemini_installed():
                 self.is_available = True
                 logger.info("Title optimizer initialized with Gemini API")
-            except Exception as e:
-                logger.warning(f"Failed to initialize Gemini API: {e}")
-                self.is_available = False
+            else:
+                logger.warning("Failed to initialize Gemini API: google-generativeai package not installed")
         else:
             logger.info("No Gemini API key provided - title optimization disabled")
     
-    def optimize_title(self, title: str, source_language: str = None, target_language: str = None) -> Tuple[str, bool]:
+    def _create_model(self, system_prompt: str):
+        """导入SDK并创建使用指定系统提示词的模型，失败时禁用优化器"""
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            return genai.GenerativeModel(GEMINI_FLASH_MODEL, system_instruction=system_prompt)
+        except Exception as e:
+            logger.warning(f"Failed to initialize Gemini API: {e}")
+            self.is_available = False
+            return None
+    
+    @property
+    def model(self):
+        """Gemini model for single-title requests, created on first use"""
+        if self._model is None and self.is_available:
+            self._model = self._create_model(TITLE_OPTIMIZATION_SYSTEM_PROMPT)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        # 允许注入已创建的模型（例如测试中的替身模型）
+        self._model = model
+        self.is_available = model is not None
+    
+    @property
+    def batch_model(self):
+        """Gemini model for batched (JSON) requests, created on first use"""
+        if self._batch_model is None and self.is_available:
+            self._batch_model = self._create_model(BATCH_OPTIMIZATION_SYSTEM_PROMPT)
+        return self._batch_model
+    
+    @batch_model.setter
+    def batch_model(self, model):
+        self._batch_model = model
+    
+    def optimize_title(self, title: str, source_language: str = None, target_language: str = None,
+                       timeout: Optional[float] = None) -> Tuple[str, bool]:
         """
         Optimize title using Gemini API with smart line-breaking
         
+        While the circuit breaker is open the request is skipped and the original
+        title is returned immediately.
+        
         Args:
             title: Original title to optimize
             source_language: Source language ('en', 'zh', etc.) - if specified, skip auto-detection
             target_language: Target language for translation ('en', 'zh', etc.)
+            timeout: Time budget in seconds for the whole call, counted from its start: the cache
+                lookup and first-use model creation consume it, the rest is passed to the SDK as
+                the request timeout, and once it is spent no request is sent. None uses the
+                client default
             
         Returns:
             Tuple of (optimized_title, was_optimized)
             - If optimization succeeds: (optimized_title, True)
             - If optimization fails/unavailable: (original_title, False)
         """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
         # Return original if API not available
         if not self.is_available:
             logger.info("Gemini API not available - using original title")
@@ -131,46 +504,314 @@ class TitleOptimizer:
             logger.info("Title already contains line breaks - bypassing optimization")
             return title, False
         
+        # 命中持久化缓存时无需创建模型，也不发起网络请求
+        cache_key = self._cache_key(title, source_language, target_language)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Title optimization cache hit: '{title}' -> '{cached}'")
+                return cached, True
+        
+        # Create the model on first use
+        if self.model is None:
+            logger.info("Gemini API not available - using original title")
+            return title, False
+        
+        # 缓存查询和首次创建模型（导入SDK）也计入时间预算，预算用尽时不再发送请求
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"Title optimization time budget ({timeout:.1f}s) spent before the request - "
+                           "using original title")
+            return title, False
+        
+        permit = self.breaker.allow_request()
+        if not permit:
+            logger.info("Gemini circuit breaker open - using original title")
+            return title, False
+        
         # For AI-powered optimization, we optimize all titles (not just mixed-language)
         # This enables smart line-breaking even for single-language titles
         
         try:
-            # 构建提示词，考虑语言参数
-            prompt = title
-            
-            # 如果指定了源语言，在提示中说明
-            if source_language:
-                lang_name = "Chinese" if source_language == "zh" else "English"
-                prompt = f"(Input is in {lang_name}) {title}"
-            
-            # 如果需要翻译到目标语言
-            if target_language and target_language != source_language:
-                target_lang_name = "Chinese" if target_language == "zh" else "English"
-                prompt = f"{prompt}\nTranslate to {target_lang_name} and optimize for YouTube thumbnail."
+            prompt = _build_prompt(title, source_language, target_language)
+            options = {"request_options": {"timeout": remaining}} if remaining is not None else {}
             
             # Generate optimized title using system instruction
-            import google.generativeai as genai
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.1,  # Low temperature for consistent results
-                    max_output_tokens=50,  # Very short response - just the title
-                )
-            )
+            # (generation_config 以字典传入，SDK会转换为GenerationConfig，无需在此导入SDK)
+            start = time.perf_counter()
+            response = self.model.generate_content(prompt, generation_config=dict(TITLE_GENERATION_CONFIG), **options)
+            latency = time.perf_counter() - start
+            request_latency.record(latency)
+            self.breaker.record_success(latency, permit)
             
-            optimized_title = response.text.strip()
+            return self._accept_response(title, response.text, cache_key)
+                
+        except Exception as e:
+            self.breaker.record_failure(permit)
+            logger.error(f"Title optimization failed: {e}")
+            return title, False
+    
+    async def optimize_title_async(self, title: str, source_language: str = None, target_language: str = None,
+                                   timeout: Optional[float] = None, hedge: bool = True) -> Tuple[str, bool]:
+        """
+        Asyncio variant of optimize_title with a deadline, concurrency limit and hedging
+        
+        At most ASYNC_MAX_CONCURRENCY Gemini requests run at once per event loop. When
+        hedge is on and the first request is still pending after the recent p95 latency,
+        a second identical request is sent and the first response wins. Waiting for
+        Gemini holds no thread: the SDK's generate_content_async is used when available,
+        otherwise the blocking call runs in the default executor. While the circuit
+        breaker is open the request is skipped. Each call records one breaker outcome
+        (hedged request included); a timeout counts as a failure.
+        
+        Args:
+            title: Original title to optimize
+            source_language: Source language ('en', 'zh', etc.) - if specified, skip auto-detection
+            target_language: Target language for translation ('en', 'zh', etc.)
+            timeout: Deadline in seconds for the whole call, first-use client creation and hedged request included
+                (None: ASYNC_TIMEOUT_SECONDS)
+            hedge: Send a hedged request when the first one exceeds the p95 latency
             
-            # Validate the response
-            if optimized_title and len(optimized_title) > 0:
-                logger.info(f"Title optimized: '{title}' -> '{optimized_title}'")
-                return optimized_title, True
-            else:
-                logger.warning("Empty response from Gemini - using original title")
+        Returns:
+            Tuple of (optimized_title, was_optimized); (original_title, False) on failure or timeout
+        """
+        import asyncio
+        
+        timeout = ASYNC_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        
+        if not self.is_available:
+            logger.info("Gemini API not available - using original title")
+            return title, False
+        
+        if '\\n' in title or '\n' in title:
+            logger.info("Title already contains line breaks - bypassing optimization")
+            return title, False
+        
+        cache_key = self._cache_key(title, source_language, target_language)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)  # 本地SQLite查询（亚毫秒级），直接在事件循环中执行
+            if cached is not None:
+                logger.info(f"Title optimization cache hit: '{title}' -> '{cached}'")
+                return cached, True
+        
+        if self._model is None:
+            # 首次创建模型需要导入SDK（较慢），放到线程中避免阻塞事件循环；创建时间计入截止时间
+            try:
+                model = await asyncio.wait_for(asyncio.to_thread(lambda: self.model), _remaining(deadline))
+            except asyncio.TimeoutError:
+                logger.warning(f"Gemini client not ready within {timeout:.1f}s - using original title")
                 return title, False
-                
+            if model is None:
+                logger.info("Gemini API not available - using original title")
+                return title, False
+        
+        remaining = _remaining(deadline)
+        if remaining <= 0:
+            logger.warning(f"Title optimization time budget ({timeout:.1f}s) spent before the request - "
+                           "using original title")
+            return title, False
+        
+        permit = self.breaker.allow_request()
+        if not permit:
+            logger.info("Gemini circuit breaker open - using original title")
+            return title, False
+        
+        prompt = _build_prompt(title, source_language, target_language)
+        # 断路器按逻辑调用记录一次结果，不论发送了几个（对冲）请求
+        try:
+            text, latency = await asyncio.wait_for(self._generate_hedged(prompt, hedge, deadline), remaining)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure(permit)
+            logger.warning(f"Title optimization timed out after {timeout:.1f}s - using original title")
+            return title, False
         except Exception as e:
+            self.breaker.record_failure(permit)
             logger.error(f"Title optimization failed: {e}")
             return title, False
+        self.breaker.record_success(latency, permit)
+        return self._accept_response(title, text, cache_key)
+    
+    async def _generate_once(self, prompt: str, deadline: float) -> Tuple[str, float]:
+        """在并发上限内发送一次请求，返回 (响应文本, 请求耗时)；剩余时间作为SDK的请求超时"""
+        import asyncio
+        
+        async with _request_semaphore():
+            start = time.perf_counter()
+            # 超时时协程被取消，但线程中的同步调用无法中断：请求超时让线程在截止时间后尽快释放
+            options = {"timeout": max(_remaining(deadline), 0.0)}
+            generate_async = getattr(self._model, "generate_content_async", None)
+            if generate_async is not None:
+                response = await generate_async(prompt, generation_config=dict(TITLE_GENERATION_CONFIG),
+                                                request_options=options)
+            else:
+                response = await asyncio.to_thread(self._model.generate_content, prompt,
+                                                   generation_config=dict(TITLE_GENERATION_CONFIG),
+                                                   request_options=options)
+            latency = time.perf_counter() - start
+            request_latency.record(latency)
+        return response.text, latency
+    
+    async def _generate_hedged(self, prompt: str, hedge: bool, deadline: float) -> Tuple[str, float]:
+        """发送请求；首个请求超过p95延迟仍未返回时再发送一个相同请求，取先成功的响应
+
+        对冲请求同样需要断路器放行：半开状态下只有探测请求本身，不会变成两个请求。
+        """
+        import asyncio
+        
+        delay = request_latency.percentile(HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES) if hedge else None
+        pending = {asyncio.ensure_future(self._generate_once(prompt, deadline))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.breaker.allow_request():
+                logger.info(f"Title request exceeded p95 latency ({delay:.2f}s) - sending hedged request")
+                pending.add(asyncio.ensure_future(self._generate_once(prompt, deadline)))
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 取消落后的请求（已在线程中执行的同步调用无法中断，其结果被丢弃）
+            for task in pending:
+                task.cancel()
+    
+    def _accept_response(self, title: str, text: str, cache_key: Optional[str]) -> Tuple[str, bool]:
+        """校验模型响应：非空时写入缓存并返回优化结果，否则返回原标题"""
+        optimized_title = text.strip()
+        
+        # Validate the response
+        if optimized_title and len(optimized_title) > 0:
+            logger.info(f"Title optimized: '{title}' -> '{optimized_title}'")
+            if cache_key is not None:
+                self.cache.put(cache_key, title, optimized_title)
+            return optimized_title, True
+        else:
+            logger.warning("Empty response from Gemini - using original title")
+            return title, False
+    
+    def optimize_titles(self, titles: List[str], source_language: str = None, target_language: str = None,
+                        max_batch_tokens: int = BATCH_MAX_TOKENS,
+                        max_batch_size: int = BATCH_MAX_TITLES,
+                        timeout: float = BATCH_TIMEOUT_SECONDS) -> List[Tuple[str, bool]]:
+        """
+        Optimize many titles, packing them into as few Gemini requests as possible
+        
+        Cached titles are answered from the persistent cache and duplicates are sent
+        once. The rest is split into batches by estimated token count; each batch is
+        one structured (JSON) request. Titles missing or invalid in a batch response,
+        and all titles of a failed batch, fall back to optimize_title one by one;
+        all fallbacks of one call share a single budget of `timeout` seconds, after
+        which the remaining titles keep their original text.
+        
+        Args:
+            titles: Original titles
+            source_language: Source language ('en', 'zh', etc.) of all titles
+            target_language: Target language for translation ('en', 'zh', etc.)
+            max_batch_tokens: Token budget of one request (input titles plus reserved output)
+            max_batch_size: Maximum number of titles in one request
+            timeout: Timeout in seconds of each batch request, and the total budget of the one-by-one fallbacks
+            
+        Returns:
+            List of (optimized_title, was_optimized), one per input title and in input order
+        """
+        results = [(title, False) for title in titles]
+        if not self.is_available:
+            logger.info("Gemini API not available - using original titles")
+            return results
+        
+        # 标题 -> 在输入中的位置（重复标题只请求一次）
+        pending: Dict[str, List[int]] = {}
+        for index, title in enumerate(titles):
+            if not title or '\\n' in title or '\n' in title:
+                continue  # 空标题和已手动换行的标题保持原样
+            cache_key = self._cache_key(title, source_language, target_language)
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[index] = (cached, True)
+            else:
+                pending.setdefault(title, []).append(index)
+        
+        if not pending or self.batch_model is None:
+            return results
+        
+        fallback_deadline = None  # 首次逐条回退时开始计时，所有回退共用
+        skipped = 0
+        for batch in plan_batches(list(pending), max_batch_tokens, max_batch_size):
+            optimized = self._optimize_batch(batch, source_language, target_language, timeout) if len(batch) > 1 else {}
+            for title in batch:
+                if title in optimized:
+                    result = (optimized[title], True)
+                    cache_key = self._cache_key(title, source_language, target_language)
+                    if cache_key is not None:
+                        self.cache.put(cache_key, title, optimized[title])
+                else:
+                    # 单个标题、批量请求失败或该条目缺失时逐条回退
+                    if fallback_deadline is None:
+                        fallback_deadline = time.monotonic() + timeout
+                    remaining = _remaining(fallback_deadline)
+                    if remaining <= 0:
+                        skipped += 1  # 回退预算已用尽，保持原标题
+                        continue
+                    result = self.optimize_title(title, source_language, target_language, timeout=remaining)
+                for index in pending[title]:
+                    results[index] = result
+        if skipped:
+            logger.warning(f"Fallback time budget ({timeout:.1f}s) spent - {skipped} titles left unoptimized")
+        return results
+    
+    def _optimize_batch(self, titles: List[str], source_language: str = None,
+                        target_language: str = None, timeout: float = BATCH_TIMEOUT_SECONDS) -> Dict[str, str]:
+        """发送一次批量请求，返回 原标题 -> 优化后的标题（失败或缺失的标题不在结果中）"""
+        lines = [BATCH_INSTRUCTIONS]
+        if source_language:
+            lines.append(f"All input titles are in {_language_name(source_language)}.")
+        if target_language and target_language != source_language:
+            lines.append(f"Translate every title to {_language_name(target_language)} and optimize for YouTube thumbnail.")
+        lines.append(json.dumps([{"id": i, "title": title} for i, title in enumerate(titles)], ensure_ascii=False))
+        
+        permit = self.breaker.allow_request()
+        if not permit:
+            logger.info("Gemini circuit breaker open - skipping batch request")
+            return {}
+        start = time.perf_counter()
+        try:
+            response = self.batch_model.generate_content(
+                "\n".join(lines),
+                generation_config={
+                    "temperature": 0.1,
+                    "max_output_tokens": BATCH_TOKENS_PER_TITLE * len(titles),
+                    "response_mime_type": "application/json",
+                },
+                request_options={"timeout": timeout}
+            )
+        except Exception as e:
+            self.breaker.record_failure(permit)
+            logger.error(f"Batch title optimization failed for {len(titles)} titles: {e}")
+            return {}
+        batch_latency.record(time.perf_counter() - start)
+        # 批量请求耗时随标题数增长，不按单条请求的慢调用阈值判断（超时已由timeout限制）
+        self.breaker.record_success(permit=permit)
+        try:
+            parsed = _parse_batch_response(response.text, len(titles))
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Unparseable batch response for {len(titles)} titles: {e}")
+            return {}
+        
+        if len(parsed) < len(titles):
+            logger.warning(f"Batch response covered {len(parsed)}/{len(titles)} titles - retrying the rest one by one")
+        logger.info(f"Batch optimized {len(parsed)} titles in one request")
+        return {titles[i]: title for i, title in parsed.items()}
+    
+    def _cache_key(self, title: str, source_language: Optional[str], target_language: Optional[str]) -> Optional[str]:
+        """持久化缓存的键（未启用缓存时为None）"""
+        if self.cache is None:
+            return None
+        return title_cache_key(title, source_language, target_language, GEMINI_FLASH_MODEL, CACHE_PROMPT)
     
     def _needs_optimization(self, title: str) -> bool:
         """
@@ -203,20 +844,25 @@ class TitleOptimizer:
         """Get the system prompt used for optimization"""
         return TITLE_OPTIMIZATION_SYSTEM_PROMPT
 
-def create_title_optimizer(api_key: Optional[str] = None) -> TitleOptimizer:
+def create_title_optimizer(api_key: Optional[str] = None, cache_dir: Optional[str] = None,
+                           use_cache: bool = True) -> TitleOptimizer:
     """
     Factory function to create title optimizer
     
     Args:
         api_key: Gemini API key. If None, tries GEMINI_API_KEY or GOOGLE_API_KEY environment variables
+        cache_dir: Directory of the persistent title cache (default: $YOUTUBE_THUMBNAIL_CACHE_DIR or ~/.cache)
+        use_cache: Reuse optimized titles across calls and processes from the persistent cache
         
     Returns:
         TitleOptimizer instance
     """
-    return TitleOptimizer(api_key)
+    return TitleOptimizer(api_key, cache_dir=cache_dir, use_cache=use_cache)
 
 # Example usage and testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Test the title optimizer
     optimizer = create_title_optimizer()
     
@@ -5,8 +5,137 @@ Focus on size compression and encoding optimization to improve transmission effi
 """
 
 from PIL import Image, ImageDraw, ImageFont
+import io
+import math
 import os
-from typing import Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Optional, Union
+
+# JPEG体积随质量变化的经验模型: size ∝ (100 - quality) ^ -JPEG_SIZE_EXPONENT
+# 用于为二分搜索选择首个探测质量，偏差只影响尝试次数，不影响结果
+JPEG_SIZE_EXPONENT = 0.75
+
+
+@dataclass
+class JpegEncodeResult:
+    """Outcome of a size-targeted JPEG encode"""
+    data: bytes
+    quality: int
+    attempts: int  # 实际执行的编码次数
+    fits: bool  # 是否满足字节预算
+    subsampling: Union[str, int, None] = None
+    
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def _estimate_quality(big: Tuple[int, int], fit: Optional[Tuple[int, int]], max_bytes: int) -> float:
+    """估计刚好满足预算的质量
+    
+    Args:
+        big: 已知超出预算的 (质量, 体积)
+        fit: 已知满足预算的 (质量, 体积)，尚未探测到时为None
+        max_bytes: 字节预算
+    """
+    big_quality, big_size = big
+    if big_quality >= 100:
+        # 质量100时模型无定义（100 - 质量 = 0），返回big_quality，由调用方退回普通二分
+        return float(big_quality)
+    if fit is None or fit[0] >= big_quality:
+        # 只有一个有效点：按经验指数外推
+        exponent = JPEG_SIZE_EXPONENT
+    else:
+        # 两个点：在 log(100 - 质量) / log(体积) 空间中插值
+        fit_quality, fit_size = fit
+        exponent = math.log(big_size / fit_size) / math.log((100 - fit_quality) / (100 - big_quality))
+        if exponent <= 0:
+            exponent = JPEG_SIZE_EXPONENT
+    return 100 - (100 - big_quality) * (big_size / max_bytes) ** (1 / exponent)
+
+
+def encode_jpeg_to_budget(image: Image.Image, max_bytes: int,
+                          max_quality: int = 95, min_quality: int = 70,
+                          subsampling: Union[str, int, None] = None,
+                          qtables: Union[str, list, dict, None] = None,
+                          optimize: bool = True, progressive: bool = False,
+                          max_attempts: int = 8) -> JpegEncodeResult:
+    """
+    Encode a JPEG at the highest quality that fits a byte budget
+    
+    The first encode uses max_quality (most thumbnails fit right away). When it
+    is too large, the remaining range is bisected, each probe seeded by a size
+    model fitted to the sizes already observed, so the search needs a handful of
+    encodes instead of walking the quality range step by step.
+    
+    Args:
+        image: PIL image (converted to RGB if needed)
+        max_bytes: Byte budget for the encoded file
+        max_quality: Preferred (highest) quality
+        min_quality: Lowest acceptable quality; returned even if it does not fit
+        subsampling: Chroma subsampling ("4:4:4", "4:2:2", "4:2:0"); None uses Pillow's default (4:2:0)
+        qtables: Custom quantization tables or a Pillow preset name (e.g. "web_high"), scaled by quality
+        optimize: Compute optimal Huffman tables
+        progressive: Write a progressive JPEG (YouTube prefers baseline)
+        max_attempts: Upper bound on the number of encodes
+        
+    Returns:
+        JpegEncodeResult: Encoded data, chosen quality, number of encodes and whether the budget was met
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    save_kwargs = {'format': 'JPEG', 'optimize': optimize, 'progressive': progressive}
+    if subsampling is not None:
+        save_kwargs['subsampling'] = subsampling
+    if qtables is not None:
+        save_kwargs['qtables'] = qtables
+    
+    attempts = 0
+    
+    def encode(quality):
+        nonlocal attempts
+        attempts += 1
+        buffer = io.BytesIO()
+        image.save(buffer, quality=quality, **save_kwargs)
+        return buffer.getvalue()
+    
+    def result(data, quality):
+        return JpegEncodeResult(data, quality, attempts, len(data) <= max_bytes, subsampling)
+    
+    data = encode(max_quality)
+    if len(data) <= max_bytes:
+        return result(data, max_quality)
+    
+    # 区间 (fit_quality, big_quality)：big_quality 已知超出预算，fit_quality 已知满足（或尚未探测）
+    best = None
+    big = (max_quality, len(data))
+    fit_quality = min_quality - 1
+    while big[0] - fit_quality > 1 and attempts < max_attempts - 1:
+        estimate = _estimate_quality(big, (best[1], len(best[0])) if best else None, max_bytes)
+        if estimate <= min_quality:
+            # 预计只有最低质量可能满足预算，直接探测最低质量
+            probe = min_quality
+        else:
+            probe = math.floor(estimate)
+            if not fit_quality < probe < big[0]:
+                probe = (fit_quality + big[0]) // 2
+        data = encode(probe)
+        if len(data) <= max_bytes:
+            best = (data, probe)
+            fit_quality = probe
+        else:
+            big = (probe, len(data))
+    
+    if best is not None:
+        return result(*best)
+    if big[0] > min_quality:
+        # 尝试次数用尽仍未找到满足预算的质量，退回最低质量
+        data = encode(min_quality)
+        return result(data, min_quality)
+    return result(data, big[0])
+
 
 class ThumbnailOptimizer:
     """Thumbnail output optimizer"""
@@ -71,6 +200,83 @@ class ThumbnailOptimizer:
         
         return optimized_image
     
+    def encode_preset(self, image: Image.Image, preset: str) -> bytes:
+        """
+        Encode an image already sized for a preset with the preset's JPEG settings
+        
+        Args:
+            image: PIL image at the preset size
+            preset: Preset name
+            
+        Returns:
+            bytes: Encoded JPEG data
+        """
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=self.OUTPUT_PRESETS[preset]['quality'],
+                   optimize=True, progressive=True)
+        return buffer.getvalue()
+    
+    def render_presets(self, image: Image.Image, presets: List[str] = None,
+                       output_dir: str = None, base_name: str = "thumbnail",
+                       output_mode: str = "file", max_workers: int = None) -> Dict[str, Any]:
+        """
+        Produce several presets from one composited image
+        
+        Sizes are produced by a shared downscale chain (largest preset first, each
+        step resizing the previous result, e.g. 1600->1280->1200->1080) and the
+        JPEG encodes run in parallel on a thread pool while the chain continues.
+        
+        Args:
+            image: Composited PIL image, at least as large as the largest preset
+            presets: Preset names (default: all OUTPUT_PRESETS)
+            output_dir: Directory for output files (output_mode="file"), default current directory
+            base_name: File name prefix; files are written as {base_name}_{preset}.jpg
+            output_mode: "file" to write files, "bytes" to return the JPEG data
+            max_workers: Encoder threads (default: one per preset)
+            
+        Returns:
+            dict: preset name -> output path ("file") or JPEG bytes ("bytes"), in the requested order
+        """
+        presets = list(presets) if presets else list(self.OUTPUT_PRESETS)
+        unknown = [p for p in presets if p not in self.OUTPUT_PRESETS]
+        if unknown:
+            raise ValueError(f"Unknown preset: {unknown}, available presets: {list(self.OUTPUT_PRESETS.keys())}")
+        if output_mode not in ("file", "bytes"):
+            raise ValueError(f"Unknown output_mode: {output_mode}, available: ['file', 'bytes']")
+        
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # 按尺寸从大到小排列，每一级从上一级结果缩放，避免每个预设都从原图重新缩放
+        chain = sorted(set(presets), key=lambda p: self.OUTPUT_PRESETS[p]['size'][0], reverse=True)
+        output_dir = output_dir or "."
+        
+        def finish(preset, sized):
+            data = self.encode_preset(sized, preset)
+            if output_mode == "bytes":
+                return data
+            path = os.path.join(output_dir, f"{base_name}_{preset}.jpg")
+            with open(path, 'wb') as f:
+                f.write(data)
+            return path
+        
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(chain)) as executor:
+            current = image
+            for preset in chain:
+                target_size = self.OUTPUT_PRESETS[preset]['size']
+                if current.size != target_size:
+                    current = current.resize(target_size, Image.Resampling.LANCZOS)
+                # 编码与后续缩放并行进行（Pillow编码时释放GIL）
+                futures[preset] = executor.submit(finish, preset, current)
+            results = {preset: futures[preset].result() for preset in presets}
+        
+        sizes = ', '.join(f"{p} {self.OUTPUT_PRESETS[p]['size'][0]}x{self.OUTPUT_PRESETS[p]['size'][1]}" for p in chain)
+        print(f"✅ 多预设输出完成: {sizes}")
+        return results
+    
     def optimize_thumbnail(self, input_path: str, output_path: str = None, 
                           preset: str = 'youtube_hd') -> Tuple[bool, str]:
         """